@@ -10,12 +10,11 @@ import aiohttp
 import config
 import discord
 import datetime
-import itertools
+import re
 from discord.ext import commands
-from helpers.datafiles import fill_profile, get_file
+from helpers.userindex import is_botbanned, get_userprefixes, match_alias
 from helpers.errors import handle_code_error, handle_command_error
 
-
 # Logging setup to file and stdout.
 if not os.path.exists("logs"):
     os.makedirs("logs")
@@ -33,34 +32,24 @@ log.addHandler(logfile_handler)
 
 
 # Utility functions.
-def cap_permutations(s):
-    # thank you to https://stackoverflow.com/a/11165671
-    lu_sequence = ((c.lower(), c.upper()) for c in s)
-    return ["".join(x) for x in itertools.product(*lu_sequence)]
-
-
-def get_userprefix(uid):
-    profile = fill_profile(uid)
-    if not profile:
-        return []
-    return profile["prefixes"]
+def compile_prefixes(prefixes):
+    # Global prefixes are case insensitive. Earlier ones win, same as before.
+    if not prefixes:
+        return re.compile(r"(?!)")
+    return re.compile("|".join(re.escape(p) for p in prefixes), re.IGNORECASE)
 
 
-def get_useralias(uid):
-    profile = fill_profile(uid)
-    if not profile:
-        return []
-    return profile["aliases"]
+prefix_matcher = compile_prefixes(config.prefixes)
 
 
-def get_prefix(bot, message):
-    prefixes = []
-    for prefix in config.prefixes:
-        prefixes += cap_permutations(prefix)
-    userprefixes = get_userprefix(message.author.id)
-    if userprefixes is not None:
-        return commands.when_mentioned_or(*prefixes + userprefixes)(bot, message)
-    return commands.when_mentioned_or(*prefixes)(bot, message)
+async def get_prefix(bot, message):
+    # Hand back the prefix exactly as typed, so discord.py's own check matches it.
+    match = prefix_matcher.match(message.content)
+    if match:
+        return commands.when_mentioned_or(match.group(0))(bot, message)
+    return commands.when_mentioned_or(*await get_userprefixes(message.author.id))(
+        bot, message
+    )
 
 
 # Bot setup.
@@ -110,13 +99,10 @@ async def on_message(message):
 
     if message.author.bot:
         return
-    if (
-        "botban" in get_file("botusers")
-        and message.author.id in get_file("botusers")["botban"]
-    ):
+    if is_botbanned(message.author.id):
         return
 
-    ctx = await bot.get_context(message)
+    ctx = await bot.pull_context(message)
     if not ctx.valid:
 
         def check(b, a):
@@ -124,17 +110,15 @@ async def on_message(message):
 
         while True:
             if ctx.prefix:
-                aliases = get_useralias(message.author.id)
-                for alias in aliases:
-                    command, alias = list(alias.items())[0]
-                    if message.content[len(ctx.prefix) :].startswith(alias):
-                        message.content = message.content[
-                            : len(ctx.prefix)
-                        ] + message.content[len(ctx.prefix) :].replace(
-                            alias, command, 1
-                        )
-                        ctx = await bot.get_context(message)
-                        break
+                alias = await match_alias(
+                    message.author.id, message.content[len(ctx.prefix) :]
+                )
+                if alias:
+                    command, alias = alias
+                    message.content = message.content[
+                        : len(ctx.prefix)
+                    ] + message.content[len(ctx.prefix) :].replace(alias, command, 1)
+                    ctx = await bot.pull_context(message)
             if ctx.valid:
                 break
             try:
@@ -144,7 +128,7 @@ async def on_message(message):
             except (asyncio.TimeoutError, discord.errors.NotFound):
                 return
             else:
-                ctx = await bot.get_context(message)
+                ctx = await bot.pull_context(message)
                 if ctx.valid:
                     break
     await bot.invoke(ctx)
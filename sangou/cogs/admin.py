@@ -11,12 +11,31 @@ import asyncio
 import shutil
 import os
 import base64
+import functools
+import zipfile
 from io import StringIO
 from contextlib import redirect_stdout
 from helpers.embeds import stock_embed
 from helpers.checks import ismanager
 from helpers.sv_config import get_config
-from helpers.datafiles import get_file, set_file
+from helpers.datafiles import (
+    aget_file,
+    aset_file,
+    replacing_files,
+    reading_files,
+    live_database,
+)
+from helpers.userindex import set_botbanned, forget_user
+from helpers.backups import list_snapshots, restore_snapshot
+from helpers.expiring import maps
+from helpers.logqueue import queues
+from helpers.exports import (
+    export_tree,
+    import_tree,
+    run_archive_job,
+    send_archive,
+    read_upload,
+)
 from helpers.placeholders import random_msg
 
 
@@ -174,15 +193,19 @@ class Admin(Cog):
         be a massive security risk. Dummy...
 
         No arguments."""
-        shutil.make_archive("data_export", "zip", "data")
+        async with reading_files():
+            parts = await run_archive_job(
+                functools.partial(export_tree, database=live_database()),
+                "data",
+                ctx=ctx,
+                label="Packing bot data",
+            )
         try:
-            await ctx.author.send(
-                content=f"Current bot data...",
-                file=discord.File("data_export.zip"),
+            await send_archive(
+                ctx.author.send, "Current bot data...", parts, "data_export"
             )
         except:
             await ctx.reply(content=random_msg("err_dmfail"), mention_author=False)
-        os.remove("data_export.zip")
 
     @commands.check(ismanager)
     @commands.dm_only()
@@ -194,13 +217,50 @@ class Admin(Cog):
 
         - `attachment`
         The ZIP file to use as the data folder."""
-        await attachment.save("data.zip")
-        if os.path.exists("data"):
-            shutil.rmtree("data")
-        shutil.unpack_archive("data.zip", "data")
-        os.remove("data.zip")
+        with await read_upload(attachment) as fp:
+            try:
+                async with replacing_files():
+                    await run_archive_job(
+                        import_tree, fp, "data", ctx=ctx, label="Unpacking bot data"
+                    )
+            except (ValueError, zipfile.BadZipFile) as e:
+                return await ctx.reply(
+                    content=f"That ZIP file is no good: `{e}`", mention_author=False
+                )
+        forget_user()
         await ctx.reply(content=f"Data saved.", mention_author=False)
 
+    @commands.check(ismanager)
+    @commands.command()
+    async def restore(self, ctx, snapshot: str = None):
+        """This restores the bot's data files from a backup.
+
+        This can be insanely destructive. Use caution.
+        Running it by itself lists the available backups.
+
+        - `snapshot`
+        The backup to restore. Optional."""
+        snapshots = list_snapshots()
+        if not snapshot or snapshot not in snapshots:
+            return await ctx.reply(
+                content="Available backups:\n"
+                + (
+                    "\n".join(f"- `{s}`" for s in snapshots[-20:])
+                    if snapshots
+                    else "None yet."
+                ),
+                mention_author=False,
+            )
+        async with replacing_files():
+            restored = await self.bot.loop.run_in_executor(
+                None, restore_snapshot, snapshot
+            )
+        forget_user()
+        await ctx.reply(
+            content=f"Restored `{restored}` files from `{snapshot}`.",
+            mention_author=False,
+        )
+
     @commands.bot_has_permissions(attach_files=True)
     @commands.check(ismanager)
     @commands.command(aliases=["getserverdata"])
@@ -213,15 +273,25 @@ class Admin(Cog):
         The server you want the data files of. Optional."""
         if not server:
             server = ctx.guild
-        try:
-            shutil.make_archive(f"data/{server.id}", "zip", f"data/servers/{server.id}")
-            sdata = discord.File(f"data/{server.id}.zip")
-            await ctx.message.reply(
-                content=f"{server.name}'s data...",
-                file=sdata,
+        if live_database():
+            return await ctx.reply(
+                content="Server and user data live in the database, use `getdata` instead.",
                 mention_author=False,
             )
-            os.remove(f"data/{server.id}.zip")
+        try:
+            async with reading_files(f"servers/{server.id}"):
+                parts = await run_archive_job(
+                    export_tree,
+                    f"data/servers/{server.id}",
+                    ctx=ctx,
+                    label=f"Packing {server.name}'s data",
+                )
+            await send_archive(
+                functools.partial(ctx.message.reply, mention_author=False),
+                f"{server.name}'s data...",
+                parts,
+                str(server.id),
+            )
         except FileNotFoundError:
             await ctx.message.reply(
                 content="That server doesn't have any data yet.",
@@ -243,11 +313,25 @@ class Admin(Cog):
         The server to upload the data to. Optional."""
         if not server:
             server = ctx.guild
-        await attachment.save(f"data/{server.id}.zip")
-        if os.path.exists(f"data/servers/{server.id}"):
-            shutil.rmtree(f"data/servers/{server.id}")
-        shutil.unpack_archive(f"data/{server.id}.zip", f"data/servers/{server.id}")
-        os.remove(f"data/{server.id}.zip")
+        if live_database():
+            return await ctx.reply(
+                content="Server and user data live in the database, use `setdata` instead.",
+                mention_author=False,
+            )
+        with await read_upload(attachment) as fp:
+            try:
+                async with replacing_files(f"servers/{server.id}"):
+                    await run_archive_job(
+                        import_tree,
+                        fp,
+                        f"data/servers/{server.id}",
+                        ctx=ctx,
+                        label=f"Unpacking {server.name}'s data",
+                    )
+            except (ValueError, zipfile.BadZipFile) as e:
+                return await ctx.reply(
+                    content=f"That ZIP file is no good: `{e}`", mention_author=False
+                )
         await ctx.reply(content=f"{server.name}'s data saved.", mention_author=False)
 
     @commands.bot_has_permissions(attach_files=True)
@@ -262,15 +346,25 @@ class Admin(Cog):
         The user you want the data files of. Optional."""
         if not user:
             user = ctx.author
-        try:
-            shutil.make_archive(f"data/{user.id}", "zip", f"data/users/{user.id}")
-            sdata = discord.File(f"data/{user.id}.zip")
-            await ctx.message.reply(
-                content=f"{user}'s data...",
-                file=sdata,
+        if live_database():
+            return await ctx.reply(
+                content="Server and user data live in the database, use `getdata` instead.",
                 mention_author=False,
             )
-            os.remove(f"data/{user.id}.zip")
+        try:
+            async with reading_files(f"users/{user.id}"):
+                parts = await run_archive_job(
+                    export_tree,
+                    f"data/users/{user.id}",
+                    ctx=ctx,
+                    label=f"Packing {user}'s data",
+                )
+            await send_archive(
+                functools.partial(ctx.message.reply, mention_author=False),
+                f"{user}'s data...",
+                parts,
+                str(user.id),
+            )
         except FileNotFoundError:
             await ctx.message.reply(
                 content="That user doesn't have any data.",
@@ -292,11 +386,26 @@ class Admin(Cog):
         The user to upload the data to. Optional."""
         if not user:
             user = ctx.author
-        await attachment.save(f"data/{user.id}.zip")
-        if os.path.exists(f"data/users/{user.id}"):
-            shutil.rmtree(f"data/users/{user.id}")
-        shutil.unpack_archive(f"data/{user.id}.zip", f"data/users/{user.id}")
-        os.remove(f"data/users/{user.id}")
+        if live_database():
+            return await ctx.reply(
+                content="Server and user data live in the database, use `setdata` instead.",
+                mention_author=False,
+            )
+        with await read_upload(attachment) as fp:
+            try:
+                async with replacing_files(f"users/{user.id}"):
+                    await run_archive_job(
+                        import_tree,
+                        fp,
+                        f"data/users/{user.id}",
+                        ctx=ctx,
+                        label=f"Unpacking {user}'s data",
+                    )
+            except (ValueError, zipfile.BadZipFile) as e:
+                return await ctx.reply(
+                    content=f"That ZIP file is no good: `{e}`", mention_author=False
+                )
+        forget_user(user.id)
         await ctx.reply(content=f"{user}'s data saved.", mention_author=False)
 
     @commands.bot_has_permissions(attach_files=True)
@@ -346,6 +455,59 @@ class Admin(Cog):
             guildmsg += f"\n- {g.name} with `{g.member_count}` members."
         await ctx.reply(content=guildmsg, mention_author=False)
 
+    @commands.bot_has_permissions(embed_links=True)
+    @commands.check(ismanager)
+    @commands.command()
+    async def expiring(self, ctx):
+        """This shows the bot's expiring caches.
+
+        Useful for seeing if something's eating memory.
+
+        No arguments."""
+        embed = stock_embed(self.bot)
+        embed.title = "⏳ Expiring caches..."
+        embed.color = ctx.author.color
+        for name, expiring in sorted(maps.items()):
+            stats = expiring.stats()
+            embed.add_field(
+                name=name,
+                value=f"**Entries:** {stats['entries']}"
+                + (f"/{expiring.maxsize}" if expiring.maxsize else "")
+                + "\n"
+                + f"**Size:** {self.bot.filesize(stats['bytes'])}\n"
+                + f"**Hits/Misses:** {stats['hits']}/{stats['misses']}\n"
+                + f"**Expired:** {stats['expired']}\n"
+                + f"**Evicted:** {stats['evicted']}",
+            )
+        await ctx.reply(embed=embed, mention_author=False)
+
+    @commands.bot_has_permissions(embed_links=True)
+    @commands.check(ismanager)
+    @commands.command()
+    async def logqueue(self, ctx):
+        """This shows the log channel queues.
+
+        Includes how backed up each one is.
+
+        No arguments."""
+        embed = stock_embed(self.bot)
+        embed.title = "📨 Log queues..."
+        embed.color = ctx.author.color
+        for queue in list(queues.values())[:25]:
+            stats = queue.stats()
+            embed.add_field(
+                name=f"#{queue.channel.name} ({queue.channel.guild.name})",
+                value=f"**Depth:** {stats['depth']}\n"
+                + f"**Sent:** {stats['sent']} in {stats['messages']} messages\n"
+                + f"**Dropped:** {stats['dropped']}\n"
+                + f"**Failed:** {stats['failed']} ({stats['errors']} unexpected)\n"
+                + f"**Average:** {stats['latency'] * 1000:.0f}ms\n"
+                + f"**Slowest:** {stats['slowest'] * 1000:.0f}ms",
+            )
+        if not embed.fields:
+            embed.description = "Nothing's been logged yet."
+        await ctx.reply(embed=embed, mention_author=False)
+
     @commands.check(ismanager)
     @commands.guild_only()
     @commands.command()
@@ -415,7 +577,7 @@ class Admin(Cog):
 
         - `user`
         The user to bar."""
-        botusers = get_file("botusers")
+        botusers = await aget_file("botusers")
         if "botban" not in botusers:
             botusers["botban"] = []
         if user.id in botusers["botban"]:
@@ -423,7 +585,8 @@ class Admin(Cog):
                 content="This user is already botbanned.", mention_author=False
             )
         botusers["botban"].append(user.id)
-        set_file("botusers", json.dumps(botusers))
+        await aset_file("botusers", json.dumps(botusers))
+        set_botbanned(user.id, True)
         return await ctx.reply(
             content="This user is now botbanned.", mention_author=False
         )
@@ -437,7 +600,7 @@ class Admin(Cog):
 
         - `user`
         The user to unbar."""
-        botusers = get_file("botusers")
+        botusers = await aget_file("botusers")
         if "botban" not in botusers:
             botusers["botban"] = []
         if user.id not in botusers["botban"]:
@@ -445,7 +608,8 @@ class Admin(Cog):
                 content="This user is not already botbanned.", mention_author=False
             )
         botusers["botban"].remove(user.id)
-        set_file("botusers", json.dumps(botusers))
+        await aset_file("botusers", json.dumps(botusers))
+        set_botbanned(user.id, False)
         return await ctx.reply(
             content="This user is now unbotbanned.", mention_author=False
         )
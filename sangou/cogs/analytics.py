@@ -1,10 +1,15 @@
 import discord
 from discord.ext.commands import Cog
 from discord.ext import commands, tasks
-import json
-import shutil
-import os
-from helpers.datafiles import get_file, set_file
+import functools
+from helpers.datafiles import (
+    aget_file,
+    aset_file,
+    file_lock,
+    reading_files,
+    live_database,
+)
+from helpers.exports import export_tree, run_archive_job, send_archive
 
 
 class Analytics(Cog):
@@ -14,6 +19,8 @@ class Analytics(Cog):
 
     def __init__(self, bot):
         self.bot = bot
+        # Users getting the one-time notice right now.
+        self.warning = set()
 
     @commands.group(invoke_without_command=True)
     async def stats(self, ctx):
@@ -23,7 +30,7 @@ class Analytics(Cog):
         since I'm currently too lazy to code a page system.
 
         No arguments."""
-        useranalytics = get_file("analytics", f"users/{ctx.author.id}")
+        useranalytics = await aget_file("analytics", f"users/{ctx.author.id}")
         if not useranalytics:
             return await ctx.reply(
                 content="There are no analytics to show.", mention_author=False
@@ -43,17 +50,25 @@ class Analytics(Cog):
         It does not include reminders, as that is on a separate system.
 
         No arguments."""
-        try:
-            shutil.make_archive(
-                f"data/{ctx.author.id}", "zip", f"data/users/{ctx.author.id}"
-            )
-            sdata = discord.File(f"data/{ctx.author.id}.zip")
-            await ctx.message.reply(
-                content=f"`{ctx.author}`'s data...",
-                file=sdata,
+        if live_database():
+            return await ctx.reply(
+                content="Your data can't be packed up on its own here. Ask a bot manager for it.",
                 mention_author=False,
             )
-            os.remove(f"data/{ctx.author.id}.zip")
+        try:
+            async with reading_files(f"users/{ctx.author.id}"):
+                parts = await run_archive_job(
+                    export_tree,
+                    f"data/users/{ctx.author.id}",
+                    ctx=ctx,
+                    label="Packing your data",
+                )
+            await send_archive(
+                functools.partial(ctx.message.reply, mention_author=False),
+                f"`{ctx.author}`'s data...",
+                parts,
+                str(ctx.author.id),
+            )
         except FileNotFoundError:
             await ctx.message.reply(
                 content="You don't have any data.",
@@ -67,7 +82,7 @@ class Analytics(Cog):
         Please see the [privacy notice](https://3gou.0ccu.lt/introduction/privacy-notice/).
 
         No arguments."""
-        userdata = get_file("botusers")
+        userdata = await aget_file("botusers")
         if "nostats" not in userdata:
             userdata["nostats"] = []
         if ctx.author.id not in userdata["nostats"]:
@@ -75,7 +90,7 @@ class Analytics(Cog):
                 content="You already have analytics toggled on.", mention_author=False
             )
         userdata["nostats"].remove(ctx.author.id)
-        set_file("botusers", json.dumps(userdata))
+        await aset_file("botusers", userdata)
         return await ctx.reply(
             content="**Analytics for you have been toggled on.**",
             mention_author=False,
@@ -89,7 +104,7 @@ class Analytics(Cog):
         It will delete your analytics data as well.
 
         No arguments."""
-        userdata = get_file("botusers")
+        userdata = await aget_file("botusers")
         if "nostats" not in userdata:
             userdata["nostats"] = []
         if ctx.author.id in userdata["nostats"]:
@@ -97,78 +112,71 @@ class Analytics(Cog):
                 content="You already have analytics toggled off.", mention_author=False
             )
         userdata["nostats"].append(ctx.author.id)
-        set_file("botusers", json.dumps(userdata))
-        useranalytics = get_file("analytics", f"users/{ctx.author.id}")
+        await aset_file("botusers", userdata)
+        useranalytics = await aget_file("analytics", f"users/{ctx.author.id}")
         if not useranalytics:
             return await ctx.reply(
                 content="**Analytics for you have been toggled off.**\nAnalytics were not deleted as there is nothing to delete.",
                 mention_author=False,
             )
-        set_file("analytics", json.dumps({}), f"users/{ctx.author.id}")
+        await aset_file("analytics", {}, f"users/{ctx.author.id}")
         await ctx.reply(
             content="**Analytics for you have been toggled off.**",
             mention_author=False,
         )
 
-    @Cog.listener()
-    async def on_command_error(self, ctx, error):
-        await self.bot.wait_until_ready()
-        userdata = get_file("botusers")
-        if (
-            ctx.author.bot
-            or "nostats" in userdata
-            and ctx.author.id in userdata["nostats"]
-        ):
-            return
-        useranalytics = get_file("analytics", f"users/{ctx.author.id}")
-
-        if not useranalytics:
+    async def count_use(self, ctx, outcome):
+        subdir = f"users/{ctx.author.id}"
+        if not await aget_file("analytics", subdir):
+            if ctx.author.id in self.warning:
+                # Still being told, don't count it until they are.
+                return
+            # Not under the lock, a slow DM shouldn't hold up the file.
+            self.warning.add(ctx.author.id)
             try:
                 await ctx.author.send(
                     content=f"📡 **Analytics Warning**\nThis is a one-time notice to inform you that commands used are logged for analytics purposes.\nPlease see the below link for more information.\n> <https://3gou.0ccu.lt/introduction/privacy-notice/>\n\nIf you do not consent to this, please run `{ctx.prefix}stats disable`.\nThis will disable user analytics collection for you, and delete your analytics data."
                 )
             except:
                 # don't save analytics unless user is informed
+                self.warning.discard(ctx.author.id)
                 return
 
-        if str(ctx.command) not in useranalytics:
-            useranalytics[str(ctx.command)] = {
-                "success": 0,
-                "failure": 0,
-            }
+        async with file_lock("analytics", subdir):
+            useranalytics = await aget_file("analytics", subdir)
+            if str(ctx.command) not in useranalytics:
+                useranalytics[str(ctx.command)] = {
+                    "success": 0,
+                    "failure": 0,
+                }
+            useranalytics[str(ctx.command)][outcome] += 1
+            await aset_file("analytics", useranalytics, subdir)
+        # Saved now, so nobody else will tell them again.
+        self.warning.discard(ctx.author.id)
 
-        useranalytics[str(ctx.command)]["failure"] += 1
-        set_file("analytics", json.dumps(useranalytics), f"users/{ctx.author.id}")
+    @Cog.listener()
+    async def on_command_error(self, ctx, error):
+        await self.bot.wait_until_ready()
+        userdata = await aget_file("botusers")
+        if (
+            ctx.author.bot
+            or "nostats" in userdata
+            and ctx.author.id in userdata["nostats"]
+        ):
+            return
+        await self.count_use(ctx, "failure")
 
     @Cog.listener()
     async def on_command_completion(self, ctx):
         await self.bot.wait_until_ready()
-        userdata = get_file("botusers")
+        userdata = await aget_file("botusers")
         if (
             ctx.author.bot
             or "nostats" in userdata
             and ctx.author.id in userdata["nostats"]
         ):
             return
-        useranalytics = get_file("analytics", f"users/{ctx.author.id}")
-
-        if not useranalytics:
-            try:
-                await ctx.author.send(
-                    content=f"📡 **Analytics Warning**\nThis is a one-time notice to inform you that commands used are logged for analytics purposes.\nPlease see the below link for more information.\n> <https://3gou.0ccu.lt/introduction/privacy-notice/>\n\nIf you do not consent to this, please run `{ctx.prefix}stats disable`.\nThis will disable user analytics collection for you, and delete your analytics data."
-                )
-            except:
-                # don't save analytics unless user is informed
-                return
-
-        if str(ctx.command) not in useranalytics:
-            useranalytics[str(ctx.command)] = {
-                "success": 0,
-                "failure": 0,
-            }
-
-        useranalytics[str(ctx.command)]["success"] += 1
-        set_file("analytics", json.dumps(useranalytics), f"users/{ctx.author.id}")
+        await self.count_use(ctx, "success")
 
 
 async def setup(bot):
@@ -14,7 +14,7 @@ from datetime import datetime, timezone
 from discord.ext import commands
 from discord.ext.commands import Cog
 from helpers.embeds import stock_embed, author_embed
-from helpers.datafiles import fill_profile
+from helpers.datafiles import afill_profile
 from zoneinfo import ZoneInfo, available_timezones
 import aiohttp
 import re as ren
@@ -890,7 +890,7 @@ class Basic(Cog):
 
         No arguments."""
         async with ctx.channel.typing():
-            profile = fill_profile(ctx.author.id)
+            profile = await afill_profile(ctx.author.id)
             if profile["timezone"]:
                 timezone = ZoneInfo(profile["timezone"])
             else:
@@ -4,6 +4,7 @@ import discord
 from discord.ext import commands
 from helpers.sv_config import get_config
 from helpers.embeds import stock_embed
+from helpers.logqueue import send_log, MOD
 
 
 class CogBurstReacts(commands.Cog, name="Burst reactions handler"):
@@ -57,7 +58,7 @@ class CogBurstReacts(commands.Cog, name="Burst reactions handler"):
             icon_url=author.display_avatar.url,
         )
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.Cog.listener()
     async def on_socket_raw_receive(self, msg: str):
@@ -3,18 +3,24 @@ import traceback
 import datetime
 import discord
 import time
-import json
 import math
 import parsedatetime
-from helpers.datafiles import get_file, set_file
-from helpers.sv_config import get_config
+from helpers.sv_config import get_config, fill_config
+from helpers.policy import GuildPolicy
+from helpers.expiring import ExpiringMap, sweep_maps
+from helpers.audit import add_entry
+from helpers.invites import tracker_for, used_invite
 from helpers.placeholders import random_msg
+from discord.ext import tasks
 from discord.ext.commands import Cog
 
 
 class Common(Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.policies = {}
+        self.nameindex = {}
+        self.contexts = ExpiringMap("contexts", ttl=30, maxsize=1000)
         self.bot.async_call_shell = self.async_call_shell
         self.bot.slice_message = self.slice_message
         self.bot.hex_to_int = self.hex_to_int
@@ -36,36 +42,181 @@ class Common(Cog):
         self.bot.pull_role = self.pull_role
         self.bot.pull_channel = self.pull_channel
         self.bot.pull_category = self.pull_category
+        self.bot.pull_policy = self.pull_policy
+        self.bot.pull_context = self.pull_context
         self.bot.pacify_name = self.pacify_name
+        self.sweeper.start()
+
+    def cog_unload(self):
+        self.sweeper.cancel()
+
+    @tasks.loop(minutes=1)
+    async def sweeper(self):
+        # Drops expired entries from every ExpiringMap.
+        sweep_maps()
+
+    def index_kind(self, o):
+        if isinstance(o, discord.Role):
+            return "roles"
+        if isinstance(o, discord.CategoryChannel):
+            return "categories"
+        if isinstance(o, (discord.TextChannel, discord.VoiceChannel, discord.Thread)):
+            return "channels"
+        return None
+
+    def index_objects(self, guild, kind):
+        if kind == "roles":
+            return guild.roles
+        if kind == "categories":
+            return guild.categories
+        return (
+            list(guild.text_channels) + list(guild.voice_channels) + list(guild.threads)
+        )
+
+    def name_index(self, guild, kind):
+        # Name lookups keep the first match, same as discord.utils.get.
+        indexes = self.nameindex.setdefault(guild.id, {})
+        if kind not in indexes:
+            indexes[kind] = {}
+            for o in self.index_objects(guild, kind):
+                indexes[kind].setdefault(o.name, o)
+        return indexes[kind]
+
+    def unindex_name(self, guild, o, name):
+        # Another one with the same name takes its place, if there is one.
+        kind = self.index_kind(o)
+        index = self.nameindex.get(guild.id, {}).get(kind)
+        if index is None or name not in index or index[name].id != o.id:
+            return
+        del index[name]
+        for other in self.index_objects(guild, kind):
+            if other.name == name and other.id != o.id:
+                index[name] = other
+                break
+
+    def index_name(self, guild, o):
+        index = self.nameindex.get(guild.id, {}).get(self.index_kind(o))
+        if index is None:
+            return
+        if o.name not in index or index[o.name].id == o.id:
+            index[o.name] = o
 
     def pull_role(self, guild, role):
         if isinstance(role, str):
-            role = discord.utils.get(guild.roles, name=role)
+            role = self.name_index(guild, "roles").get(role)
         else:
             role = guild.get_role(role)
         return role
 
     def pull_channel(self, guild, channel):
         if isinstance(channel, str):
-            channel = discord.utils.get(
-                list(guild.text_channels)
-                + list(guild.voice_channels)
-                + list(guild.threads),
-                name=channel,
-            )
+            channel = self.name_index(guild, "channels").get(channel)
         else:
             channel = guild.get_channel_or_thread(channel)
         return channel
 
     def pull_category(self, guild, category):
         if isinstance(category, str):
-            category = discord.utils.get(guild.categories, name=category)
+            category = self.name_index(guild, "categories").get(category)
         else:
             category = guild.get_channel(category)
             if category and type(category) != discord.CategoryChannel:
                 category = None
         return category
 
+    async def pull_context(self, message):
+        # One get_context per message, shared by every listener that asks.
+        # Only on_message should invoke these, the others just look.
+        key = (message.id, message.content)
+        ctx = self.contexts.get(key)
+        if ctx is None:
+            ctx = await self.bot.get_context(message)
+            self.contexts[key] = ctx
+        return ctx
+
+    def pull_policy(self, guild):
+        config = fill_config(guild.id)
+        policy = self.policies.get(guild.id)
+        if not policy or policy.config is not config or policy.guild is not guild:
+            policy = GuildPolicy(self.bot, guild, config)
+            self.policies[guild.id] = policy
+        return policy
+
+    def drop_policy(self, guild):
+        self.policies.pop(guild.id, None)
+        self.nameindex.pop(guild.id, None)
+
+    def update_index(self, guild, before=None, after=None):
+        # A role, channel or thread came, went or changed. The policy is
+        # pulled again, but the name index only changes for this one.
+        self.policies.pop(guild.id, None)
+        if before and (not after or before.name != after.name):
+            self.unindex_name(guild, before, before.name)
+        if after:
+            self.index_name(guild, after)
+
+    @Cog.listener()
+    async def on_guild_role_create(self, role):
+        self.update_index(role.guild, after=role)
+
+    @Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.update_index(role.guild, before=role)
+
+    @Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        self.update_index(after.guild, before, after)
+
+    @Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.update_index(channel.guild, after=channel)
+
+    @Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.update_index(channel.guild, before=channel)
+
+    @Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        self.update_index(after.guild, before, after)
+
+    @Cog.listener()
+    async def on_thread_create(self, thread):
+        self.update_index(thread.guild, after=thread)
+
+    @Cog.listener()
+    async def on_thread_join(self, thread):
+        self.update_index(thread.guild, after=thread)
+
+    @Cog.listener()
+    async def on_thread_update(self, before, after):
+        self.update_index(after.guild, before, after)
+
+    @Cog.listener()
+    async def on_thread_remove(self, thread):
+        self.update_index(thread.guild, before=thread)
+
+    @Cog.listener()
+    async def on_thread_delete(self, thread):
+        self.update_index(thread.guild, before=thread)
+
+    @Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.drop_policy(guild)
+
+    @Cog.listener()
+    async def on_audit_log_entry_create(self, entry):
+        add_entry(entry)
+
+    @Cog.listener()
+    async def on_invite_create(self, invite):
+        if invite.guild:
+            (await tracker_for(invite.guild)).created(invite)
+
+    @Cog.listener()
+    async def on_invite_delete(self, invite):
+        if invite.guild:
+            (await tracker_for(invite.guild)).deleted(invite)
+
     def pacify_name(self, name):
         return discord.utils.escape_markdown(name.replace("@", "@ "))
 
@@ -146,54 +297,7 @@ class Common(Cog):
 
     async def get_used_invites(self, member: discord.Member):
         """Handles the invite correlation stuff"""
-        try:
-            real_invites = await member.guild.invites()
-        except:
-            return "Unable: Missing Permissions."
-        invites = get_file("invites", f"servers/{member.guild.id}")
-
-        # Add unknown active invites. Can happen if invite was manually created
-        for invite in real_invites:
-            if invite.id not in invites:
-                invites[invite.id] = {
-                    "uses": 0,
-                    "url": invite.url,
-                    "max_uses": invite.max_uses,
-                    "code": invite.code,
-                }
-
-        probable_invites_used = []
-        items_to_delete = []
-        # Look for invites whose usage increased since last lookup
-        for id, invite in invites.items():
-            real_invite = next((x for x in real_invites if x.id == id), None)
-
-            if not real_invite:
-                # Invite does not exist anymore. Was either revoked manually
-                # or the final use was used up
-                probable_invites_used.append(invite)
-                items_to_delete.append(id)
-            elif invite["uses"] < real_invite.uses:
-                probable_invites_used.append(invite)
-                invite["uses"] = real_invite.uses
-
-        # Delete used up invites
-        for id in items_to_delete:
-            del invites[id]
-
-        # Save invites data.
-        set_file("invites", json.dumps(invites), f"servers/{member.guild.id}")
-
-        # Prepare the invite correlation message
-        if len(probable_invites_used) == 1:
-            invite_used = probable_invites_used[0]["code"]
-        elif len(probable_invites_used) == 0:
-            invite_used = "Unknown"
-        else:
-            invite_used = "One of: "
-            invite_used += ", ".join([x["code"] for x in probable_invites_used])
-
-        return invite_used
+        return await used_invite(member)
 
     async def await_message(self, channel, author, timeout=60):
         """Nice wrapper for waiting for a message"""
@@ -7,6 +7,7 @@ import datetime
 import random
 from helpers.checks import ismod
 from helpers.sv_config import get_config
+from helpers.expiring import ExpiringMap
 
 
 class Cotd(Cog):
@@ -17,7 +18,8 @@ class Cotd(Cog):
     def __init__(self, bot):
         self.bot = bot
         self.colortimer.start()
-        self.voteskip = {}
+        # Votes only count for the day's color.
+        self.voteskip = ExpiringMap("voteskip", ttl=86400, maxsize=1000)
         self.voteskip_cooldown = []
         self.nocfgmsg = "CoTD isn't set up for this server."
         self.colors = json.load(open("assets/colors.json", "r"))
@@ -26,11 +28,15 @@ class Cotd(Cog):
         self.colortimer.cancel()
 
     def enabled(self, g):
-        return all(
-            (
-                self.bot.pull_role(g, get_config(g.id, "cotd", "cotdrole")),
-                get_config(g.id, "cotd", "cotdname"),
-            )
+        policy = self.bot.pull_policy(g)
+        return policy.flag(
+            "cotd",
+            lambda: all(
+                (
+                    policy.role("cotd", "cotdrole"),
+                    policy.get("cotd", "cotdname"),
+                )
+            ),
         )
 
     async def roll_colors(self, guild):
@@ -46,7 +52,7 @@ class Cotd(Cog):
 
     def precedence_check(self, guild):
         return datetime.datetime.now() > datetime.datetime.now().replace(
-            hour=24 - len(self.voteskip[guild.id]), minute=0, second=0
+            hour=24 - len(self.voteskip.get(guild.id, [])), minute=0, second=0
         )
 
     @commands.guild_only()
@@ -102,8 +108,7 @@ class Cotd(Cog):
                 mention_author=False,
             )
 
-        if ctx.guild.id not in self.voteskip:
-            self.voteskip[ctx.guild.id] = []
+        self.voteskip.setdefault(ctx.guild.id, [])
 
         if ctx.author.id in self.voteskip[ctx.guild.id]:
             timestamp = int(
@@ -173,10 +178,8 @@ class Cotd(Cog):
         await self.bot.wait_until_ready()
         for g in self.bot.guilds:
             if self.enabled(g):
-                if g.id not in self.voteskip:
-                    self.voteskip[g.id] = []
-                if self.voteskip[g.id] and self.precedence_check(g):
-                    self.voteskip[g.id] = []
+                if self.voteskip.get(g.id) and self.precedence_check(g):
+                    self.voteskip.pop(g.id)
                     await self.roll_colors(g)
                 elif int(datetime.datetime.now().strftime("%H%M")) == 0000:
                     if g.id in self.voteskip_cooldown:
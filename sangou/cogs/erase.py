@@ -9,7 +9,7 @@ import zipfile
 import os
 import aiohttp
 from helpers.sv_config import get_config
-from helpers.datafiles import get_file, set_file
+from helpers.datafiles import aget_file, aset_file
 from helpers.placeholders import random_msg
 
 
@@ -23,14 +23,14 @@ class Erase(Cog):
         self.verifycode = format(random.getrandbits(128), "x")[:10]
         self.bot.loop.create_task(self.process_erased())
 
-    def add_erased(self, guild, user, keywords, channels):
-        erasequeue = get_file("erasures", f"servers/{guild.id}")
+    async def add_erased(self, guild, user, keywords, channels):
+        erasequeue = await aget_file("erasures", f"servers/{guild.id}")
         erasequeue[user.id] = {
             "keywords": keywords,
             "channels": channels,
             "completed": [],
         }
-        set_file("erasures", json.dumps(erasequeue), f"servers/{guild.id}")
+        await aset_file("erasures", json.dumps(erasequeue), f"servers/{guild.id}")
 
     async def process_erased(self):
         await self.bot.wait_until_ready()
@@ -39,7 +39,7 @@ class Erase(Cog):
         while True:
             # Guild loop.
             for g in self.bot.guilds:
-                erasequeue = get_file("erasures", f"servers/{g.id}")
+                erasequeue = await aget_file("erasures", f"servers/{g.id}")
                 if not erasequeue:
                     continue
                 # User loop.
@@ -56,7 +56,7 @@ class Erase(Cog):
                             except:
                                 # Assume channel already deleted.
                                 erasequeue[userid]["channels"].append(channel)
-                                set_file(
+                                await aset_file(
                                     "erasures",
                                     json.dumps(erasequeue),
                                     f"servers/{g.id}",
@@ -141,7 +141,9 @@ class Erase(Cog):
                             except:
                                 continue
                         erasequeue[userid]["completed"].append(channel.id)
-                        set_file("erasures", json.dumps(erasequeue), f"servers/{g.id}")
+                        await aset_file(
+                            "erasures", json.dumps(erasequeue), f"servers/{g.id}"
+                        )
                     if os.path.exists("data/erasedbatch.zip"):
                         with open("data/erasedbatch.zip", "rb") as batchfile:
                             formdata = aiohttp.FormData()
@@ -160,7 +162,9 @@ class Erase(Cog):
                         "All messages that could be deleted have been deleted."
                     )
                     del erasequeue[userid]
-                    set_file("erasures", json.dumps(erasequeue), f"servers/{g.id}")
+                    await aset_file(
+                        "erasures", json.dumps(erasequeue), f"servers/{g.id}"
+                    )
             await asyncio.sleep(60)
 
     @commands.bot_has_permissions(manage_messages=True)
@@ -175,7 +179,7 @@ class Erase(Cog):
 
         - `verify`
         The code required to activate this command. Optional."""
-        erasequeue = get_file("erasures", f"servers/{ctx.guild.id}")
+        erasequeue = await aget_file("erasures", f"servers/{ctx.guild.id}")
         if str(ctx.author.id) in erasequeue:
             return await ctx.reply(
                 content=f"You have already requested to delete your messages from `{ctx.guild.name}`.",
@@ -272,7 +276,7 @@ class Erase(Cog):
                     mention_author=False,
                 )
 
-            self.add_erased(ctx.guild, ctx.author, keywords, channels)
+            await self.add_erased(ctx.guild, ctx.author, keywords, channels)
             return await ctx.reply(
                 content=f"You have requested to delete your messages from `{ctx.guild.name}`. This __cannot__ be undone.\nIt may take a while for the process to begin.",
                 mention_author=False,
@@ -4,8 +4,9 @@ import json
 import re
 import datetime
 import os
-from helpers.datafiles import add_userlog, get_file
-from helpers.sv_config import get_config
+from helpers.datafiles import add_userlog, is_warned, get_user_log
+from helpers.audit import find_entry, entry_user
+from helpers.logqueue import send_log, MOD, NORMAL, NOISE
 from helpers.embeds import (
     stock_embed,
     slice_embed,
@@ -28,9 +29,7 @@ class Logs2(Cog):
     async def on_member_join(self, member):
         await self.bot.wait_until_ready()
 
-        ulog = self.bot.pull_channel(
-            member.guild, get_config(member.guild.id, "logging", "userlog")
-        )
+        ulog = self.bot.pull_policy(member.guild).channel("logging", "userlog")
         if not ulog:
             return
 
@@ -47,25 +46,22 @@ class Logs2(Cog):
 
         embeds.append(embed)
 
-        userlog = get_file("userlog", f"servers/{member.guild.id}")
-        try:
-            if userlog[str(member.id)]["warns"]:
-                embed = stock_embed(self.bot)
-                embed.color = discord.Color.red()
-                embed.title = "⚠️ This user has warnings!"
-                for idx, timestamp in enumerate(userlog[str(member.id)]["warns"]):
-                    event = userlog[str(member.id)]["warns"][timestamp]
-                    embed.add_field(
-                        name=f"Warn {idx + 1}: <t:{timestamp}:f> (<t:{timestamp}:R>)",
-                        value=f"__Issuer:__ <@{event['issuer_id']}> ({event['issuer_id']})\n"
-                        f"\n__Reason:__ {event['reason']}",
-                        inline=False,
-                    )
-                embeds.append(embed)
-        except KeyError:  # if the user is not in the file
-            pass
+        if await is_warned(member.guild.id, member.id):
+            warns = (await get_user_log(member.guild.id, member.id))["warns"]
+            embed = stock_embed(self.bot)
+            embed.color = discord.Color.red()
+            embed.title = "⚠️ This user has warnings!"
+            for idx, timestamp in enumerate(warns):
+                event = warns[timestamp]
+                embed.add_field(
+                    name=f"Warn {idx + 1}: <t:{timestamp}:f> (<t:{timestamp}:R>)",
+                    value=f"__Issuer:__ <@{event['issuer_id']}> ({event['issuer_id']})\n"
+                    f"\n__Reason:__ {event['reason']}",
+                    inline=False,
+                )
+            embeds.append(embed)
 
-        await ulog.send(embeds=embeds)
+        await send_log(ulog, embeds=embeds, priority=NORMAL)
 
     @Cog.listener()
     async def on_message_edit(self, before, after):
@@ -77,9 +73,7 @@ class Logs2(Cog):
         ):
             return
 
-        ulog = self.bot.pull_channel(
-            after.guild, get_config(after.guild.id, "logging", "userlog")
-        )
+        ulog = self.bot.pull_policy(after.guild).channel("logging", "userlog")
         if not ulog:
             return
 
@@ -107,7 +101,7 @@ class Logs2(Cog):
             f"⭕ After on <t:{int(after.edited_at.astimezone().timestamp())}:f>",
         )
 
-        await ulog.send(embed=embed)
+        await send_log(ulog, embed=embed, priority=NOISE)
 
     @Cog.listener()
     async def on_message_delete(self, message):
@@ -115,9 +109,7 @@ class Logs2(Cog):
         if message.author.bot or not message.guild:
             return
 
-        ulog = self.bot.pull_channel(
-            message.guild, get_config(message.guild.id, "logging", "userlog")
-        )
+        ulog = self.bot.pull_policy(message.guild).channel("logging", "userlog")
         if not ulog:
             return
 
@@ -133,64 +125,57 @@ class Logs2(Cog):
             f"🧾 Sent on <t:{int(message.created_at.astimezone().timestamp())}:f>:",
         )
 
-        await ulog.send(embed=embed)
+        await send_log(ulog, embed=embed, priority=NOISE)
 
     @Cog.listener()
     async def on_member_remove(self, member):
         await self.bot.wait_until_ready()
 
-        ulog = self.bot.pull_channel(
-            member.guild, get_config(member.guild.id, "logging", "userlog")
-        )
-        mlog = self.bot.pull_channel(
-            member.guild, get_config(member.guild.id, "logging", "modlog")
-        )
+        ulog = self.bot.pull_policy(member.guild).channel("logging", "userlog")
+        mlog = self.bot.pull_policy(member.guild).channel("logging", "modlog")
         if not ulog and not mlog:
             return
 
-        try:
-            await member.guild.fetch_ban(member)
-            return
-        except discord.NotFound:
-            pass
-        except discord.Forbidden:
-            # Put in a "no permissions to check why!" disclaimer
+        # Bans are handled in on_member_ban.
+        # Most leaves aren't kicks, so this only waits a moment for the
+        # gateway entry, which can trail the leave. It never fetches the
+        # audit log unless those entries can't arrive.
+        entry = await find_entry(
+            member.guild,
+            (discord.AuditLogAction.kick, discord.AuditLogAction.ban),
+            member.id,
+            timeout=1 if self.bot.intents.moderation else 0,
+            since=5,
+            fallback=not self.bot.intents.moderation,
+        )
+        if entry and entry.action == discord.AuditLogAction.ban:
             return
+        if entry:
+            if entry.user_id != self.bot.user.id:
+                staff = await entry_user(self.bot, entry)
+                add_userlog(
+                    member.guild.id,
+                    member.id,
+                    staff,
+                    "Kicked by external method.",
+                    "kicks",
+                )
+                if not mlog:
+                    return
 
-        alog = [
-            entry
-            async for entry in member.guild.audit_logs(
-                limit=1, action=discord.AuditLogAction.kick
-            )
-        ]
-        if alog and alog[0].target.id == member.id:
-            cutoff_ts = datetime.datetime.now(
-                datetime.timezone.utc
-            ) - datetime.timedelta(seconds=5)
-            if not alog[0].created_at <= cutoff_ts:
-                if alog[0].user.id != self.bot.user.id:
-                    add_userlog(
-                        member.guild.id,
-                        member.id,
-                        alog[0].user,
-                        "Kicked by external method.",
-                        "kicks",
-                    )
-                    if not mlog:
-                        return
-
-                    user = member
-                    staff = alog[0].user
-                    reason = alog[0].reason
+                user = member
+                reason = entry.reason
 
-                    embed = stock_embed(self.bot)
-                    embed.color = discord.Color.from_str("#FFFF00")
-                    embed.title = "👢 Kick"
-                    embed.description = f"{user.mention} was kicked by {staff.mention} [External Method]"
-                    mod_embed(embed, user, staff, reason)
+                embed = stock_embed(self.bot)
+                embed.color = discord.Color.from_str("#FFFF00")
+                embed.title = "👢 Kick"
+                embed.description = (
+                    f"{user.mention} was kicked by {staff.mention} [External Method]"
+                )
+                mod_embed(embed, user, staff, reason)
 
-                    await mlog.send(embed=embed)
-                return
+                await send_log(mlog, embed=embed, priority=MOD)
+            return
 
         if not ulog:
             return
@@ -203,36 +188,31 @@ class Logs2(Cog):
         createdat_embed(embed, member)
         joinedat_embed(embed, member)
 
-        await ulog.send(embed=embed)
+        await send_log(ulog, embed=embed, priority=NORMAL)
 
     @Cog.listener()
     async def on_member_ban(self, guild, member):
         await self.bot.wait_until_ready()
 
-        alog = [
-            entry
-            async for entry in guild.audit_logs(
-                limit=1, action=discord.AuditLogAction.ban
-            )
-        ]
-        if alog[0].user.id == self.bot.user.id or alog[0].target.id != member.id:
+        entry = await find_entry(guild, discord.AuditLogAction.ban, member.id)
+        if not entry or entry.user_id == self.bot.user.id:
             return
+        staff = await entry_user(self.bot, entry)
 
         add_userlog(
             guild.id,
             member.id,
-            alog[0].user,
+            staff,
             "Banned by external method.",
             "bans",
         )
 
-        mlog = self.bot.pull_channel(guild, get_config(guild.id, "logging", "modlog"))
+        mlog = self.bot.pull_policy(guild).channel("logging", "modlog")
         if not mlog:
             return
 
         user = member
-        staff = alog[0].user
-        reason = alog[0].reason
+        reason = entry.reason
 
         embed = stock_embed(self.bot)
         embed.color = discord.Color.from_str("#FF0000")
@@ -242,28 +222,22 @@ class Logs2(Cog):
         )
         mod_embed(embed, user, staff, reason)
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @Cog.listener()
     async def on_member_unban(self, guild, user):
         await self.bot.wait_until_ready()
 
-        mlog = self.bot.pull_channel(guild, get_config(guild.id, "logging", "modlog"))
+        mlog = self.bot.pull_policy(guild).channel("logging", "modlog")
         if not mlog:
             return
 
-        alog = [
-            entry
-            async for entry in guild.audit_logs(
-                limit=1, action=discord.AuditLogAction.unban
-            )
-        ]
-        if alog[0].user.id == self.bot.user.id:
+        entry = await find_entry(guild, discord.AuditLogAction.unban, user.id)
+        if not entry or entry.user_id == self.bot.user.id:
             return
 
-        user = user
-        staff = alog[0].user
-        reason = alog[0].reason
+        staff = await entry_user(self.bot, entry)
+        reason = entry.reason
 
         embed = stock_embed(self.bot)
         embed.color = discord.Color.from_str("#00FF00")
@@ -273,16 +247,14 @@ class Logs2(Cog):
         )
         mod_embed(embed, user, staff, reason)
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @Cog.listener()
     async def on_user_update(self, user_before, user_after):
         await self.bot.wait_until_ready()
 
         for guild in self.bot.guilds:
-            ulog = self.bot.pull_channel(
-                guild, get_config(guild.id, "logging", "userlog")
-            )
+            ulog = self.bot.pull_policy(guild).channel("logging", "userlog")
             member = guild.get_member(user_after.id)
             if not ulog or not member:
                 continue
@@ -310,15 +282,13 @@ class Logs2(Cog):
                 )
 
             if embed.fields:
-                await ulog.send(embed=embed)
+                await send_log(ulog, embed=embed, priority=NORMAL)
 
     @Cog.listener()
     async def on_member_update(self, member_before, member_after):
         await self.bot.wait_until_ready()
 
-        ulog = self.bot.pull_channel(
-            member_after.guild, get_config(member_after.guild.id, "logging", "userlog")
-        )
+        ulog = self.bot.pull_policy(member_after.guild).channel("logging", "userlog")
         if not ulog:
             return
 
@@ -367,15 +337,13 @@ class Logs2(Cog):
             )
 
         if embed.fields:
-            await ulog.send(embed=embed)
+            await send_log(ulog, embed=embed, priority=NORMAL)
 
     @Cog.listener()
     async def on_guild_update(self, guild_before, guild_after):
         await self.bot.wait_until_ready()
 
-        slog = self.bot.pull_channel(
-            guild_after, get_config(guild_after.id, "logging", "serverlog")
-        )
+        slog = self.bot.pull_policy(guild_after).channel("logging", "serverlog")
         if not slog:
             return
 
@@ -412,15 +380,13 @@ class Logs2(Cog):
             pass
 
         if embed.fields:
-            await slog.send(embed=embed)
+            await send_log(slog, embed=embed, priority=NORMAL)
 
     @Cog.listener()
     async def on_guild_channel_create(self, channel):
         await self.bot.wait_until_ready()
 
-        slog = self.bot.pull_channel(
-            channel.guild, get_config(channel.guild.id, "logging", "serverlog")
-        )
+        slog = self.bot.pull_policy(channel.guild).channel("logging", "serverlog")
         if not slog:
             return
 
@@ -430,15 +396,13 @@ class Logs2(Cog):
         embed.description = f"`{str(channel.category)}/`#{channel.name} ({channel.id}) [{channel.mention}]"
         author_embed(embed, channel.guild)
 
-        await slog.send(embed=embed)
+        await send_log(slog, embed=embed, priority=NORMAL)
 
     @Cog.listener()
     async def on_guild_channel_delete(self, channel):
         await self.bot.wait_until_ready()
 
-        slog = self.bot.pull_channel(
-            channel.guild, get_config(channel.guild.id, "logging", "serverlog")
-        )
+        slog = self.bot.pull_policy(channel.guild).channel("logging", "serverlog")
         if not slog:
             return
 
@@ -448,16 +412,13 @@ class Logs2(Cog):
         embed.description = f"`{str(channel.category)}/`#{channel.name} ({channel.id})"
         author_embed(embed, channel.guild)
 
-        await slog.send(embed=embed)
+        await send_log(slog, embed=embed, priority=NORMAL)
 
     @Cog.listener()
     async def on_guild_channel_update(self, channel_before, channel_after):
         await self.bot.wait_until_ready()
 
-        slog = self.bot.pull_channel(
-            channel_after.guild,
-            get_config(channel_after.guild.id, "logging", "serverlog"),
-        )
+        slog = self.bot.pull_policy(channel_after.guild).channel("logging", "serverlog")
         if not slog:
             return
 
@@ -633,15 +594,13 @@ class Logs2(Cog):
             )
 
         if embed.fields:
-            await slog.send(embed=embed)
+            await send_log(slog, embed=embed, priority=NORMAL)
 
     @Cog.listener()
     async def on_guild_role_create(self, role):
         await self.bot.wait_until_ready()
 
-        slog = self.bot.pull_channel(
-            role.guild, get_config(role.guild.id, "logging", "serverlog")
-        )
+        slog = self.bot.pull_policy(role.guild).channel("logging", "serverlog")
         if not slog:
             return
 
@@ -655,15 +614,13 @@ class Logs2(Cog):
         )
         author_embed(embed, role.guild)
 
-        await slog.send(embed=embed)
+        await send_log(slog, embed=embed, priority=NORMAL)
 
     @Cog.listener()
     async def on_guild_role_delete(self, role):
         await self.bot.wait_until_ready()
 
-        slog = self.bot.pull_channel(
-            role.guild, get_config(role.guild.id, "logging", "serverlog")
-        )
+        slog = self.bot.pull_policy(role.guild).channel("logging", "serverlog")
         if not slog:
             return
 
@@ -676,15 +633,13 @@ class Logs2(Cog):
             icon_url=role.guild.icon.url,
         )
 
-        await slog.send(embed=embed)
+        await send_log(slog, embed=embed, priority=NORMAL)
 
     @Cog.listener()
     async def on_guild_role_update(self, role_before, role_after):
         await self.bot.wait_until_ready()
 
-        slog = self.bot.pull_channel(
-            role_after.guild, get_config(role_after.guild.id, "logging", "serverlog")
-        )
+        slog = self.bot.pull_policy(role_after.guild).channel("logging", "serverlog")
         if not slog:
             return
 
@@ -811,7 +766,7 @@ class Logs2(Cog):
             )
 
         if embed.fields:
-            await slog.send(embed=embed)
+            await send_log(slog, embed=embed, priority=NORMAL)
 
 
 async def setup(bot):
@@ -8,6 +8,8 @@ from discord.ext.commands import Cog, Context, Bot
 from discord.ext import commands
 from helpers.checks import ismod
 from helpers.sv_config import get_config
+from helpers.pipeline import add_stage, remove_stage
+from helpers.snipes import Snapshot, SnipeHistory
 
 
 class Messagescan(Cog):
@@ -21,9 +23,11 @@ class Messagescan(Cog):
             r"https://(?:www\.)?tiktok\.com/@[A-z0-9]+/video/[0-9]+",
             re.IGNORECASE,
         )
-        self.prevmessages = {}
-        self.prevedit_before = {}
-        self.prevedit_after = {}
+        # Snipes don't need to survive the day.
+        depth = getattr(self.bot.config, "snipedepth", 10)
+        budget = getattr(self.bot.config, "snipebudget", 4) * 1024 * 1024
+        self.prevmessages = SnipeHistory("prevmessages", depth, budget)
+        self.prevedits = SnipeHistory("prevedits", depth, budget)
         self.langs = {
             "🇧🇬": {"name": "Bulgarian", "deeplcode": "BG", "gtcode": "bg"},
             "🇨🇿": {"name": "Czech", "deeplcode": "CS", "gtcode": "cs"},
@@ -57,122 +61,139 @@ class Messagescan(Cog):
             "🇺🇦": {"name": "Ukrainian", "deeplcode": "UK", "gtcode": "uk"},
             "🇨🇳": {"name": "Simplified Chinese", "deeplcode": "ZH", "gtcode": "zh-cn"},
         }
+        add_stage(
+            "messagescan",
+            self.process_message,
+            lambda m: m.content
+            and self.bot.pull_policy(m.guild).get("reaction", "embedenable"),
+        )
+
+    def cog_unload(self):
+        remove_stage("messagescan")
+
+    def snipe_field(self, embed, name, content, attachments=()):
+        # Split if too long.
+        if attachments:
+            content += "\n" + "\n".join(attachments)
+        if len(content) > 1024:
+            embed.add_field(
+                name=name,
+                value=f"**Message was too long to post!** Split into fragments below.",
+                inline=False,
+            )
+            for ctr, p in enumerate(
+                self.bot.slice_message(content, size=1024, prefix=">>> "), 1
+            ):
+                embed.add_field(
+                    name=f"🧩 Fragment {ctr}",
+                    value=p,
+                    inline=True,
+                )
+        else:
+            embed.add_field(
+                name=name,
+                value=f">>> {content}" if content else "*No content.*",
+                inline=False,
+            )
 
     @commands.bot_has_permissions(embed_links=True)
     @commands.check(ismod)
     @commands.guild_only()
     @commands.command()
-    async def snipe(self, ctx):
-        """This shows the last deleted message in a channel.
+    async def snipe(self, ctx, index: int = 1):
+        """This shows a deleted message in a channel.
 
-        It will *only* be the last deleted message.
+        Only the last few deleted messages are kept.
         Hope you have logs if you wanted older!
 
-        No arguments."""
-        if ctx.channel.id in self.prevmessages:
-            lastmsg = self.prevmessages[ctx.channel.id]
-            # Prepare embed msg
-            embed = discord.Embed(
-                color=ctx.author.color,
-                description=lastmsg.content,
-                timestamp=lastmsg.created_at,
-            )
-            embed.set_footer(
-                text=f"Sniped by {ctx.author}",
-                icon_url=ctx.author.display_avatar.url,
-            )
-            embed.set_author(
-                name=f"💬 {lastmsg.author} said in #{lastmsg.channel.name}...",
-                icon_url=lastmsg.author.display_avatar.url,
-            )
-            await ctx.reply(embed=embed, mention_author=False)
-        else:
-            await ctx.reply(
-                content="There is no message delete in the snipe cache for this channel.",
+        - `index`
+        How far back to go, `1` being the latest. Optional."""
+        lastmsg = self.prevmessages.get(ctx.channel.id, index)
+        if not lastmsg:
+            return await ctx.reply(
+                content=(
+                    "There is no message delete in the snipe cache for this channel."
+                    if index == 1
+                    else f"There are only `{self.prevmessages.count(ctx.channel.id)}` message deletes in the snipe cache for this channel."
+                ),
                 mention_author=False,
             )
+        # Prepare embed msg
+        embed = discord.Embed(
+            color=ctx.author.color,
+            description=lastmsg.content,
+            timestamp=datetime.datetime.fromtimestamp(
+                lastmsg.created, datetime.timezone.utc
+            ),
+        )
+        if lastmsg.attachments:
+            embed.add_field(
+                name="📎 Attachments",
+                value="\n".join(lastmsg.attachments)[:1024],
+                inline=False,
+            )
+        embed.set_footer(
+            text=f"Sniped by {ctx.author} • {index} of {self.prevmessages.count(ctx.channel.id)}",
+            icon_url=ctx.author.display_avatar.url,
+        )
+        embed.set_author(
+            name=f"💬 {lastmsg.author} said in #{ctx.channel.name}...",
+            icon_url=lastmsg.avatar,
+        )
+        await ctx.reply(embed=embed, mention_author=False)
 
     @commands.bot_has_permissions(embed_links=True)
     @commands.check(ismod)
     @commands.guild_only()
     @commands.command()
-    async def snipf(self, ctx):
-        """This shows the last edited message in a channel.
+    async def snipf(self, ctx, index: int = 1):
+        """This shows an edited message in a channel.
 
-        It will *only* be the last edited message.
+        Only the last few edited messages are kept.
         Hope you have logs if you wanted older!
 
-        No arguments."""
-        if ctx.channel.id in self.prevedit_before:
-            lastbeforemsg = self.prevedit_before[ctx.channel.id]
-            lastaftermsg = self.prevedit_after[ctx.channel.id]
-            # Prepare embed msg
-            embed = discord.Embed(
-                color=ctx.author.color,
-                timestamp=lastaftermsg.created_at,
-            )
-            embed.set_footer(
-                text=f"Snipped by {ctx.author}",
-                icon_url=ctx.author.display_avatar.url,
-            )
-            embed.set_author(
-                name=f"💬 {lastaftermsg.author} said in #{lastaftermsg.channel.name}...",
-                icon_url=lastaftermsg.author.display_avatar.url,
-                url=lastaftermsg.jump_url,
-            )
-            # Split if too long.
-            if len(lastbeforemsg.clean_content) > 1024:
-                split_before_msg = self.bot.slice_message(
-                    lastbeforemsg.clean_content, size=1024, prefix=">>> "
-                )
-                embed.add_field(
-                    name=f"❌ Before on <t:{int(lastbeforemsg.created_at.astimezone().timestamp())}:f>",
-                    value=f"**Message was too long to post!** Split into fragments below.",
-                    inline=False,
-                )
-                ctr = 1
-                for p in split_before_msg:
-                    embed.add_field(
-                        name=f"🧩 Fragment {ctr}",
-                        value=p,
-                        inline=True,
-                    )
-                    ctr = ctr + 1
-            else:
-                embed.add_field(
-                    name=f"❌ Before on <t:{int(lastbeforemsg.created_at.astimezone().timestamp())}:f>",
-                    value=f">>> {lastbeforemsg.clean_content}",
-                    inline=False,
-                )
-            if len(lastaftermsg.clean_content) > 1024:
-                split_after_msg = self.bot.slice_message(
-                    lastaftermsg.clean_content, size=1024, prefix=">>> "
-                )
-                embed.add_field(
-                    name=f"⭕ After on <t:{int(lastaftermsg.edited_at.astimezone().timestamp())}:f>",
-                    value=f"**Message was too long to post!** Split into fragments below.",
-                    inline=False,
-                )
-                ctr = 1
-                for p in split_after_msg:
-                    embed.add_field(
-                        name=f"🧩 Fragment {ctr}",
-                        value=p,
-                        inline=True,
-                    )
-                    ctr = ctr + 1
-            else:
-                embed.add_field(
-                    name=f"⭕ After on <t:{int(lastaftermsg.edited_at.astimezone().timestamp())}:f>",
-                    value=f">>> {lastaftermsg.clean_content}",
-                    inline=False,
-                )
-            await ctx.reply(embed=embed, mention_author=False)
-        else:
-            await ctx.reply(
-                content="There is no message edit in the snip cache for this channel.",
+        - `index`
+        How far back to go, `1` being the latest. Optional."""
+        lastedit = self.prevedits.get(ctx.channel.id, index)
+        if not lastedit:
+            return await ctx.reply(
+                content=(
+                    "There is no message edit in the snip cache for this channel."
+                    if index == 1
+                    else f"There are only `{self.prevedits.count(ctx.channel.id)}` message edits in the snip cache for this channel."
+                ),
                 mention_author=False,
             )
+        lastbeforemsg, lastaftermsg = lastedit
+        # Prepare embed msg
+        embed = discord.Embed(
+            color=ctx.author.color,
+            timestamp=datetime.datetime.fromtimestamp(
+                lastaftermsg.created, datetime.timezone.utc
+            ),
+        )
+        embed.set_footer(
+            text=f"Snipped by {ctx.author} • {index} of {self.prevedits.count(ctx.channel.id)}",
+            icon_url=ctx.author.display_avatar.url,
+        )
+        embed.set_author(
+            name=f"💬 {lastaftermsg.author} said in #{ctx.channel.name}...",
+            icon_url=lastaftermsg.avatar,
+            url=lastaftermsg.jump_url,
+        )
+        self.snipe_field(
+            embed,
+            f"❌ Before on <t:{lastbeforemsg.edited or lastbeforemsg.created}:f>",
+            lastbeforemsg.content,
+            lastbeforemsg.attachments,
+        )
+        self.snipe_field(
+            embed,
+            f"⭕ After on <t:{lastaftermsg.edited or lastaftermsg.created}:f>",
+            lastaftermsg.content,
+            lastaftermsg.attachments,
+        )
+        await ctx.reply(embed=embed, mention_author=False)
 
     @commands.command()
     async def usage(self, ctx):
@@ -219,10 +240,8 @@ class Messagescan(Cog):
         await asyncio.sleep(1)
         await message.delete()
 
-    @Cog.listener()
-    async def on_message(self, message):
-        await self.bot.wait_until_ready()
-        ctx = await self.bot.get_context(message)
+    async def process_message(self, message):
+        ctx = await self.bot.pull_context(message)
         if (
             not message.content
             or ctx.valid
@@ -363,7 +382,8 @@ class Messagescan(Cog):
         if message.author.bot or not message.guild:
             return
 
-        self.prevmessages[message.channel.id] = message
+        snapshot = Snapshot(message)
+        self.prevmessages.add(message.channel.id, snapshot, snapshot.size)
 
     @Cog.listener()
     async def on_message_edit(self, message_before, message_after):
@@ -371,8 +391,10 @@ class Messagescan(Cog):
         if message_after.author.bot or not message_after.guild:
             return
 
-        self.prevedit_before[message_after.channel.id] = message_before
-        self.prevedit_after[message_after.channel.id] = message_after
+        before, after = Snapshot(message_before), Snapshot(message_after)
+        self.prevedits.add(
+            message_after.channel.id, (before, after), before.size + after.size
+        )
 
     @Cog.listener()
     async def on_reaction_add(self, reaction, user):
@@ -6,83 +6,62 @@ import deepl
 from discord.ext.commands import Cog, Context, Bot
 from discord.ext import commands
 from helpers.sv_config import get_config
+from helpers.pipeline import add_stage, remove_stage
+from helpers.antispam import CopyWindows
 
 
 class Messagespam(Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.channelspam = {}
-
-    @Cog.listener()
-    async def on_message(self, message):
-        await self.bot.wait_until_ready()
-        if (
-            not message.content
-            and not message.stickers
-            or message.author.bot
-            or not message.guild
-            or message.guild.id != 256926147827335170
-        ):
-            return
-
-        if message.guild.id not in self.channelspam:
-            self.channelspam[message.guild.id] = {}
+        self.channelspam = CopyWindows("channelspam")
+        add_stage(
+            "messagespam",
+            self.process_message,
+            lambda m: (m.content or m.stickers) and self.enabled(m.guild),
+        )
 
-        if message.channel.id not in self.channelspam[message.guild.id]:
-            self.channelspam[message.guild.id][message.channel.id] = {
-                "original_message": message.content,
-                "senders": [message.author.id],
-            }
-            return
+    def cog_unload(self):
+        remove_stage("messagespam")
 
-        if (
-            message.content
-            and message.content
-            != self.channelspam[message.guild.id][message.channel.id][
-                "original_message"
-            ]
-            or message.stickers
-            and message.stickers[0].url
-            != self.channelspam[message.guild.id][message.channel.id][
-                "original_message"
-            ]
-        ):
-            self.channelspam[message.guild.id][message.channel.id] = {
-                "original_message": message.content,
-                "senders": [message.author.id],
-            }
-            return
+    def enabled(self, g):
+        policy = self.bot.pull_policy(g)
+        return policy.get("toss", "copyspamlimit") and policy.get(
+            "toss", "copyspamwindow"
+        )
 
-        if (
-            message.author.id
-            in self.channelspam[message.guild.id][message.channel.id]["senders"]
-        ):
-            return
-        self.channelspam[message.guild.id][message.channel.id]["senders"].append(
-            message.author.id
+    async def process_message(self, message):
+        policy = self.bot.pull_policy(message.guild)
+        copies = self.channelspam.hit(
+            (message.guild.id, message.channel.id),
+            message,
+            policy.get("toss", "copyspamwindow"),
+            policy.get("toss", "copyspamlimit"),
+            policy.get("toss", "copyspamspreadenable"),
         )
+        if not copies:
+            return
 
-        if len(self.channelspam[message.guild.id][message.channel.id]["senders"]) >= 5:
-            await message.channel.purge(
-                limit=len(
-                    self.channelspam[message.guild.id][message.channel.id]["senders"]
-                )
+        # Only the copies, not whatever got said in between.
+        copyids = [discord.Object(id=mid) for _, mid in copies]
+        for i in range(0, len(copyids), 100):
+            try:
+                await message.channel.delete_messages(copyids[i : i + 100])
+            except discord.HTTPException:
+                pass
+        offenders = []
+        for uid, _ in copies:
+            if uid in offenders:
+                continue
+            offenders.append(uid)
+        await message.channel.send(
+            "Detected and purged message spam.\n**Offending users:**\n"
+            + "\n".join(
+                [
+                    str(message.guild.get_member(uid) or self.bot.get_user(uid) or uid)
+                    for uid in offenders
+                ]
             )
-            await message.channel.send(
-                "Detected and purged message spam.\n**Offending users:**\n"
-                + "\n".join(
-                    [
-                        str(await self.bot.fetch_user(x))
-                        for x in self.channelspam[message.guild.id][message.channel.id][
-                            "senders"
-                        ]
-                    ]
-                )
-            )
-            self.channelspam[message.guild.id][message.channel.id] = {
-                "original_message": message.content,
-                "senders": [message.author.id],
-            }
+        )
 
 
 async def setup(bot: Bot):
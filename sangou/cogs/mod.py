@@ -10,6 +10,7 @@ from helpers.datafiles import add_userlog
 from helpers.placeholders import random_msg
 from helpers.sv_config import get_config
 from helpers.embeds import stock_embed, author_embed, mod_embed, quote_embed
+from helpers.logqueue import send_log, MOD
 import io
 import re
 
@@ -111,7 +112,7 @@ class Mod(Cog):
                 inline=False,
             )
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.bot_has_permissions(ban_members=True)
     @commands.check(ismod)
@@ -200,7 +201,7 @@ class Mod(Cog):
                 inline=False,
             )
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.bot_has_permissions(ban_members=True)
     @commands.check(ismod)
@@ -301,7 +302,7 @@ class Mod(Cog):
                 inline=False,
             )
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.bot_has_permissions(ban_members=True)
     @commands.check(ismod)
@@ -361,7 +362,7 @@ class Mod(Cog):
             embed.description = f"{target_user.mention} was banned by {ctx.author.mention} [{ctx.channel.mention}] [[Jump]({ctx.message.jump_url})]"
             author_embed(embed, target_user)
             mod_embed(embed, target_user, ctx.author)
-            await mlog.send(embed=embed)
+            await send_log(mlog, embed=embed, priority=MOD)
 
         await msg.edit(content=f"All {len(targets_int)} users are now BANNED.")
 
@@ -402,7 +403,7 @@ class Mod(Cog):
             reason = f"**No reason provided!**\nPlease use `{ctx.prefix}unban <user> [reason]` in the future."
         embed.add_field(name=f"📝 Reason", value=reason, inline=False)
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.bot_has_permissions(ban_members=True)
     @commands.check(ismod)
@@ -468,7 +469,7 @@ class Mod(Cog):
                 value=f"**No reason provided!**\nPlease use `{ctx.prefix}sban <user> [reason]` in the future.",
                 inline=False,
             )
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.check(ismod)
     @commands.guild_only()
@@ -566,7 +567,7 @@ class Mod(Cog):
         )
         author_embed(embed, ctx.author)
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.bot_has_permissions(manage_messages=True)
     @commands.check(ismod)
@@ -604,7 +605,7 @@ class Mod(Cog):
         )
         author_embed(embed, ctx.author)
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.bot_has_permissions(manage_messages=True)
     @commands.check(ismod)
@@ -648,7 +649,7 @@ class Mod(Cog):
         embed.description = f"{str(ctx.author)} purged {deleted} messages from {target} in {channel.mention}."
         author_embed(embed, ctx.author)
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.bot_has_permissions(manage_messages=True)
     @commands.check(ismod)
@@ -694,7 +695,7 @@ class Mod(Cog):
         embed.description = f"{str(ctx.author)} purged {deleted} messages containing `{string}` in {channel.mention}."
         author_embed(embed, ctx.author)
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.bot_has_permissions(manage_messages=True)
     @commands.check(ismod)
@@ -739,7 +740,7 @@ class Mod(Cog):
         )
         author_embed(embed, ctx.author)
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.bot_has_permissions(manage_messages=True)
     @commands.check(ismod)
@@ -778,7 +779,7 @@ class Mod(Cog):
         )
         author_embed(embed, ctx.author)
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.bot_has_permissions(manage_messages=True)
     @commands.check(ismod)
@@ -818,7 +819,7 @@ class Mod(Cog):
         )
         author_embed(embed, ctx.author)
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.check(ismod)
     @commands.guild_only()
@@ -907,7 +908,7 @@ class Mod(Cog):
                 inline=False,
             )
 
-        await mlog.send(embed=embed)
+        await send_log(mlog, embed=embed, priority=MOD)
 
     @commands.check(ismod)
     @commands.guild_only()
@@ -12,7 +12,7 @@ from discord.ext.commands import Cog
 from helpers.checks import ismod, isadmin
 from helpers.archive import log_channel
 from helpers.sv_config import get_config
-from helpers.datafiles import get_file, set_file
+from helpers.datafiles import aget_file, aset_file, get_user_log
 from helpers.embeds import stock_embed, author_embed
 
 
@@ -35,7 +35,7 @@ class ModArchives(Cog):
         if ctx.guild.get_member(user.id):
             user = ctx.guild.get_member(user.id)
         uid = str(user.id)
-        userlog = get_file("userlog", f"servers/{ctx.guild.id}")
+        userlog = await get_user_log(ctx.guild.id, uid)
         embed = stock_embed(self.bot)
         author_embed(embed, user)
         embed.title = f"📁 {user.name}'s archives..."
@@ -65,9 +65,9 @@ class ModArchives(Cog):
             inline=False,
         )
 
-        if uid in userlog and userlog[uid]:
-            for index, timestamp in enumerate(userlog[uid]["tosses"]):
-                event = userlog[uid]["tosses"][timestamp]
+        if userlog:
+            for index, timestamp in enumerate(userlog["tosses"]):
+                event = userlog["tosses"][timestamp]
                 path = f"data/servers/{ctx.guild.id}/toss/archives/sessions/{event['session_id']}"
                 if "session_id" not in event or not os.path.exists(path):
                     archivelist = "There are no archives for this session."
@@ -118,10 +118,10 @@ class ModArchives(Cog):
         if ctx.guild.get_member(user.id):
             user = ctx.guild.get_member(user.id)
         uid = str(user.id)
-        userlog = get_file("userlog", f"servers/{ctx.guild.id}")
+        userlog = await get_user_log(ctx.guild.id, uid)
         embed = stock_embed(self.bot)
 
-        traces = get_file("traces", f"servers/{ctx.guild.id}/toss")
+        traces = await aget_file("traces", f"servers/{ctx.guild.id}/toss")
         if "sessions" not in traces:
             traces["sessions"] = {}
         if "users" not in traces:
@@ -149,15 +149,15 @@ class ModArchives(Cog):
             }
             traces["users"][str(user.id)].append(log_data)
         elif type(archive) == int:
-            if uid not in userlog:
+            if userlog is None:
                 embed.title = "📂 About that archive..."
                 embed.description = "> This user isn't in the system!"
                 return await ctx.reply(embed=embed, mention_author=False)
-            elif not userlog[uid]:
+            elif not userlog:
                 embed.title = "📂 About that archive..."
                 embed.description = "> This user's logs are empty!"
                 return await ctx.reply(embed=embed, mention_author=False)
-            caseid = list(userlog[uid]["tosses"].values())[archive - 1]["session_id"]
+            caseid = list(userlog["tosses"].values())[archive - 1]["session_id"]
             if not os.path.exists(
                 f"data/servers/{ctx.guild.id}/toss/archives/sessions/{caseid}"
             ):
@@ -218,7 +218,9 @@ class ModArchives(Cog):
                 files=filelist,
             )
             await ctx.reply(content="I DMed it to you!", mention_author=False)
-            set_file("traces", json.dumps(traces), f"servers/{ctx.guild.id}/toss")
+            await aset_file(
+                "traces", json.dumps(traces), f"servers/{ctx.guild.id}/toss"
+            )
         except:
             return await ctx.reply(content="I can't DM you!", mention_author=False)
 
@@ -239,20 +241,20 @@ class ModArchives(Cog):
         if ctx.guild.get_member(user.id):
             user = ctx.guild.get_member(user.id)
         uid = str(user.id)
-        userlog = get_file("userlog", f"servers/{ctx.guild.id}")
+        userlog = await get_user_log(ctx.guild.id, uid)
         embed = stock_embed(self.bot)
-        if uid not in userlog:
+        if userlog is None:
             embed.title = "📂 About that archive..."
             embed.description = "> This user isn't in the system!"
             return await ctx.reply(embed=embed, mention_author=False)
-        elif not userlog[uid]:
+        elif not userlog:
             embed.title = "📂 About that archive..."
             embed.description = "> This user's logs are empty!"
             return await ctx.reply(embed=embed, mention_author=False)
         author_embed(embed, user)
         embed.title = "🔍 Archive traces..."
 
-        traces = get_file("traces", f"servers/{ctx.guild.id}/toss")
+        traces = await aget_file("traces", f"servers/{ctx.guild.id}/toss")
         if type(archive) == str:
             path = f"data/servers/{ctx.guild.id}/toss/archives/users/{uid}"
             if not os.path.exists(path) and [f for f in os.listdir(path)]:
@@ -282,15 +284,15 @@ class ModArchives(Cog):
                     inline=False,
                 )
         else:
-            if uid not in userlog:
+            if userlog is None:
                 embed.title = "📂 About that archive..."
                 embed.description = "> This user isn't in the system!"
                 return await ctx.reply(embed=embed, mention_author=False)
-            elif not userlog[uid]:
+            elif not userlog:
                 embed.title = "📂 About that archive..."
                 embed.description = "> This user's logs are empty!"
                 return await ctx.reply(embed=embed, mention_author=False)
-            caseid = userlog[uid]["tosses"][archive - 1]["session_id"]
+            caseid = userlog["tosses"][archive - 1]["session_id"]
             if not os.path.exists(
                 f"data/servers/{ctx.guild.id}/toss/archives/sessions/{caseid}"
             ):
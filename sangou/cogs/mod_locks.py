@@ -3,6 +3,7 @@ from discord.ext.commands import Cog
 import discord
 from helpers.checks import ismod
 from helpers.sv_config import get_config
+from helpers.logqueue import send_log, MOD
 
 
 class ModLocks(Cog):
@@ -141,7 +142,11 @@ class ModLocks(Cog):
 
         await ctx.reply(public_msg, mention_author=False)
         if mlog:
-            await mlog.send(f"🔒 **Lockdown**: {ctx.channel.mention} by {ctx.author}")
+            await send_log(
+                mlog,
+                f"🔒 **Lockdown**: {ctx.channel.mention} by {ctx.author}",
+                priority=MOD,
+            )
 
     @commands.bot_has_permissions(manage_channels=True)
     @commands.check(ismod)
@@ -179,7 +184,11 @@ class ModLocks(Cog):
 
         await ctx.reply("🔓 Channel unlocked.", mention_author=False)
         if mlog:
-            await mlog.send(f"🔓 **Unlock**: {ctx.channel.mention} by {ctx.author}")
+            await send_log(
+                mlog,
+                f"🔓 **Unlock**: {ctx.channel.mention} by {ctx.author}",
+                priority=MOD,
+            )
 
     @commands.bot_has_permissions(manage_channels=True)
     @commands.check(ismod)
@@ -1,24 +1,24 @@
 import discord
 from discord.ext import commands
 from discord.ext.commands import Cog
-import json
 from datetime import datetime, timezone
 from helpers.checks import ismod, isadmin
-from helpers.datafiles import get_file, set_file
+from helpers.datafiles import get_user_log, set_userlog
 from helpers.sv_config import get_config
 from helpers.embeds import stock_embed, author_embed, sympage
+from helpers.logqueue import send_log, MOD
 
 
 class ModLogs(Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    def get_log_embeds(self, sid: int, user, own: bool = False):
+    async def get_log_embeds(self, sid: int, user, own: bool = False):
         uid = str(user.id)
-        userlog = get_file("userlog", f"servers/{sid}")
+        userlog = await get_user_log(sid, uid)
         events = ["notes", "tosses", "warns", "kicks", "bans"]
 
-        if uid not in userlog:
+        if userlog is None:
             # Doesn't exist.
             embed = stock_embed(self.bot)
             embed.title = "📇 About that log..."
@@ -28,7 +28,7 @@ class ModLogs(Cog):
                 + " in the system!"
             )
             return [embed]
-        elif not userlog[uid]:
+        elif not userlog:
             # Empty log.
             embed = stock_embed(self.bot)
             embed.title = "📇 About that log..."
@@ -52,12 +52,12 @@ class ModLogs(Cog):
         for index, event in enumerate(events):
             if index < 1 and own:
                 continue
-            days = dayrange([int(instance) for instance in userlog[uid][event]])
+            days = dayrange([int(instance) for instance in userlog[event]])
             embed.add_field(
                 name=["📝 Notes", "🚷 Tosses", "⚠️ Warnings", "👢 Kicks", "⛔ Bans"][
                     index
                 ],
-                value=f"`{len(userlog[uid][event])}` in `{days}` day"
+                value=f"`{len(userlog[event])}` in `{days}` day"
                 + ("s" if days != 1 else "")
                 + ".",
                 inline=True,
@@ -66,13 +66,13 @@ class ModLogs(Cog):
         if not own:
             embed.description = (
                 "User "
-                + ("**is**" if userlog[uid]["watch"]["state"] else "is **not**")
+                + ("**is**" if userlog["watch"]["state"] else "is **not**")
                 + " under watch."
             )
             timestamps = []
             map(
                 timestamps.extend,
-                list([userlog[uid][event].keys() for event in events]),
+                list([userlog[event].keys() for event in events]),
             )
             days = dayrange(timestamps)
             embed.add_field(
@@ -94,12 +94,12 @@ class ModLogs(Cog):
                 + events[index]
                 + "..."
             )
-            if not userlog[uid][event]:
+            if not userlog[event]:
                 embed.description = "> This section is empty!"
                 embeds.append(embed)
                 continue
-            for idx, instance in enumerate(userlog[uid][event]):
-                evn = userlog[uid][event][instance]
+            for idx, instance in enumerate(userlog[event]):
+                evn = userlog[event][instance]
                 lastline = f"__Reason:__ {evn['reason']}"
                 embed.add_field(
                     name=["Note", "Toss", "Warning", "Kick", "Ban"][index]
@@ -128,7 +128,7 @@ class ModLogs(Cog):
         The user to get logs for."""
         if ctx.guild.get_member(target.id):
             target = ctx.guild.get_member(target.id)
-        embeds = self.get_log_embeds(ctx.guild.id, target, False)
+        embeds = await self.get_log_embeds(ctx.guild.id, target, False)
         if len(embeds) == 1:
             return await ctx.reply(embed=embeds[0], mention_author=False)
 
@@ -147,7 +147,7 @@ class ModLogs(Cog):
         The user to get notes for."""
         if ctx.guild.get_member(target.id):
             target = ctx.guild.get_member(target.id)
-        embeds = self.get_log_embeds(ctx.guild.id, target, False)
+        embeds = await self.get_log_embeds(ctx.guild.id, target, False)
         if len(embeds) == 1:
             await ctx.send(embed=embeds[0])
         else:
@@ -167,7 +167,7 @@ class ModLogs(Cog):
         elif not ctx.guild and not guild:
             return await ctx.reply("You need to specify a server! Use its name or ID!")
 
-        embeds = self.get_log_embeds(guild.id, ctx.author, True)
+        embeds = await self.get_log_embeds(guild.id, ctx.author, True)
         if len(embeds) == 1:
             author_embed(embeds[0], guild)
             return await ctx.reply(embed=embeds[0])
@@ -245,18 +245,18 @@ class ModLogs(Cog):
             return await ctx.reply(
                 content=f"{eventtype} is not a valid event type.", mention_author=False
             )
-        userlog = get_file("userlog", f"servers/{ctx.guild.id}")
-        if str(target.id) not in userlog:
+        userlog = await get_user_log(ctx.guild.id, target.id)
+        if userlog is None:
             return await ctx.reply(
                 content=f"{target.mention} has no logs!", mention_author=False
             )
-        elif not userlog[str(target.id)][eventtype]:
+        elif not userlog[eventtype]:
             return await ctx.reply(
                 content=f"{target.mention} has no {eventtype}!", mention_author=False
             )
 
-        userlog[str(target.id)][eventtype] = {}
-        set_file("userlog", json.dumps(userlog), f"servers/{ctx.guild.id}")
+        userlog[eventtype] = {}
+        await set_userlog(ctx.guild.id, target.id)
         safe_name = await commands.clean_content(escape_markdown=True).convert(
             ctx, str(target)
         )
@@ -276,7 +276,7 @@ class ModLogs(Cog):
             f"{safe_name}"
             f"\n🔗 __Jump__: <{ctx.message.jump_url}>"
         )
-        await mlog.send(msg)
+        await send_log(mlog, msg, priority=MOD)
 
     @commands.check(isadmin)
     @commands.guild_only()
@@ -299,22 +299,22 @@ class ModLogs(Cog):
             return await ctx.reply(
                 content=f"{eventtype} is not a valid event type.", mention_author=False
             )
-        userlog = get_file("userlog", f"servers/{ctx.guild.id}")
-        if str(target.id) not in userlog:
+        userlog = await get_user_log(ctx.guild.id, target.id)
+        if userlog is None:
             return await ctx.reply(
                 content=f"{target.mention} has no logs!", mention_author=False
             )
-        elif not userlog[str(target.id)][eventtype]:
+        elif not userlog[eventtype]:
             return await ctx.reply(
                 content=f"{target.mention} has no {event}!", mention_author=False
             )
-        elif not 1 <= index <= len(userlog[str(target.id)][eventtype]):
+        elif not 1 <= index <= len(userlog[eventtype]):
             return await ctx.reply(
                 content=f"Your index is out of bounds!", mention_author=False
             )
 
-        del userlog[str(target.id)][eventtype][index - 1]
-        set_file("userlog", json.dumps(userlog), f"servers/{ctx.guild.id}")
+        del userlog[eventtype][index - 1]
+        await set_userlog(ctx.guild.id, target.id)
         await ctx.reply(content=f"I've deleted that event.", mention_author=False)
 
         mlog = self.bot.pull_channel(
@@ -329,7 +329,7 @@ class ModLogs(Cog):
             f"{eventtype} {index} from {target.mention} | {safe_name}"
             f"\n🔗 __Jump__: <{ctx.message.jump_url}>"
         )
-        await mlog.send(msg)
+        await send_log(mlog, msg, priority=MOD)
 
 
 async def setup(bot):
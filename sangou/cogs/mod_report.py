@@ -4,7 +4,7 @@ from discord.ext.commands import Cog
 import datetime
 import json
 import asyncio
-from helpers.datafiles import get_file, set_file
+from helpers.datafiles import aget_file, aset_file, file_lock
 from helpers.sv_config import get_config
 from helpers.embeds import stock_embed, author_embed
 from helpers.placeholders import random_msg
@@ -13,10 +13,6 @@ from helpers.placeholders import random_msg
 class ModReport(Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.cleaner.start()
-
-    def cog_unload(self):
-        self.cleaner.cancel()
 
     @commands.dm_only()
     @commands.command()
@@ -191,9 +187,17 @@ class ModReport(Cog):
                 delete_after=5,
                 allowed_mentions=discord.AllowedMentions(replied_user=False),
             )
-        reportlog = get_file("reportlog", f"servers/{guild.id}")
-        reportlog[int(datetime.datetime.now().timestamp())] = ctx.author.id
-        set_file("reportlog", json.dumps(reportlog), f"servers/{guild.id}")
+        async with file_lock("reportlog", f"servers/{guild.id}"):
+            reportlog = await aget_file("reportlog", f"servers/{guild.id}")
+            now = int(datetime.datetime.now().timestamp())
+            # Reports are kept for three days, expire the rest while we're here.
+            reportlog = {
+                instance: user
+                for instance, user in reportlog.items()
+                if now - int(instance) <= 259200
+            }
+            reportlog[str(now)] = ctx.author.id
+            await aset_file("reportlog", reportlog, f"servers/{guild.id}")
         await channel.send(content=staff_role.mention if ping else "", embed=embed)
         await message.delete()
         return await ctx.send(
@@ -207,17 +211,6 @@ class ModReport(Cog):
             content="This incident has been reproted to the proper authorities. Thank you for your tmie."
         )
 
-    @tasks.loop(time=datetime.time(hour=0))
-    async def cleaner(self):
-        # water go down the hole x2
-        for g in self.bot.guilds:
-            reportlog = get_file("reportlog", f"servers/{g.id}")
-            cleanlog = {}
-            for instance, user in reportlog.items():
-                if int(datetime.datetime.now().timestamp()) - 259200 > int(instance):
-                    cleanlog[instance] = user
-            set_file("reportlog", json.dumps(cleanlog), f"servers/{g.id}")
-
 
 async def setup(bot):
     await bot.add_cog(ModReport(bot))
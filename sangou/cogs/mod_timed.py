@@ -6,6 +6,7 @@ from helpers.checks import ismod
 from helpers.datafiles import add_userlog, add_job
 from helpers.sv_config import get_config
 from helpers.placeholders import random_msg
+from helpers.logqueue import send_log, MOD
 
 
 class ModTimed(Cog):
@@ -93,7 +94,7 @@ class ModTimed(Cog):
         )
         if not mlog:
             return
-        await mlog.send(chan_message)
+        await send_log(mlog, chan_message, priority=MOD)
 
 
 async def setup(bot):
@@ -9,7 +9,7 @@ from discord.ext import commands
 from discord.ext.commands import Cog
 from io import BytesIO
 from helpers.checks import ismod
-from helpers.datafiles import add_userlog, toss_userlog, get_file, set_file
+from helpers.datafiles import add_userlog, toss_userlog, aget_file, aset_file
 from helpers.placeholders import random_msg
 from helpers.archive import log_channel
 from helpers.embeds import (
@@ -20,6 +20,9 @@ from helpers.embeds import (
     joinedat_embed,
 )
 from helpers.sv_config import get_config
+from helpers.pipeline import add_stage, remove_stage
+from helpers.antispam import SpamWindows
+from helpers.logqueue import send_log, MOD
 
 
 class ModToss(Cog):
@@ -30,32 +33,43 @@ class ModToss(Cog):
     def __init__(self, bot):
         self.bot = bot
         self.busy = {}
-        self.spamcounter = {}
+        # guild id: (policy, anti-spam settings)
+        self.spamsettings = {}
+        self.spamwindows = SpamWindows("spamwindows")
         self.nocfgmsg = "Tossing isn't enabled for this server."
+        add_stage(
+            "antispam",
+            self.process_message,
+            lambda m: self.spam_settings(m.guild),
+        )
+
+    def cog_unload(self):
+        remove_stage("antispam")
 
     def enabled(self, g):
-        return all(
-            (
-                self.bot.pull_role(g, get_config(g.id, "toss", "tossrole")),
-                self.bot.pull_category(g, get_config(g.id, "toss", "tosscategory")),
-                get_config(g.id, "toss", "tosschannels"),
-                any(
-                    [
-                        self.bot.pull_role(g, get_config(g.id, "staff", "adminrole")),
-                        self.bot.pull_role(g, get_config(g.id, "staff", "modrole")),
-                    ]
-                ),
-                any(
-                    [
-                        self.bot.pull_channel(
-                            g, get_config(g.id, "toss", "notificationchannel")
-                        ),
-                        self.bot.pull_channel(
-                            g, get_config(g.id, "staff", "staffchannel")
-                        ),
-                    ]
-                ),
-            )
+        policy = self.bot.pull_policy(g)
+        return policy.flag(
+            "toss",
+            lambda: all(
+                (
+                    policy.role("toss", "tossrole"),
+                    policy.category("toss", "tosscategory"),
+                    policy.get("toss", "tosschannels"),
+                    policy.staffroles,
+                    any(
+                        [
+                            policy.channel("toss", "notificationchannel"),
+                            policy.channel("staff", "staffchannel"),
+                        ]
+                    ),
+                )
+            ),
+        )
+
+    def antispam_enabled(self, g):
+        policy = self.bot.pull_policy(g)
+        return policy.get("toss", "antispamwindow") and policy.get(
+            "toss", "antispamlimit"
         )
 
     def username_system(self, user):
@@ -88,8 +102,8 @@ class ModToss(Cog):
                     return len([r for r in member.roles if not (r.managed)]) == 2
                 return True
 
-    def get_session(self, member):
-        tosses = get_file("tosses", f"servers/{member.guild.id}/toss")
+    async def get_session(self, member):
+        tosses = await aget_file("tosses", f"servers/{member.guild.id}/toss")
         if not tosses:
             return None
         session = None
@@ -109,7 +123,7 @@ class ModToss(Cog):
         )
         modrole = self.bot.pull_role(guild, get_config(guild.id, "staff", "modrole"))
         botrole = self.bot.pull_role(guild, get_config(guild.id, "staff", "botrole"))
-        tosses = get_file("tosses", f"servers/{guild.id}/toss")
+        tosses = await aget_file("tosses", f"servers/{guild.id}/toss")
 
         if all(
             [
@@ -123,7 +137,9 @@ class ModToss(Cog):
             if c not in [g.name for g in guild.channels]:
                 if c not in tosses:
                     tosses[c] = {"tossed": {}, "untossed": [], "left": []}
-                    set_file("tosses", json.dumps(tosses), f"servers/{guild.id}/toss")
+                    await aset_file(
+                        "tosses", json.dumps(tosses), f"servers/{guild.id}/toss"
+                    )
 
                 overwrites = {
                     guild.default_role: discord.PermissionOverwrite(read_messages=False)
@@ -161,11 +177,11 @@ class ModToss(Cog):
             and not rx.is_assignable()
         ]
 
-        tosses = get_file("tosses", f"servers/{user.guild.id}/toss")
+        tosses = await aget_file("tosses", f"servers/{user.guild.id}/toss")
         tosses[tosschannel.name]["tossed"][str(user.id)] = [
             role.id for role in prevroles
         ]
-        set_file("tosses", json.dumps(tosses), f"servers/{user.guild.id}/toss")
+        await aset_file("tosses", json.dumps(tosses), f"servers/{user.guild.id}/toss")
 
         if prevroles:
             await user.remove_roles(
@@ -192,7 +208,7 @@ class ModToss(Cog):
         embed = stock_embed(self.bot)
         embed.title = "👁‍🗨 Toss Channel Sessions..."
         embed.color = ctx.author.color
-        tosses = get_file("tosses", f"servers/{ctx.guild.id}/toss")
+        tosses = await aget_file("tosses", f"servers/{ctx.guild.id}/toss")
 
         if ctx.channel.name in get_config(ctx.guild.id, "toss", "tosschannels"):
             channels = [ctx.channel.name]
@@ -269,7 +285,7 @@ class ModToss(Cog):
                 errors += f"\n- {self.username_system(us)}\n> You cannot toss someone higher than yourself."
             elif us.top_role > ctx.me.top_role:
                 errors += f"\n- {self.username_system(us)}\n> You cannot toss someone higher than myself."
-            elif self.get_session(us) and tossrole in us.roles:
+            elif await self.get_session(us) and tossrole in us.roles:
                 errors += (
                     f"\n- {self.username_system(us)}\n> This user is already tossed."
                 )
@@ -353,7 +369,7 @@ class ModToss(Cog):
                 embed.title = "🚷 Toss"
                 embed.description = f"{us.mention} was tossed by {ctx.author.mention} [`#{ctx.channel.name}`] [[Jump]({ctx.message.jump_url})]"
                 mod_embed(embed, us, ctx.author)
-                await mlog.send(embed=embed)
+                await send_log(mlog, embed=embed, priority=MOD)
 
         await ctx.message.add_reaction("🚷")
 
@@ -412,7 +428,7 @@ class ModToss(Cog):
             )
 
         # Get roles, channels, and configs.
-        tosses = get_file("tosses", f"servers/{ctx.guild.id}/toss")
+        tosses = await aget_file("tosses", f"servers/{ctx.guild.id}/toss")
         if not users:
             users = [
                 ctx.guild.get_member(int(u))
@@ -509,7 +525,7 @@ class ModToss(Cog):
                 )
                 await notifychannel.send(embed=embed)
 
-        set_file("tosses", json.dumps(tosses), f"servers/{ctx.guild.id}/toss")
+        await aset_file("tosses", json.dumps(tosses), f"servers/{ctx.guild.id}/toss")
         del self.busy[ctx.guild.id]
 
         if not tosses[ctx.channel.name]:
@@ -545,7 +561,7 @@ class ModToss(Cog):
             notify_channel = self.bot.pull_channel(
                 ctx.guild, get_config(ctx.guild.id, "staff", "staffchannel")
             )
-        tosses = get_file("tosses", f"servers/{ctx.guild.id}/toss")
+        tosses = await aget_file("tosses", f"servers/{ctx.guild.id}/toss")
 
         if tosses[ctx.channel.name]["tossed"]:
             return await ctx.reply(
@@ -623,47 +639,52 @@ class ModToss(Cog):
             await notify_channel.send(embed=embed)
 
         del tosses[ctx.channel.name]
-        set_file("tosses", json.dumps(tosses), f"servers/{ctx.guild.id}/toss")
+        await aset_file("tosses", json.dumps(tosses), f"servers/{ctx.guild.id}/toss")
 
         await ctx.channel.delete(reason="Sangou Toss")
         return
 
     # Anti-spam subfeature.
-    @Cog.listener()
-    async def on_message(self, message):
-        await self.bot.wait_until_ready()
+    def spam_settings(self, g):
+        # Worked out once per policy, this runs on every message.
+        policy = self.bot.pull_policy(g)
+        cached = self.spamsettings.get(g.id)
+        if cached and cached[0] is policy:
+            return cached[1]
+        settings = None
+        if self.enabled(g) and self.antispam_enabled(g):
+            settings = {
+                "window": policy.get("toss", "antispamwindow"),
+                "limit": policy.get("toss", "antispamlimit"),
+                "staff": [r.id for r in policy.staffroles],
+                "tossrole": policy.role("toss", "tossrole").id,
+            }
+        self.spamsettings[g.id] = (policy, settings)
+        return settings
+
+    async def process_message(self, message):
+        settings = self.spam_settings(message.guild)
+        if not settings or message.author.bot:
+            return
+        author = message.author
         if (
-            not message.guild
-            or message.author.bot
-            or not self.enabled(message.guild)
-            or self.is_rolebanned(message.author)
+            author.id == message.guild.owner_id
+            or author.id in self.bot.owner_ids
+            or any(author.get_role(r) for r in settings["staff"])
+            or author.get_role(settings["tossrole"])
+            and self.is_rolebanned(author)
         ):
             return
-
-        antispamwindow = get_config(message.guild.id, "toss", "antispamwindow")
-        antispamlimit = get_config(message.guild.id, "toss", "antispamlimit")
-        if not antispamwindow or not antispamlimit:
-            return
-
-        if (
-            self.bot.pull_role(
-                message.guild, get_config(message.guild.id, "staff", "modrole")
-            )
-            in message.author.roles
-            or self.bot.pull_role(
-                message.guild, get_config(message.guild.id, "staff", "adminrole")
-            )
-            in message.author.roles
-            or message.author.id == message.guild.owner_id
-            or message.author.id in self.bot.owner_ids
+        if not self.spamwindows.hit(
+            (message.guild.id, author.id),
+            message.content,
+            message.created_at.timestamp(),
+            settings["window"],
+            settings["limit"],
         ):
             return
 
-        # Thank you to https://stackoverflow.com/a/29489919 for this function.
-        def principal_period(s):
-            i = (s + s).find(s, 1, -1)
-            return None if i == -1 else s[:i]
-
+        antispamlimit = settings["limit"]
         notify_channel = self.bot.pull_channel(
             message.guild, get_config(message.guild.id, "toss", "notificationchannel")
         )
@@ -680,98 +701,61 @@ class ModToss(Cog):
             ),
         ]
 
-        if message.author.id not in self.spamcounter:
-            self.spamcounter[message.author.id] = {}
-        if "original_message" not in self.spamcounter[message.author.id]:
-            self.spamcounter[message.author.id]["original_message"] = message
+        toss_channel = await self.new_session(message.guild)
+        if not toss_channel:
             return
+        failed_roles, previous_roles = await self.perform_toss(
+            message.author, message.guild.me, toss_channel
+        )
+        await toss_channel.set_permissions(message.author, read_messages=True)
+        await toss_channel.send(
+            content=f"{message.author.mention}, you were rolebanned for spamming."
+        )
 
-        cutoff_ts = self.spamcounter[message.author.id][
-            "original_message"
-        ].created_at + timedelta(seconds=antispamwindow)
-
-        if (
-            any(
-                (
-                    message.content
-                    == self.spamcounter[message.author.id]["original_message"].content,
-                    principal_period(message.content)
-                    == self.spamcounter[message.author.id]["original_message"].content,
-                )
-            )
-            and message.created_at < cutoff_ts
-        ):
-            if "spamcounter" not in self.spamcounter[message.author.id]:
-                self.spamcounter[message.author.id]["spamcounter"] = 1
+        toss_userlog(
+            message.guild.id,
+            message.author.id,
+            message.guild.me,
+            message.jump_url,
+            toss_channel.id,
+        )
+        if notify_channel:
+            embed = stock_embed(self.bot)
+            author_embed(embed, message.author, True)
+            embed.color = message.author.color
+            embed.title = "🚷 Toss"
+            embed.description = f"{self.username_system(message.author)} has been tossed for hitting {antispamlimit} spam messages. {message.jump_url}\n> This toss takes place in {toss_channel.mention}..."
+            createdat_embed(embed, message.author)
+            joinedat_embed(embed, message.author)
+            prevlist = []
+            if len(previous_roles) > 0:
+                for role in previous_roles:
+                    prevlist.append("<@&" + str(role.id) + ">")
+                prevlist = ",".join(reversed(prevlist))
             else:
-                self.spamcounter[message.author.id]["spamcounter"] += 1
-            if self.spamcounter[message.author.id]["spamcounter"] >= antispamlimit:
-                self.spamcounter[message.author.id]["spamcounter"] = 0
-                toss_channel = await self.new_session(message.guild)
-                if not toss_channel:
-                    self.spamcounter[message.author.id]["spamcounter"] += (
-                        antispamlimit + 1
-                    )
-                    return
-                failed_roles, previous_roles = await self.perform_toss(
-                    message.author, message.guild.me, toss_channel
-                )
-                await toss_channel.set_permissions(message.author, read_messages=True)
-                await toss_channel.send(
-                    content=f"{message.author.mention}, you were rolebanned for spamming."
-                )
-
-                toss_userlog(
-                    message.guild.id,
-                    message.author.id,
-                    message.guild.me,
-                    message.jump_url,
-                    toss_channel.id,
+                prevlist = "None"
+            embed.add_field(
+                name="🎨 Previous Roles",
+                value=prevlist,
+                inline=False,
+            )
+            if failed_roles:
+                faillist = []
+                for role in previous_roles:
+                    faillist.append("<@&" + str(role.id) + ">")
+                faillist = ",".join(reversed(faillist))
+                embed.add_field(
+                    name="🚫 Failed Roles",
+                    value=faillist,
+                    inline=False,
                 )
-                if notify_channel:
-                    embed = stock_embed(self.bot)
-                    author_embed(embed, message.author, True)
-                    embed.color = message.author.color
-                    embed.title = "🚷 Toss"
-                    embed.description = f"{self.username_system(message.author)} has been tossed for hitting {antispamlimit} spam messages. {message.jump_url}\n> This toss takes place in {toss_channel.mention}..."
-                    createdat_embed(embed, message.author)
-                    joinedat_embed(embed, message.author)
-                    prevlist = []
-                    if len(previous_roles) > 0:
-                        for role in previous_roles:
-                            prevlist.append("<@&" + str(role.id) + ">")
-                        prevlist = ",".join(reversed(prevlist))
-                    else:
-                        prevlist = "None"
-                    embed.add_field(
-                        name="🎨 Previous Roles",
-                        value=prevlist,
-                        inline=False,
-                    )
-                    if failed_roles:
-                        faillist = []
-                        for role in previous_roles:
-                            faillist.append("<@&" + str(role.id) + ">")
-                        faillist = ",".join(reversed(faillist))
-                        embed.add_field(
-                            name="🚫 Failed Roles",
-                            value=faillist,
-                            inline=False,
-                        )
-                    await notify_channel.send(
-                        content=next(
-                            staff_role
-                            for staff_role in staff_roles
-                            if staff_role is not None
-                        ).mention,
-                        embed=embed,
-                    )
-                    await message.add_reaction("🚷")
-                    return
-        else:
-            self.spamcounter[message.author.id]["original_message"] = message
-            self.spamcounter[message.author.id]["spamcounter"] = 0
-            return
+            await notify_channel.send(
+                content=next(
+                    staff_role for staff_role in staff_roles if staff_role is not None
+                ).mention,
+                embed=embed,
+            )
+            await message.add_reaction("🚷")
 
     # Rejoining after previously being tossed.
     @Cog.listener()
@@ -787,7 +771,7 @@ class ModToss(Cog):
                 member.guild, get_config(member.guild.id, "staff", "staffchannel")
             )
 
-        tosses = get_file("tosses", f"servers/{member.guild.id}/toss")
+        tosses = await aget_file("tosses", f"servers/{member.guild.id}/toss")
         tosschannel = None
 
         if "LEFTGUILD" not in tosses or str(member.id) not in tosses["LEFTGUILD"]:
@@ -802,7 +786,7 @@ class ModToss(Cog):
         failroles, prevroles = await self.perform_toss(
             member, member.guild.me, tosschannel
         )
-        tosses = get_file("tosses", f"servers/{member.guild.id}/toss")
+        tosses = await aget_file("tosses", f"servers/{member.guild.id}/toss")
         tosses[tosschannel.name]["tossed"][str(member.id)] = tosses["LEFTGUILD"][
             str(member.id)
         ]
@@ -815,7 +799,7 @@ class ModToss(Cog):
             and member.id in tosses[tosschannel.name]["left"]
         ):
             tosses[tosschannel.name]["left"].remove(member.id)
-        set_file("tosses", json.dumps(tosses), f"servers/{member.guild.id}/toss")
+        await aset_file("tosses", json.dumps(tosses), f"servers/{member.guild.id}/toss")
 
         await tosschannel.set_permissions(member, read_messages=True)
         tossmsg = await tosschannel.send(
@@ -841,18 +825,18 @@ class ModToss(Cog):
         if not self.enabled(member.guild):
             return
 
-        session = self.get_session(member)
+        session = await self.get_session(member)
         if not session:
             return
         tosschannel = self.bot.pull_channel(member.guild, session)
 
-        tosses = get_file("tosses", f"servers/{member.guild.id}/toss")
+        tosses = await aget_file("tosses", f"servers/{member.guild.id}/toss")
         if "LEFTGUILD" not in tosses:
             tosses["LEFTGUILD"] = {}
         tosses["LEFTGUILD"][str(member.id)] = tosses[session]["tossed"][str(member.id)]
         tosses[session]["left"].append(member.id)
         del tosses[session]["tossed"][str(member.id)]
-        set_file("tosses", json.dumps(tosses), f"servers/{member.guild.id}/toss")
+        await aset_file("tosses", json.dumps(tosses), f"servers/{member.guild.id}/toss")
 
         notifychannel = self.bot.pull_channel(
             member.guild, get_config(member.guild.id, "toss", "notificationchannel")
@@ -880,7 +864,7 @@ class ModToss(Cog):
         elif after.guild.id in self.busy and self.busy[after.guild.id] == after.id:
             return
         if self.is_rolebanned(before) and not self.is_rolebanned(after):
-            session = self.get_session(after)
+            session = await self.get_session(after)
             if not session:
                 return
             tosschannel = self.bot.pull_channel(after.guild, session)
@@ -889,11 +873,13 @@ class ModToss(Cog):
             )
 
             self.busy[after.guild.id] = after.id
-            tosses = get_file("tosses", f"servers/{after.guild.id}/toss")
+            tosses = await aget_file("tosses", f"servers/{after.guild.id}/toss")
             roles = tosses[session]["tossed"][str(after.id)]
             tosses[session]["untossed"].append(after.id)
             del tosses[session]["tossed"][str(after.id)]
-            set_file("tosses", json.dumps(tosses), f"servers/{after.guild.id}/toss")
+            await aset_file(
+                "tosses", json.dumps(tosses), f"servers/{after.guild.id}/toss"
+            )
 
             if roles:
                 roles = [
@@ -925,11 +911,13 @@ class ModToss(Cog):
         if self.enabled(channel.guild) and channel.name in get_config(
             channel.guild.id, "toss", "tosschannels"
         ):
-            tosses = get_file("tosses", f"servers/{channel.guild.id}/toss")
+            tosses = await aget_file("tosses", f"servers/{channel.guild.id}/toss")
             if channel.name not in tosses:
                 return
             del tosses[channel.name]
-            set_file("tosses", json.dumps(tosses), f"servers/{channel.guild.id}/toss")
+            await aset_file(
+                "tosses", json.dumps(tosses), f"servers/{channel.guild.id}/toss"
+            )
 
 
 async def setup(bot):
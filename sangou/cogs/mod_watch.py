@@ -1,21 +1,71 @@
 import discord
 import datetime
+import asyncio
 from discord.ext import commands
 from discord.ext.commands import Cog
 from helpers.checks import ismod
-from helpers.datafiles import watch_userlog, get_file
+from helpers.datafiles import watch_userlog, is_watched, get_user_log
 from helpers.placeholders import random_msg, create_log_embed
 from helpers.sv_config import get_config
 from helpers.embeds import stock_embed, createdat_embed, joinedat_embed
+from helpers.pipeline import add_stage, remove_stage
+from helpers.expiring import ExpiringMap
 
 
 class ModWatch(Cog):
     def __init__(self, bot):
         self.bot = bot
         self.nocfgmsg = "Watching isn't set up for this server."
+        # (guild id, user id): (tracker thread, tracker message)
+        self.trackers = ExpiringMap("watchtrackers", ttl=3600, maxsize=1000)
+        # (guild id, user id): [tracker message, embed, task]
+        self.updates = {}
+        self.updatedelay = 5
+        add_stage(
+            "watch",
+            self.process_message,
+            lambda m: m.content and self.enabled(m.guild),
+            bots=True,
+        )
+
+    def cog_unload(self):
+        remove_stage("watch")
+        for _, _, task in self.updates.values():
+            task.cancel()
 
     def enabled(self, g):
-        return self.bot.pull_channel(g, get_config(g.id, "staff", "watchchannel"))
+        return self.bot.pull_policy(g).channel("staff", "watchchannel")
+
+    async def tracker(self, guild, uid):
+        key = (guild.id, uid)
+        if key not in self.trackers:
+            watch = (await get_user_log(guild.id, uid))["watch"]
+            trackerthread = guild.get_thread(
+                watch["thread"]
+            ) or await self.bot.fetch_channel(watch["thread"])
+            # Edits and deletes only need the ID.
+            trackermsg = self.enabled(guild).get_partial_message(watch["message"])
+            self.trackers[key] = (trackerthread, trackermsg)
+        return self.trackers[key]
+
+    def queue_update(self, key, trackermsg, embed):
+        # The tracker message only gets the latest update, every few seconds.
+        if key in self.updates:
+            self.updates[key][:2] = [trackermsg, embed]
+            return
+        self.updates[key] = [
+            trackermsg,
+            embed,
+            asyncio.create_task(self.push_update(key)),
+        ]
+
+    async def push_update(self, key):
+        await asyncio.sleep(self.updatedelay)
+        trackermsg, embed, _ = self.updates.pop(key)
+        try:
+            await trackermsg.edit(content=None, embed=embed)
+        except discord.HTTPException:
+            pass
 
     @commands.bot_has_guild_permissions(embed_links=True, create_public_threads=True)
     @commands.check(ismod)
@@ -59,6 +109,7 @@ class ModWatch(Cog):
         watch_userlog(
             ctx.guild.id, target.id, ctx.author, True, trackerthread.id, trackermsg.id
         )
+        self.trackers[(ctx.guild.id, target.id)] = (trackerthread, trackermsg)
         await ctx.reply(
             content=f"**User is now on watch.**\nRelay thread available at {trackerthread.mention}.",
             mention_author=False,
@@ -90,18 +141,13 @@ class ModWatch(Cog):
             if self.bot.check_if_target_is_staff(target):
                 return await ctx.send("I cannot unwatch Staff members.")
 
-        userlog = get_file("userlog", f"servers/{ctx.guild.id}")
-        if userlog[str(target.id)]["watch"]["state"]:
-            trackerthread = await self.bot.fetch_channel(
-                userlog[str(target.id)]["watch"]["thread"]
-            )
+        if await is_watched(ctx.guild.id, target.id):
+            trackerthread, trackermsg = await self.tracker(ctx.guild, target.id)
+            key = (ctx.guild.id, target.id)
+            if key in self.updates:
+                self.updates.pop(key)[2].cancel()
+            self.trackers.pop(key)
             await trackerthread.edit(archived=True)
-            trackerlog = self.bot.pull_channel(
-                ctx.guild, get_config(ctx.guild.id, "staff", "watchchannel")
-            )
-            trackermsg = await trackerlog.fetch_message(
-                userlog[str(target.id)]["watch"]["message"]
-            )
             await trackermsg.delete()
             watch_userlog(ctx.guild.id, target.id, ctx.author, False)
             await ctx.reply("User is now not on watch.", mention_author=False)
@@ -110,132 +156,95 @@ class ModWatch(Cog):
                 content="User isn't on watch...", mention_author=False
             )
 
-    @Cog.listener()
-    async def on_message(self, message):
-        await self.bot.wait_until_ready()
+    async def process_message(self, message):
         if not message.content or not message.guild or not self.enabled(message.guild):
             return
-        userlog = get_file("userlog", f"servers/{message.guild.id}")
-        try:
-            if userlog[str(message.author.id)]["watch"]["state"]:
-                trackerthread = await self.bot.fetch_channel(
-                    userlog[str(message.author.id)]["watch"]["thread"]
-                )
-                trackerchannel = self.bot.pull_channel(
-                    message.guild, get_config(message.guild.id, "staff", "watchchannel")
-                )
-                trackermsg = await trackerchannel.fetch_message(
-                    userlog[str(message.author.id)]["watch"]["message"]
-                )
-
-                threadembed = stock_embed(self.bot)
-                threadembed.color = message.author.color
-                threadembed.description = message.content
-                threadembed.set_author(
-                    name=f"💬 {message.author} said in #{message.channel.name}...",
-                    icon_url=message.author.display_avatar.url,
-                    url=message.jump_url,
-                )
-                await trackerthread.send(embed=threadembed)
-
-                msgembed = stock_embed(self.bot)
-                msgembed.color = message.author.color
-                msgembed.title = "🔍 User on watch..."
-                msgembed.description = f"**ID:** `{message.author.id}`\n**Thread:** {trackerthread.mention}\n**Last Update:** <t:{int(message.created_at.timestamp())}:f>"
-                msgembed.set_author(
-                    name=f"{self.bot.escape_message(message.author)}",
-                    icon_url=message.author.display_avatar.url,
-                )
-                await trackermsg.edit(content=None, embed=msgembed)
-        except KeyError:
+        if not await is_watched(message.guild.id, message.author.id):
             return
+        trackerthread, trackermsg = await self.tracker(message.guild, message.author.id)
+
+        threadembed = stock_embed(self.bot)
+        threadembed.color = message.author.color
+        threadembed.description = message.content
+        threadembed.set_author(
+            name=f"💬 {message.author} said in #{message.channel.name}...",
+            icon_url=message.author.display_avatar.url,
+            url=message.jump_url,
+        )
+        await trackerthread.send(embed=threadembed)
+
+        msgembed = stock_embed(self.bot)
+        msgembed.color = message.author.color
+        msgembed.title = "🔍 User on watch..."
+        msgembed.description = f"**ID:** `{message.author.id}`\n**Thread:** {trackerthread.mention}\n**Last Update:** <t:{int(message.created_at.timestamp())}:f>"
+        msgembed.set_author(
+            name=f"{self.bot.escape_message(message.author)}",
+            icon_url=message.author.display_avatar.url,
+        )
+        self.queue_update((message.guild.id, message.author.id), trackermsg, msgembed)
 
     @Cog.listener()
     async def on_member_join(self, member):
         await self.bot.wait_until_ready()
         if not self.enabled(member.guild):
             return
-        userlog = get_file("userlog", f"servers/{member.guild.id}")
-        try:
-            if userlog[str(member.id)]["watch"]["state"]:
-                trackerthread = await self.bot.fetch_channel(
-                    userlog[str(member.id)]["watch"]["thread"]
-                )
-                trackerchannel = self.bot.pull_channel(
-                    member.guild, get_config(member.guild.id, "staff", "watchchannel")
-                )
-                trackermsg = await trackerchannel.fetch_message(
-                    userlog[str(member.id)]["watch"]["message"]
-                )
-                invite_used = await self.bot.get_used_invites(member)
-
-                threadembed = stock_embed(self.bot)
-                threadembed.color = discord.Color.lighter_gray()
-                threadembed.title = "📥 User Joined"
-                threadembed.description = f"{member.mention} ({member.id})"
-                threadembed.set_thumbnail(url=member.display_avatar.url)
-                threadembed.set_author(
-                    name=member,
-                    icon_url=member.display_avatar.url,
-                )
-                createdat_embed(threadembed, member)
-                threadembed.add_field(
-                    name="📨 Invite used:", value=invite_used, inline=True
-                )
-                await trackerthread.send(embed=threadembed)
-
-                msgembed = stock_embed(self.bot)
-                msgembed.title = "🔍 User on watch..."
-                msgembed.description = f"**ID:** `{member.id}`\n**Thread:** {trackerthread.mention}\n**Last Update:** <t:{int(datetime.datetime.now().timestamp())}:f>"
-                msgembed.set_author(
-                    name=f"{self.bot.escape_message(member)}",
-                    icon_url=member.display_avatar.url,
-                )
-                await trackermsg.edit(content=None, embed=msgembed)
-        except KeyError:
+        if not await is_watched(member.guild.id, member.id):
             return
+        trackerthread, trackermsg = await self.tracker(member.guild, member.id)
+        invite_used = await self.bot.get_used_invites(member)
+
+        threadembed = stock_embed(self.bot)
+        threadembed.color = discord.Color.lighter_gray()
+        threadembed.title = "📥 User Joined"
+        threadembed.description = f"{member.mention} ({member.id})"
+        threadembed.set_thumbnail(url=member.display_avatar.url)
+        threadembed.set_author(
+            name=member,
+            icon_url=member.display_avatar.url,
+        )
+        createdat_embed(threadembed, member)
+        threadembed.add_field(name="📨 Invite used:", value=invite_used, inline=True)
+        await trackerthread.send(embed=threadembed)
+
+        msgembed = stock_embed(self.bot)
+        msgembed.title = "🔍 User on watch..."
+        msgembed.description = f"**ID:** `{member.id}`\n**Thread:** {trackerthread.mention}\n**Last Update:** <t:{int(datetime.datetime.now().timestamp())}:f>"
+        msgembed.set_author(
+            name=f"{self.bot.escape_message(member)}",
+            icon_url=member.display_avatar.url,
+        )
+        self.queue_update((member.guild.id, member.id), trackermsg, msgembed)
 
     @Cog.listener()
     async def on_member_remove(self, member):
         await self.bot.wait_until_ready()
         if not self.enabled(member.guild):
             return
-        userlog = get_file("userlog", f"servers/{member.guild.id}")
-        try:
-            if userlog[str(member.id)]["watch"]["state"]:
-                trackerthread = await self.bot.fetch_channel(
-                    userlog[str(member.id)]["watch"]["thread"]
-                )
-                trackerchannel = self.bot.pull_channel(
-                    member.guild, get_config(member.guild.id, "staff", "watchchannel")
-                )
-                trackermsg = await trackerchannel.fetch_message(
-                    userlog[str(member.id)]["watch"]["message"]
-                )
-
-                threadembed = stock_embed(self.bot)
-                threadembed.color = discord.Color.darker_gray()
-                threadembed.title = "📥 User Left"
-                threadembed.description = f"{member.mention} ({member.id})"
-                threadembed.set_thumbnail(url=member.display_avatar.url)
-                threadembed.set_author(
-                    name=member,
-                    icon_url=member.display_avatar.url,
-                )
-                createdat_embed(threadembed, member)
-                joinedat_embed(threadembed, member)
-                await trackerthread.send(embed=threadembed)
-
-                msgembed = stock_embed(self.bot)
-                msgembed.title = "🔍 User on watch..."
-                msgembed.description = f"**ID:** `{member.id}`\n**Thread:** {trackerthread.mention}\n**Last Update:** <t:{int(datetime.datetime.now().timestamp())}:f>"
-                msgembed.set_author(
-                    name=f"{self.bot.escape_message(member)}",
-                    icon_url=member.display_avatar.url,
-                )
-                await trackermsg.edit(content=None, embed=msgembed)
-        except KeyError:
+        if not await is_watched(member.guild.id, member.id):
             return
+        trackerthread, trackermsg = await self.tracker(member.guild, member.id)
+
+        threadembed = stock_embed(self.bot)
+        threadembed.color = discord.Color.darker_gray()
+        threadembed.title = "📥 User Left"
+        threadembed.description = f"{member.mention} ({member.id})"
+        threadembed.set_thumbnail(url=member.display_avatar.url)
+        threadembed.set_author(
+            name=member,
+            icon_url=member.display_avatar.url,
+        )
+        createdat_embed(threadembed, member)
+        joinedat_embed(threadembed, member)
+        await trackerthread.send(embed=threadembed)
+
+        msgembed = stock_embed(self.bot)
+        msgembed.title = "🔍 User on watch..."
+        msgembed.description = f"**ID:** `{member.id}`\n**Thread:** {trackerthread.mention}\n**Last Update:** <t:{int(datetime.datetime.now().timestamp())}:f>"
+        msgembed.set_author(
+            name=f"{self.bot.escape_message(member)}",
+            icon_url=member.display_avatar.url,
+        )
+        self.queue_update((member.guild.id, member.id), trackermsg, msgembed)
 
 
 async def setup(bot):
@@ -1,14 +1,15 @@
 import discord
 from discord.ext.commands import Cog
 from discord.ext import commands, tasks
-import json
 import re
 import datetime
 import asyncio
 from helpers.checks import ismod
 from helpers.sv_config import get_config
-from helpers.datafiles import get_file, fill_profile, set_file
+from helpers.datafiles import aget_file, afill_profile, aset_file
 from helpers.embeds import stock_embed, author_embed
+from helpers.pipeline import add_stage, remove_stage
+from helpers.expiring import ExpiringMap
 
 
 class Reply(Cog):
@@ -18,14 +19,19 @@ class Reply(Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.violations = {}
-        self.timers = {}
-        self.counttimer.start()
+        # (guild id, user id): violations, forgotten after a quiet day.
+        self.violations = ExpiringMap("violations", ttl=86400, maxsize=10000)
+        self.timers = ExpiringMap("replytimers", ttl=60, maxsize=10000)
         self.last_eval_result = None
         self.previous_eval_code = None
+        add_stage(
+            "noreply",
+            self.process_message,
+            lambda m: m.reference and m.type == discord.MessageType.reply,
+        )
 
     def cog_unload(self):
-        self.counttimer.cancel()
+        remove_stage("noreply")
 
     def check_override(self, message):
         if not message.guild:
@@ -69,11 +75,10 @@ class Reply(Cog):
         ):
             return
 
-        if message.guild.id not in self.violations:
-            self.violations[message.guild.id] = {}
-        if message.author.id not in self.violations[message.guild.id]:
-            self.violations[message.guild.id][message.author.id] = 0
-            usertracks = get_file("usertrack", f"servers/{message.guild.id}")
+        key = (message.guild.id, message.author.id)
+        if key not in self.violations:
+            self.violations[key] = 0
+            usertracks = await aget_file("usertrack", f"servers/{message.guild.id}")
             if (
                 str(message.author.id) not in usertracks
                 or usertracks[str(message.author.id)]["truedays"] < 14
@@ -85,13 +90,13 @@ class Reply(Cog):
                     mention_author=True,
                 )
 
-        self.violations[message.guild.id][message.author.id] += 1
-        if self.violations[message.guild.id][message.author.id] == maximum:
+        self.violations[key] += 1
+        if self.violations[key] == maximum:
             await message.reply(
                 content=f"you wouldve reached the reply ping violation staff ping, but im kind enough to let you off with nothing",
                 mention_author=False,
             )
-            self.violations[message.guild.id][message.author.id] = 0
+            self.violations[key] = 0
             return
 
         counts = [
@@ -108,9 +113,7 @@ class Reply(Cog):
             "🔟",
         ]
 
-        await message.add_reaction(
-            counts[self.violations[message.guild.id][message.author.id]]
-        )
+        await message.add_reaction(counts[self.violations[key]])
         await message.add_reaction("🛑")
 
         reacted = self.bot.await_reaction(
@@ -119,20 +122,14 @@ class Reply(Cog):
         if not reacted:
             return await message.clear_reaction("🛑")
 
-        self.violations[message.guild.id][message.author.id] -= 1
+        self.violations[key] -= 1
         await message.clear_reaction("🛑")
-        await message.clear_reaction(
-            counts[self.violations[message.guild.id][message.author.id] + 1]
-        )
-        await message.add_reaction(
-            counts[self.violations[message.guild.id][message.author.id]]
-        )
+        await message.clear_reaction(counts[self.violations[key] + 1])
+        await message.add_reaction(counts[self.violations[key]])
         await message.add_reaction("👍")
         await asyncio.sleep(5)
         await message.clear_reaction("👍")
-        await message.clear_reaction(
-            counts[self.violations[message.guild.id][message.author.id]]
-        )
+        await message.clear_reaction(counts[self.violations[key]])
         return
 
     @commands.check(ismod)
@@ -145,17 +142,13 @@ class Reply(Cog):
 
         - `target`
         The target to reset violations for."""
-        if (
-            ctx.guild.id not in self.violations
-            or target.id not in self.violations[message.guild.id]
-            or self.violations[message.guild.id][message.author.id] == 0
-        ):
+        if not self.violations.get((ctx.guild.id, target.id)):
             return await ctx.reply(
                 content="This user doesn't have any reply ping violations.",
                 mention_author=False,
             )
         else:
-            self.usercounts[target.id] = 0
+            self.violations.pop((ctx.guild.id, target.id))
             return await ctx.reply(
                 content="This user's reply ping counter has been reset.",
                 mention_author=False,
@@ -177,7 +170,7 @@ class Reply(Cog):
                 mention_author=False,
             )
 
-        profile = fill_profile(ctx.author.id)
+        profile = await afill_profile(ctx.author.id)
         embed = stock_embed(self.bot)
         embed.title = "🏓 Your reply preference..."
         embed.color = discord.Color.red()
@@ -256,7 +249,7 @@ class Reply(Cog):
                 profile["replypref"] = "waitbeforereplyping"
             elif str(reaction) == reacts[3]:
                 profile["replypref"] = "noreplyping"
-            set_file("profile", json.dumps(profile), f"users/{ctx.author.id}")
+            await aset_file("profile", profile, f"users/{ctx.author.id}")
             embed.clear_fields()
             fieldadd()
             embed.color = discord.Color.gold()
@@ -264,10 +257,7 @@ class Reply(Cog):
                 await configmsg.remove_reaction(react, ctx.bot.user)
             await configmsg.edit(embed=embed, allowed_mentions=allowed_mentions)
 
-    @Cog.listener()
-    async def on_message(self, message):
-        await self.bot.wait_until_ready()
-
+    async def process_message(self, message):
         if (
             message.author.bot
             or message.is_system()
@@ -291,7 +281,7 @@ class Reply(Cog):
 
         preference = self.check_override(refmessage)
         if not preference:
-            preference = fill_profile(refmessage.author.id)["replypref"]
+            preference = (await afill_profile(refmessage.author.id))["replypref"]
             if not preference:
                 return
 
@@ -318,7 +308,7 @@ class Reply(Cog):
                 )
             except discord.errors.NotFound:
                 return await message.reply(
-                    content=f"{message.author.mention} immediately deleted their own message.\n{message.author.display_name} now has `{self.violations[message.guild.id][message.author.id]}` violation(s).",
+                    content=f"{message.author.mention} immediately deleted their own message.\n{message.author.display_name} now has `{self.violations.get((message.guild.id, message.author.id), 0)}` violation(s).",
                     mention_author=True,
                 )
 
@@ -343,24 +333,17 @@ class Reply(Cog):
             preference == "waitbeforereplyping"
             and refmessage.author in message.mentions
         ):
-            if message.guild.id not in self.timers:
-                self.timers[message.guild.id] = {}
-            self.timers[message.guild.id][refmessage.author.id] = int(
+            self.timers[(message.guild.id, refmessage.author.id)] = int(
                 refmessage.created_at.timestamp()
             )
             if (
                 int(message.created_at.timestamp()) - 30
-                <= self.timers[message.guild.id][refmessage.author.id]
+                <= self.timers[(message.guild.id, refmessage.author.id)]
             ):
                 await message.add_reaction("<:mping:1266129731959656530>")
                 await wrap_violation(message)
             return
 
-    @tasks.loop(hours=24)
-    async def counttimer(self):
-        await self.bot.wait_until_ready()
-        self.violations = {}
-
 
 async def setup(bot):
     await bot.add_cog(Reply(bot))
@@ -0,0 +1,65 @@
+import time
+import asyncio
+import discord
+from discord.ext import commands
+from discord.ext.commands import Cog
+from helpers.checks import ismanager
+from helpers.embeds import stock_embed
+from helpers.errors import handle_code_error
+from helpers.pipeline import pick_stages, time_stage, stages, stagetimes
+
+
+class Pipeline(Cog):
+    """
+    Runs message stages for every other cog.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.running = set()
+
+    async def run_stage(self, name, callback, message):
+        start = time.perf_counter()
+        try:
+            await callback(message)
+        except:
+            await handle_code_error(self.bot, name, (message,), {})
+        finally:
+            time_stage(name, time.perf_counter() - start)
+
+    @Cog.listener()
+    async def on_message(self, message):
+        await self.bot.wait_until_ready()
+        if not message.guild:
+            return
+        picked, failed = pick_stages(message)
+        for name, callback in picked:
+            task = asyncio.create_task(self.run_stage(name, callback, message))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+        for name, err in failed:
+            await handle_code_error(self.bot, name, (message,), {}, err)
+
+    @commands.check(ismanager)
+    @commands.command()
+    async def pipeline(self, ctx):
+        """This shows the message pipeline's stages.
+
+        Includes how often and how long each stage runs.
+
+        No arguments."""
+        embed = stock_embed(self.bot)
+        embed.title = "🚰 Message stages..."
+        embed.color = ctx.author.color
+        for name, (runs, total, slowest) in stagetimes.items():
+            embed.add_field(
+                name=name + ("" if name in stages else " (removed)"),
+                value=f"**Runs:** {runs}\n"
+                + f"**Average:** {total / runs * 1000 if runs else 0:.2f}ms\n"
+                + f"**Slowest:** {slowest * 1000:.2f}ms",
+            )
+        await ctx.reply(embed=embed, mention_author=False)
+
+
+async def setup(bot):
+    await bot.add_cog(Pipeline(bot))
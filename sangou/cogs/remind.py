@@ -4,7 +4,7 @@ import time
 from datetime import datetime, timezone
 from discord.ext import commands
 from discord.ext.commands import Cog
-from helpers.datafiles import add_job, get_file, delete_job
+from helpers.datafiles import add_job, aget_file, delete_job, owner_jobs
 from helpers.embeds import stock_embed, author_embed
 
 
@@ -12,6 +12,10 @@ class Remind(Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    def user_reminders(self, uid):
+        # Soonest first, as (job_name, timestamp).
+        return sorted(owner_jobs(uid).items(), key=lambda job: int(job[1]))
+
     @commands.bot_has_permissions(embed_links=True)
     @commands.group(invoke_without_command=True)
     async def reminders(self, ctx):
@@ -20,18 +24,15 @@ class Remind(Cog):
         There's not much more to it.
 
         No arguments."""
-        ctab = get_file("timers")
-        uid = str(ctx.author.id)
+        ctab = await aget_file("timers")
         embed = stock_embed(self.bot)
         embed.title = "⏳ Your current reminders..."
         embed.color = ctx.author.color
         author_embed(embed, ctx.author)
-        idx = 0
-        for jobtimestamp in ctab["remind"]:
-            if uid not in ctab["remind"][jobtimestamp]:
-                continue
-            idx = idx + 1
-            job_details = ctab["remind"][jobtimestamp][uid]
+        for idx, (job_name, jobtimestamp) in enumerate(
+            self.user_reminders(ctx.author.id), 1
+        ):
+            job_details = ctab["remind"][jobtimestamp][job_name]
             addedtime = job_details["added"]
             embed.add_field(
                 name=f"`{idx}` | Reminder on <t:{jobtimestamp}:F>",
@@ -50,18 +51,16 @@ class Remind(Cog):
 
         - `number`
         The index of the reminder to remove."""
-        ctab = get_file("timers")
-        uid = str(ctx.author.id)
-        idx = 0
-        for jobtimestamp in ctab["remind"]:
-            if uid not in ctab["remind"][jobtimestamp]:
-                continue
-            idx = idx + 1
-            if idx == number:
-                delete_job(jobtimestamp, "remind", uid)
-                await ctx.reply(content="Reminder removed.", mention_author=False)
-                return
-        await ctx.reply(content="This reminder does not exist.", mention_author=False)
+        # Loads timers off the loop, owner_jobs then reads it from the cache.
+        await aget_file("timers")
+        reminders = self.user_reminders(ctx.author.id)
+        if not 0 < number <= len(reminders):
+            return await ctx.reply(
+                content="This reminder does not exist.", mention_author=False
+            )
+        job_name, jobtimestamp = reminders[number - 1]
+        delete_job(jobtimestamp, "remind", job_name)
+        await ctx.reply(content="Reminder removed.", mention_author=False)
 
     @commands.bot_has_permissions(embed_links=True)
     @commands.command(aliases=["remindme"])
@@ -92,8 +91,8 @@ class Remind(Cog):
 
         add_job(
             "remind",
-            ctx.author.id,
-            {"text": safe_text, "added": current_timestamp},
+            f"{ctx.author.id}-{ctx.message.id}",
+            {"text": safe_text, "added": current_timestamp, "user": ctx.author.id},
             expiry_timestamp,
         )
 
@@ -2,8 +2,9 @@ import json
 import discord
 from discord.ext import commands
 from discord.ext.commands import Cog
-from helpers.datafiles import fill_profile, set_file
+from helpers.datafiles import afill_profile, aset_file
 from helpers.embeds import stock_embed, author_embed
+from helpers.userindex import forget_user
 
 
 class Shortcuts(Cog):
@@ -27,7 +28,7 @@ class Shortcuts(Cog):
         embed.description = f"Use `{ctx.prefix}{ctx.command} add/remove` to change your prefixes.\nMentioning the bot will always be a prefix."
         embed.color = ctx.author.color
         author_embed(embed, ctx.author)
-        profile = fill_profile(ctx.author.id)
+        profile = await afill_profile(ctx.author.id)
         userprefixes = profile["prefixes"]
         maxprefixes = (
             self.bot.config.maxprefixes if self.bot.config.maxprefixes <= 25 else 25
@@ -52,13 +53,14 @@ class Shortcuts(Cog):
 
         - `arg`
         The prefix to add."""
-        profile = fill_profile(ctx.author.id)
+        profile = await afill_profile(ctx.author.id)
         maxprefixes = (
             self.bot.config.maxprefixes if self.bot.config.maxprefixes <= 25 else 25
         )
         if not len(profile["prefixes"]) >= maxprefixes:
             profile["prefixes"].append(f"{arg} ")
-            set_file("profile", json.dumps(profile), f"users/{ctx.author.id}")
+            await aset_file("profile", json.dumps(profile), f"users/{ctx.author.id}")
+            forget_user(ctx.author.id)
             await ctx.reply(content="Prefix added.", mention_author=False)
         else:
             await ctx.reply(
@@ -74,10 +76,11 @@ class Shortcuts(Cog):
 
         - `number`
         The index of the prefix to remove."""
-        profile = fill_profile(ctx.author.id)
+        profile = await afill_profile(ctx.author.id)
         try:
             profile["prefixes"].pop(number - 1)
-            set_file("profile", json.dumps(profile), f"users/{ctx.author.id}")
+            await aset_file("profile", json.dumps(profile), f"users/{ctx.author.id}")
+            forget_user(ctx.author.id)
             await ctx.reply(content="Prefix removed.", mention_author=False)
         except IndexError:
             await ctx.reply(content="This prefix does not exist.", mention_author=False)
@@ -97,7 +100,7 @@ class Shortcuts(Cog):
         )
         embed.color = ctx.author.color
         author_embed(embed, ctx.author)
-        profile = fill_profile(ctx.author.id)
+        profile = await afill_profile(ctx.author.id)
         useraliases = profile["aliases"]
         maxaliases = (
             self.bot.config.maxaliases if self.bot.config.maxaliases <= 25 else 25
@@ -128,7 +131,7 @@ class Shortcuts(Cog):
         The command to alias.
         - `alias`
         The alias to add."""
-        profile = fill_profile(ctx.author.id)
+        profile = await afill_profile(ctx.author.id)
         botcommand = self.bot.get_command(command)
         if not botcommand:
             return await ctx.reply(
@@ -150,7 +153,8 @@ class Shortcuts(Cog):
             )
 
         profile["aliases"].append({botcommand.qualified_name: alias})
-        set_file("profile", json.dumps(profile), f"users/{ctx.author.id}")
+        await aset_file("profile", json.dumps(profile), f"users/{ctx.author.id}")
+        forget_user(ctx.author.id)
         return await ctx.reply(content="Alias added.", mention_author=False)
 
     @aliases.command(name="remove")
@@ -161,10 +165,11 @@ class Shortcuts(Cog):
 
         - `number`
         The index of the alias to remove."""
-        profile = fill_profile(ctx.author.id)
+        profile = await afill_profile(ctx.author.id)
         try:
             profile["aliases"].pop(number - 1)
-            set_file("profile", json.dumps(profile), f"users/{ctx.author.id}")
+            await aset_file("profile", json.dumps(profile), f"users/{ctx.author.id}")
+            forget_user(ctx.author.id)
             await ctx.reply(content="Alias removed.", mention_author=False)
         except IndexError:
             await ctx.reply(content="This alias does not exist.", mention_author=False)
@@ -5,11 +5,21 @@ from discord.ext.commands import Cog
 from helpers.checks import ismod
 from helpers.sv_config import get_config
 from helpers.embeds import stock_embed
+from helpers.pipeline import add_stage, remove_stage
 
 
 class specific(Cog):
     def __init__(self, bot):
         self.bot = bot
+        add_stage(
+            "specific",
+            self.process_message,
+            lambda m: m.channel.id in (1236417696741199873, 402019542345449472),
+            bots=True,
+        )
+
+    def cog_unload(self):
+        remove_stage("specific")
 
     @commands.bot_has_permissions(embed_links=True)
     @commands.guild_only()
@@ -154,10 +164,7 @@ class specific(Cog):
                 content="You are unable to use this command.", mention_author=False
             )
 
-    @Cog.listener()
-    async def on_message(self, message):
-        await self.bot.wait_until_ready()
-
+    async def process_message(self, message):
         # R/UTDR's announcement handling.
         if (
             message.guild
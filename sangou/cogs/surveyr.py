@@ -2,7 +2,6 @@ import discord
 from discord.ext import commands
 from discord.ext.commands import Cog
 from discord.utils import escape_markdown
-import json
 import datetime
 import asyncio
 import os
@@ -11,9 +10,11 @@ from helpers.sv_config import get_config
 from helpers.datafiles import (
     new_survey,
     edit_survey,
-    get_file,
-    set_file,
+    aget_file,
+    aset_file,
 )
+from helpers.expiring import ExpiringMap
+from helpers.audit import find_entry, entry_user
 
 
 class Surveyr(Cog):
@@ -24,7 +25,8 @@ class Surveyr(Cog):
     def __init__(self, bot):
         self.bot = bot
         self.nocfgmsg = "Surveyr isn't set up for this server."
-        self.bancooldown = {}
+        # (guild id, user id) for bans that might turn out to be softbans.
+        self.bancooldown = ExpiringMap("bancooldown", ttl=60, maxsize=1000)
         self.event_types = {
             "bans": "Ban",
             "unbans": "Unban",
@@ -36,12 +38,16 @@ class Surveyr(Cog):
         }
 
     def enabled(self, g):
-        return all(
-            (
-                self.bot.pull_channel(g, get_config(g.id, "surveyr", "surveychannel")),
-                type(get_config(g.id, "surveyr", "startingcase")) == int,
-                get_config(g.id, "surveyr", "loggingtypes"),
-            )
+        policy = self.bot.pull_policy(g)
+        return policy.flag(
+            "surveyr",
+            lambda: all(
+                (
+                    policy.channel("surveyr", "surveychannel"),
+                    type(policy.get("surveyr", "startingcase")) == int,
+                    policy.get("surveyr", "loggingtypes"),
+                )
+            ),
         )
 
     def case_handler(self, cases, surveys):
@@ -63,8 +69,8 @@ class Surveyr(Cog):
             except:
                 return None
 
-    def format_handler(self, entry):
-        if entry.user.id == self.bot.user.id:
+    async def format_handler(self, entry):
+        if entry.user_id == self.bot.user.id:
             # Recognize audit log reason formats by Sangou
             user = entry.guild.get_member_named(entry.reason.split()[3].split("#")[0])
             reason = (
@@ -73,7 +79,7 @@ class Surveyr(Cog):
                 else f"No reason was given, {user.mention}..."
             )
         else:
-            user = entry.user
+            user = await entry_user(self.bot, entry)
             reason = (
                 entry.reason
                 if entry.reason
@@ -101,7 +107,7 @@ class Surveyr(Cog):
         No arguments."""
         if not self.enabled(ctx.guild):
             return await ctx.reply(content=self.nocfgmsg, mention_author=False)
-        surveys = get_file("surveys", f"servers/{ctx.guild.id}")
+        surveys = await aget_file("surveys", f"servers/{ctx.guild.id}")
         if not surveys:
             await ctx.reply(content="There are no surveys yet.", mention_author=False)
         msg = []
@@ -143,7 +149,7 @@ class Surveyr(Cog):
         The reason for the action."""
         if not self.enabled(ctx.guild):
             return await ctx.reply(content=self.nocfgmsg, mention_author=False)
-        surveys = get_file("surveys", f"servers/{ctx.guild.id}")
+        surveys = await aget_file("surveys", f"servers/{ctx.guild.id}")
         survey_channel = self.bot.pull_channel(
             ctx.guild, get_config(ctx.guild.id, "surveyr", "surveychannel")
         )
@@ -177,7 +183,7 @@ class Surveyr(Cog):
         if not self.enabled(ctx.guild):
             return await ctx.reply(content=self.nocfgmsg, mention_author=False)
         cases = self.case_handler(
-            caseids, get_file("surveys", f"servers/{ctx.guild.id}")
+            caseids, await aget_file("surveys", f"servers/{ctx.guild.id}")
         )
         if not cases:
             return await ctx.reply(content="Malformed cases.", mention_author=False)
@@ -199,7 +205,9 @@ class Surveyr(Cog):
         msg = []
         for case in cases:
             try:
-                survey = get_file("surveys", f"servers/{ctx.guild.id}")[str(case)]
+                survey = (await aget_file("surveys", f"servers/{ctx.guild.id}"))[
+                    str(case)
+                ]
                 msg = await self.bot.pull_channel(
                     ctx.guild, get_config(ctx.guild.id, "surveyr", "surveychannel")
                 ).fetch_message(survey["post_id"])
@@ -241,7 +249,7 @@ class Surveyr(Cog):
         if not self.enabled(ctx.guild):
             return await ctx.reply(content=self.nocfgmsg, mention_author=False)
         cases = self.case_handler(
-            caseids, get_file("surveys", f"servers/{ctx.guild.id}")
+            caseids, await aget_file("surveys", f"servers/{ctx.guild.id}")
         )
         if not cases:
             return await ctx.reply(content="Malformed cases.", mention_author=False)
@@ -263,7 +271,9 @@ class Surveyr(Cog):
 
         for case in cases:
             try:
-                survey = get_file("surveys", f"servers/{ctx.guild.id}")[str(case)]
+                survey = (await aget_file("surveys", f"servers/{ctx.guild.id}"))[
+                    str(case)
+                ]
                 member = await self.bot.fetch_user(survey["target_id"])
                 censored_username = "`" + " " * len(member.name) + "`"
                 censored_globalname = (
@@ -304,7 +314,7 @@ class Surveyr(Cog):
         if not self.enabled(ctx.guild):
             return await ctx.reply(content=self.nocfgmsg, mention_author=False)
         cases = self.case_handler(
-            caseids, get_file("surveys", f"servers/{ctx.guild.id}")
+            caseids, await aget_file("surveys", f"servers/{ctx.guild.id}")
         )
         if not cases:
             return await ctx.reply(content="Malformed cases.", mention_author=False)
@@ -326,7 +336,9 @@ class Surveyr(Cog):
 
         for case in cases:
             try:
-                survey = get_file("surveys", f"servers/{ctx.guild.id}")[str(case)]
+                survey = (await aget_file("surveys", f"servers/{ctx.guild.id}"))[
+                    str(case)
+                ]
                 member = await self.bot.fetch_user(survey["target_id"])
                 msg = await self.bot.pull_channel(
                     ctx.guild, get_config(ctx.guild.id, "surveyr", "surveychannel")
@@ -356,7 +368,7 @@ class Surveyr(Cog):
         if not self.enabled(ctx.guild):
             return await ctx.reply(content=self.nocfgmsg, mention_author=False)
         cases = self.case_handler(
-            caseid + "..l", get_file("surveys", f"servers/{ctx.guild.id}")
+            caseid + "..l", await aget_file("surveys", f"servers/{ctx.guild.id}")
         )
         if not cases:
             return await ctx.reply(content="Malformed cases.", mention_author=False)
@@ -382,7 +394,9 @@ class Surveyr(Cog):
 
         for case in cases:
             try:
-                survey = get_file("surveys", f"servers/{ctx.guild.id}")[str(case)]
+                survey = (await aget_file("surveys", f"servers/{ctx.guild.id}"))[
+                    str(case)
+                ]
             except KeyError:
                 await ctx.reply(
                     content="You sent cases that exceed the actual case list.\nThese cases have been ignored.",
@@ -405,9 +419,9 @@ class Surveyr(Cog):
                     f"**Reason:** {survey['reason']}"
                 )
             )
-            surveys = get_file("surveys", f"servers/{ctx.guild.id}")
+            surveys = await aget_file("surveys", f"servers/{ctx.guild.id}")
             surveys[str(case)]["post_id"] = msg.id
-            set_file("surveys", json.dumps(surveys), f"servers/{ctx.guild.id}")
+            await aset_file("surveys", surveys, f"servers/{ctx.guild.id}")
 
         reposted = int(cases[0]) if len(cases) == 1 else f"{cases[0]}-{cases[-1]}"
         await ctx.reply(content=f"Reposted `{reposted}`.", mention_author=False)
@@ -424,7 +438,7 @@ class Surveyr(Cog):
         if not self.enabled(ctx.guild):
             return await ctx.reply(content=self.nocfgmsg, mention_author=False)
         cases = self.case_handler(
-            caseids, get_file("surveys", f"servers/{ctx.guild.id}")
+            caseids, await aget_file("surveys", f"servers/{ctx.guild.id}")
         )
         if not cases:
             return await ctx.reply(content="Malformed cases.", mention_author=False)
@@ -432,7 +446,9 @@ class Surveyr(Cog):
         userids = []
         for case in cases:
             try:
-                survey = get_file("surveys", f"servers/{ctx.guild.id}")[str(case)]
+                survey = (await aget_file("surveys", f"servers/{ctx.guild.id}"))[
+                    str(case)
+                ]
                 if survey["type"] == "bans":
                     userids.append(str(survey["target_id"]))
             except KeyError:
@@ -459,26 +475,11 @@ class Surveyr(Cog):
             member.guild, get_config(member.guild.id, "surveyr", "surveychannel")
         )
 
-        # Waiting for Discord's mistimed audit log entry.
-        entry = None
-        for x in range(60):
-            if x == 59:
-                return
-            async for log in guild.audit_logs(
-                limit=10,
-                after=datetime.datetime.now() - datetime.timedelta(minutes=1),
-                oldest_first=False,
-                action=discord.AuditLogAction.kick,
-            ):
-                if log.target.id == member.id:
-                    entry = log
-                    break
-            if entry:
-                break
-            else:
-                await asyncio.sleep(1)
+        entry = await find_entry(guild, discord.AuditLogAction.kick, member.id)
+        if not entry:
+            return
 
-        user, reason = self.format_handler(entry)
+        user, reason = await self.format_handler(entry)
 
         msg = await survey_channel.send(content="⌛")
         caseid, timestamp = new_survey(
@@ -506,34 +507,17 @@ class Surveyr(Cog):
             guild, get_config(guild.id, "surveyr", "surveychannel")
         )
 
-        # Waiting for Discord's mistimed audit log entry.
-        entry = None
-        for x in range(60):
-            if x == 59:
-                return
-            async for log in guild.audit_logs(
-                limit=10,
-                after=datetime.datetime.now() - datetime.timedelta(minutes=1),
-                oldest_first=False,
-                action=discord.AuditLogAction.ban,
-            ):
-                if log.target.id == member.id:
-                    entry = log
-                    break
-            if entry:
-                break
-            else:
-                await asyncio.sleep(1)
+        entry = await find_entry(guild, discord.AuditLogAction.ban, member.id)
+        if not entry:
+            return
 
-        user, reason = self.format_handler(entry)
+        user, reason = await self.format_handler(entry)
 
         msg = await survey_channel.send(content="⌛")
         caseid, timestamp = new_survey(
             guild.id, member.id, msg.id, user.id, reason, "bans"
         )
-        if guild.id not in self.bancooldown:
-            self.bancooldown[guild.id] = []
-        self.bancooldown[guild.id].append(member.id)
+        self.bancooldown[(guild.id, member.id)] = True
 
         await msg.edit(
             content=(
@@ -547,15 +531,17 @@ class Surveyr(Cog):
         await asyncio.sleep(2)
         try:
             await guild.fetch_ban(member)
-            self.bancooldown[guild.id].remove(member.id)
+            self.bancooldown.pop((guild.id, member.id))
         except discord.NotFound:
-            reason = get_file("surveys", f"servers/{guild.id}")[str(caseid)]["reason"]
-            edit_survey(guild.id, caseid, entry.user.id, reason, "softbans")
+            reason = (await aget_file("surveys", f"servers/{guild.id}"))[str(caseid)][
+                "reason"
+            ]
+            edit_survey(guild.id, caseid, entry.user_id, reason, "softbans")
             msg = await guild.get_channel(survey_channel).fetch_message(msg.id)
             content = msg.content.split("\n")
             content[0] = f"`#{caseid}` **SOFTBAN** on <t:{timestamp}:f>"
             await msg.edit(content="\n".join(content))
-            self.bancooldown[guild.id].remove(member.id)
+            self.bancooldown.pop((guild.id, member.id))
         return
 
     @Cog.listener()
@@ -564,34 +550,18 @@ class Surveyr(Cog):
         if (
             not self.enabled(guild)
             or "unban" not in get_config(guild.id, "surveyr", "loggingtypes")
-            or guild.id in self.bancooldown
-            and member.id in self.bancooldown[guild.id]
+            or (guild.id, member.id) in self.bancooldown
         ):
             return
         survey_channel = self.bot.pull_channel(
             guild, get_config(guild.id, "surveyr", "surveychannel")
         )
 
-        # Waiting for Discord's mistimed audit log entry.
-        entry = None
-        for x in range(60):
-            if x == 59:
-                return
-            async for log in guild.audit_logs(
-                limit=10,
-                after=datetime.datetime.now() - datetime.timedelta(minutes=1),
-                oldest_first=False,
-                action=discord.AuditLogAction.unban,
-            ):
-                if log.target.id == member.id:
-                    entry = log
-                    break
-            if entry:
-                break
-            else:
-                await asyncio.sleep(1)
+        entry = await find_entry(guild, discord.AuditLogAction.unban, member.id)
+        if not entry:
+            return
 
-        user, reason = self.format_handler(entry)
+        user, reason = await self.format_handler(entry)
 
         msg = await survey_channel.send(content="⌛")
         caseid, timestamp = new_survey(
@@ -630,26 +600,16 @@ class Surveyr(Cog):
             and not member_before.timed_out_until
             and member_after.timed_out_until
         ):
-            # Waiting for Discord's mistimed audit log entry.
-            entry = None
-            for x in range(60):
-                if x == 59:
-                    return
-                async for log in guild.audit_logs(
-                    limit=10,
-                    after=datetime.datetime.now() - datetime.timedelta(minutes=1),
-                    oldest_first=False,
-                    action=discord.AuditLogAction.member_update,
-                ):
-                    if log.target.id == member_after.id and log.after.timed_out_until:
-                        entry = log
-                        break
-                if entry:
-                    break
-                else:
-                    await asyncio.sleep(1)
+            entry = await find_entry(
+                guild,
+                discord.AuditLogAction.member_update,
+                member_after.id,
+                check=lambda e: getattr(e.after, "timed_out_until", None),
+            )
+            if not entry:
+                return
 
-            user, reason = self.format_handler(entry)
+            user, reason = await self.format_handler(entry)
 
             msg = await survey_channel.send(content="⌛")
             caseid, timestamp = new_survey(
@@ -691,26 +651,15 @@ class Surveyr(Cog):
                     # Special Role Removed
                     role_remove.append(role.id)
 
-            # Waiting for Discord's mistimed audit log entry.
-            entry = None
-            for x in range(60):
-                if x == 59:
-                    return
-                async for log in guild.audit_logs(
-                    limit=10,
-                    after=datetime.datetime.now() - datetime.timedelta(minutes=1),
-                    oldest_first=False,
-                    action=discord.AuditLogAction.member_update,
-                ):
-                    if log.target.id == member_after.id:
-                        entry = log
-                        break
-                if entry:
-                    break
-                else:
-                    await asyncio.sleep(1)
-
-            user, reason = self.format_handler(entry)
+            if not role_add and not role_remove:
+                return
+            entry = await find_entry(
+                guild, discord.AuditLogAction.member_role_update, member_after.id
+            )
+            if not entry:
+                return
+
+            user, reason = await self.format_handler(entry)
 
             if "promote" in get_config(
                 member_after.guild.id, "surveyr", "loggingtypes"
@@ -1,29 +1,57 @@
 import time
+import heapq
+import asyncio
 import discord
 import traceback
 import random
-import shutil
 import os
+import functools
 from datetime import datetime, timezone
 from discord.ext import commands, tasks
 from discord.ext.commands import Cog
-from helpers.datafiles import get_file, delete_job
+from helpers import datafiles
+from helpers.datafiles import (
+    aget_file,
+    delete_job,
+    delete_jobs,
+    reading_files,
+    live_database,
+)
 from helpers.checks import ismanager
+from helpers.backups import take_snapshot
 from helpers.placeholders import game_type, game_names
 
 
 class Timer(Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.minutely.start()
+        # (timestamp, jobtype) buckets waiting to fire, soonest first.
+        self.jobheap = []
+        self.job_workers = 8
+        self.job_retries = 3
+        # Seconds to wait before trying buckets again after the scheduler errors.
+        self.error_delay = 60
+        self.armed = set()
+        self.wakeup = asyncio.Event()
+        datafiles.job_armer = self.arm_job
+        self.scheduler = self.bot.loop.create_task(self.run_jobs())
         self.hourly.start()
         self.daily.start()
 
     def cog_unload(self):
-        self.minutely.cancel()
+        datafiles.job_armer = None
+        self.scheduler.cancel()
         self.hourly.cancel()
         self.daily.cancel()
 
+    def arm_job(self, timestamp, jobtype):
+        if (timestamp, jobtype) in self.armed:
+            return
+        self.armed.add((timestamp, jobtype))
+        heapq.heappush(self.jobheap, (timestamp, jobtype))
+        if self.jobheap[0] == (timestamp, jobtype):
+            self.wakeup.set()
+
     @commands.check(ismanager)
     @commands.command()
     async def listjobs(self, ctx):
@@ -32,7 +60,7 @@ class Timer(Cog):
         I really need to revamp this system.
 
         No arguments."""
-        ctab = get_file("timers")
+        ctab = await aget_file("timers")
         embed = discord.Embed(title=f"Active jobs")
         for jobtype in ctab:
             for jobtimestamp in ctab[jobtype]:
@@ -57,63 +85,128 @@ class Timer(Cog):
         - `job_type`
         The type of the job.
         - `job_name`
-        The name of the job. A userid."""
+        The name of the job. A userid, or a reminder's ID."""
         delete_job(timestamp, job_type, job_name)
         await ctx.send(f"{ctx.author.mention}: Deleted!")
 
-    async def do_jobs(self, ctab, jobtype, timestamp):
-        for job_name in ctab[jobtype][timestamp]:
+    async def do_job(self, jobtype, job_name, job_details):
+        if jobtype == "unban":
+            target_user = self.bot.get_user(int(job_name)) or await self.bot.fetch_user(
+                job_name
+            )
+            target_guild = self.bot.get_guild(job_details["guild"])
+            await target_guild.unban(target_user, reason="Timed ban expired.")
+        elif jobtype == "remind":
+            text = job_details["text"]
+            original_timestamp = job_details["added"]
+            # Older reminders are named after their user.
+            uid = int(job_details.get("user", job_name))
+            target = self.bot.get_user(uid) or await self.bot.fetch_user(uid)
+            if target:
+                embed = discord.Embed(
+                    title="⏰ Reminder",
+                    description=f"You asked to be reminded <t:{original_timestamp}:R> on <t:{original_timestamp}:f>.",
+                    timestamp=datetime.now(),
+                )
+                embed.set_footer(
+                    text=self.bot.user.name, icon_url=self.bot.user.avatar.url
+                )
+                embed.add_field(
+                    name="📝 Contents",
+                    value=f"{text}",
+                    inline=False,
+                )
+                await target.send(embed=embed)
+
+    async def try_job(self, workers, jobtype, job_name, job_details):
+        async with workers:
+            for attempt in range(self.job_retries):
+                try:
+                    await self.do_job(jobtype, job_name, job_details)
+                    return None
+                except (discord.NotFound, discord.Forbidden):
+                    # Retrying won't bring them back.
+                    return traceback.format_exc()
+                except Exception:
+                    if attempt == self.job_retries - 1:
+                        return traceback.format_exc()
+                    await asyncio.sleep(2**attempt)
+
+    async def do_jobs(self, ctab, buckets):
+        jobs = [
+            (timestamp, jobtype, job_name, ctab[jobtype][timestamp][job_name])
+            for timestamp, jobtype in buckets
+            for job_name in ctab[jobtype][timestamp]
+        ]
+        workers = asyncio.Semaphore(self.job_workers)
+        errors = await asyncio.gather(
+            *[
+                self.try_job(workers, jobtype, job_name, job_details)
+                for timestamp, jobtype, job_name, job_details in jobs
+            ]
+        )
+        # Failed jobs are deleted too, so they can't stall the timer.
+        delete_jobs(
+            [(timestamp, jobtype, job_name) for timestamp, jobtype, job_name, _ in jobs]
+        )
+
+        failed = [
+            f"{jobtype} for {job_name} on {timestamp}"
+            for (timestamp, jobtype, job_name, _), error in zip(jobs, errors)
+            if error
+        ]
+        if not failed:
+            return
+        error = next(e for e in errors if e)
+        for manager in self.bot.config.managers:
+            await self.bot.get_user(manager).send(
+                f"Crondo has errored on {len(failed)} job(s), jobs deleted:\n"
+                + "\n".join(failed[:10])
+                + (f"\n...and {len(failed) - 10} more." if len(failed) > 10 else "")
+                + f"\nFirst error: ```{error[-1500:]}```"
+            )
+
+    async def run_jobs(self):
+        await self.bot.wait_until_ready()
+        # timers.json stays the source of truth, the heap is rebuilt from it.
+        ctab = await aget_file("timers")
+        for jobtype in ctab:
+            for jobtimestamp in ctab[jobtype]:
+                self.arm_job(int(jobtimestamp), jobtype)
+        while True:
+            buckets = []
             try:
-                job_details = ctab[jobtype][timestamp][job_name]
-                if jobtype == "unban":
-                    target_user = await self.bot.fetch_user(job_name)
-                    target_guild = self.bot.get_guild(job_details["guild"])
-                    delete_job(timestamp, jobtype, job_name)
-                    await target_guild.unban(target_user, reason="Timed ban expired.")
-                elif jobtype == "remind":
-                    text = job_details["text"]
-                    original_timestamp = job_details["added"]
-                    target = await self.bot.fetch_user(int(job_name))
-                    if target:
-                        embed = discord.Embed(
-                            title="⏰ Reminder",
-                            description=f"You asked to be reminded <t:{original_timestamp}:R> on <t:{original_timestamp}:f>.",
-                            timestamp=datetime.now(),
-                        )
-                        embed.set_footer(
-                            text=self.bot.user.name, icon_url=self.bot.user.avatar.url
-                        )
-                        embed.add_field(
-                            name="📝 Contents",
-                            value=f"{text}",
-                            inline=False,
-                        )
-                        await target.send(embed=embed)
-                    delete_job(timestamp, jobtype, job_name)
-            except:
+                ctab = await aget_file("timers")
+                while self.jobheap and self.jobheap[0][0] <= time.time():
+                    timestamp, jobtype = heapq.heappop(self.jobheap)
+                    self.armed.discard((timestamp, jobtype))
+                    if jobtype in ctab and str(timestamp) in ctab[jobtype]:
+                        buckets.append((str(timestamp), jobtype))
+                if buckets:
+                    await self.do_jobs(ctab, buckets)
+            except Exception:
                 # Keeps the timer from halting in the event of an error.
-                delete_job(timestamp, jobtype, job_name)
+                # Buckets it didn't get through are still in timers.json, so
+                # they're armed again and retried after a bit.
+                for timestamp, jobtype in buckets:
+                    self.arm_job(int(timestamp), jobtype)
+                error = traceback.format_exc()
                 for manager in self.bot.config.managers:
-                    await self.bot.get_user(manager).send(
-                        f"Crondo has errored, job deleted: ```{traceback.format_exc()}```"
-                    )
-
-    @tasks.loop(minutes=1)
-    async def minutely(self):
-        await self.bot.wait_until_ready()
-        try:
-            ctab = get_file("timers")
-            timestamp = time.time()
-            for jobtype in ctab:
-                for jobtimestamp in ctab[jobtype]:
-                    if timestamp > int(jobtimestamp):
-                        await self.do_jobs(ctab, jobtype, jobtimestamp)
-        except:
-            # Keeps the timer from halting in the event of an error.
-            for manager in self.bot.config.managers:
-                await self.bot.get_user(manager).send(
-                    f"Cron-minutely has errored: ```{traceback.format_exc()}```"
+                    try:
+                        await self.bot.get_user(manager).send(
+                            f"Cron-scheduler has errored: ```{error[-1500:]}```"
+                        )
+                    except Exception:
+                        pass
+                await asyncio.sleep(self.error_delay)
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self.wakeup.wait(),
+                    self.jobheap[0][0] - time.time() if self.jobheap else None,
                 )
+            except asyncio.TimeoutError:
+                pass
 
     @tasks.loop(hours=1)
     async def hourly(self):
@@ -133,13 +226,18 @@ class Timer(Cog):
     async def daily(self):
         await self.bot.wait_until_ready()
         try:
-            shutil.make_archive("data_backup", "zip", "data")
-            for m in self.bot.config.managers:
-                await self.bot.get_user(m).send(
-                    content="Daily backups:",
-                    file=discord.File("data_backup.zip"),
+            async with reading_files():
+                name, parts = await self.bot.loop.run_in_executor(
+                    None, functools.partial(take_snapshot, database=live_database())
                 )
-            os.remove("data_backup.zip")
+            for m in self.bot.config.managers:
+                for i, part in enumerate(parts, 1):
+                    await self.bot.get_user(m).send(
+                        content=f"Daily backups: `{name}`, part {i} of {len(parts)}.",
+                        file=discord.File(part),
+                    )
+            for part in parts:
+                os.remove(part)
         except:
             # Keeps the timer from halting in the event of an error.
             for manager in self.bot.config.managers:
@@ -5,7 +5,8 @@ import asyncio
 from discord.ext import commands, tasks
 from discord.ext.commands import Cog
 from helpers.checks import isadmin
-from helpers.datafiles import get_file
+from helpers.datafiles import aget_file
+from helpers.activity import days_active
 from helpers.embeds import stock_embed
 from helpers.sv_config import get_raw_config
 from helpers.placeholders import random_msg
@@ -44,7 +45,7 @@ class TSAR(Cog):
             )
 
         if foundrole["days"]:
-            usertracks = get_file("usertrack", f"servers/{ctx.guild.id}")
+            usertracks = await aget_file("usertrack", f"servers/{ctx.guild.id}")
             if str(ctx.author.id) not in usertracks and foundrole["days"] != 0:
                 return await ctx.reply(
                     content=f"You cannot get this role, as you must wait `{foundrole['days'] - 0}` days.",
@@ -56,6 +57,15 @@ class TSAR(Cog):
                     mention_author=False,
                 )
 
+        if foundrole.get("recentdays"):
+            window = foundrole.get("window") or 30
+            recent = await days_active(ctx.guild.id, ctx.author.id, window)
+            if recent < foundrole["recentdays"]:
+                return await ctx.reply(
+                    content=f"You cannot get this role, as you must chat on `{foundrole['recentdays']}` of the last `{window}` days. You've chatted on `{recent}`.",
+                    mention_author=False,
+                )
+
         if foundrole["blacklisted"]:
             badroles = [
                 self.bot.pull_role(ctx.guild, s)
@@ -119,6 +129,11 @@ class TSAR(Cog):
                 fieldval = (
                     f"> **Role:** {role.mention}\n"
                     + f"> **Minimum Days:** `{tsar['days']}`\n"
+                    + (
+                        f"> **Recent Activity:** `{tsar['recentdays']}` of the last `{tsar.get('window') or 30}` days\n"
+                        if tsar.get("recentdays")
+                        else ""
+                    )
                     + f"> **Forbidden Roles:** "
                 )
                 fieldval += (
@@ -4,7 +4,7 @@ from datetime import datetime
 from zoneinfo import ZoneInfo, available_timezones
 from discord.ext.commands import Cog, Context, Bot
 from discord.ext import commands
-from helpers.datafiles import fill_profile, set_file
+from helpers.datafiles import afill_profile, aset_file
 
 
 class usertime(Cog):
@@ -20,7 +20,7 @@ class usertime(Cog):
 
         - `timezone`
         The timezone to set. Optional."""
-        userdata = fill_profile(ctx.author.id)
+        userdata = await afill_profile(ctx.author.id)
         if timezone == None:
             await ctx.reply(
                 content=f"Your timezone is `{'not set' if not userdata['timezone'] else userdata['timezone']}`.\n"
@@ -32,7 +32,7 @@ class usertime(Cog):
             return
         elif timezone == "remove":
             userdata["timezone"] = None
-            set_file("profile", json.dumps(userdata), f"users/{ctx.author.id}")
+            await aset_file("profile", json.dumps(userdata), f"users/{ctx.author.id}")
             await ctx.reply(f"Your timezone has been removed.", mention_author=False)
         elif timezone not in available_timezones():
             await ctx.reply(
@@ -42,7 +42,7 @@ class usertime(Cog):
             return
         else:
             userdata["timezone"] = timezone
-            set_file("profile", json.dumps(userdata), f"users/{ctx.author.id}")
+            await aset_file("profile", json.dumps(userdata), f"users/{ctx.author.id}")
             await ctx.reply(
                 f"Your timezone has been set to `{timezone}`.", mention_author=False
             )
@@ -62,8 +62,8 @@ class usertime(Cog):
         """Send the current time in the invoker's (or mentioned user's) time zone."""
         if time and target.id != ctx.author.id:
             # check both *have* timezones
-            suserdata = fill_profile(ctx.author.id)
-            tuserdata = fill_profile(target.id)
+            suserdata = await afill_profile(ctx.author.id)
+            tuserdata = await afill_profile(target.id)
             if not suserdata["timezone"]:
                 await ctx.reply(
                     content="I have no idea what time it is for you. You can set your timezone with `timezone`.",
@@ -99,7 +99,7 @@ class usertime(Cog):
                 mention_author=False,
             )
         else:
-            userdata = fill_profile(ctx.author.id if not target else target.id)
+            userdata = await afill_profile(ctx.author.id if not target else target.id)
             if not userdata["timezone"]:
                 await ctx.reply(
                     content=(
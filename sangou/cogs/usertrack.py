@@ -1,9 +1,24 @@
 import datetime
 import discord
-import json
 from discord.ext import commands, tasks
 from discord.ext.commands import Cog
-from helpers.datafiles import get_file, fill_usertrack, set_file
+from helpers.datafiles import (
+    aget_file,
+    fill_usertrack,
+    afill_usertrack,
+    aset_file,
+    file_lock,
+)
+from helpers.activity import (
+    active,
+    dirty,
+    mark_active,
+    load_checkpoint,
+    save_checkpoint,
+    roll_days,
+    days_active,
+)
+from helpers.pipeline import add_stage, remove_stage
 
 
 class usertrack(Cog):
@@ -13,17 +28,22 @@ class usertrack(Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.interactivecache = {}
         self.toilet.start()
+        self.checkpoint.start()
+        add_stage("usertrack", self.process_message)
 
     def cog_unload(self):
+        remove_stage("usertrack")
         self.toilet.cancel()
+        self.checkpoint.cancel()
+        for g in list(dirty):
+            save_checkpoint(g)
 
-    def new_track(self, member):
-        usertracks, uid = fill_usertrack(member.guild.id, member.id)
+    async def new_track(self, member):
+        usertracks, uid = await afill_usertrack(member.guild.id, member.id)
         if "jointime" not in usertracks[uid] or not usertracks[uid]["jointime"]:
             usertracks[uid]["jointime"] = int(member.joined_at.timestamp())
-        set_file("usertrack", json.dumps(usertracks), f"servers/{member.guild.id}")
+        await aset_file("usertrack", usertracks, f"servers/{member.guild.id}")
 
     @commands.guild_only()
     @commands.command()
@@ -34,7 +54,7 @@ class usertrack(Cog):
 
         - `target`
         The user to view time spent for."""
-        usertracks = get_file("usertrack", f"servers/{ctx.guild.id}")
+        usertracks = await aget_file("usertrack", f"servers/{ctx.guild.id}")
         if not target:
             target = ctx.author
         if str(target.id) not in usertracks:
@@ -42,8 +62,11 @@ class usertrack(Cog):
                 content="User not presently tracked. Wait a day.", mention_author=False
             )
 
+        recent = await days_active(
+            ctx.guild.id, target.id, 30, usertracks[str(target.id)]
+        )
         return await ctx.reply(
-            content=f"**{target}** was first seen <t:{usertracks[str(target.id)]['jointime']}:R> on <t:{usertracks[str(target.id)]['jointime']}:F>, and was seen chatting for `{usertracks[str(target.id)]['truedays']}` days.\n\n**This counter may be inaccurate.** It calculates join dates and chatting days from when it was first activated.",
+            content=f"**{target}** was first seen <t:{usertracks[str(target.id)]['jointime']}:R> on <t:{usertracks[str(target.id)]['jointime']}:F>, and was seen chatting for `{usertracks[str(target.id)]['truedays']}` days, `{recent}` of them in the last 30.\n\n**This counter may be inaccurate.** It calculates join dates and chatting days from when it was first activated.",
             mention_author=False,
         )
 
@@ -52,39 +75,54 @@ class usertrack(Cog):
         await self.bot.wait_until_ready()
         if member.bot:
             return
-        self.new_track(member)
+        await self.new_track(member)
 
     @Cog.listener()
     async def on_member_remove(self, member):
         await self.bot.wait_until_ready()
         if member.bot:
             return
-        self.new_track(member)
+        await self.new_track(member)
 
-    @Cog.listener()
-    async def on_message(self, message):
-        await self.bot.wait_until_ready()
-        ctx = await self.bot.get_context(message)
+    async def process_message(self, message):
+        ctx = await self.bot.pull_context(message)
         if message.author.bot or not message.guild or ctx.valid:
             return
-        if message.guild.id not in self.interactivecache:
-            self.interactivecache[message.guild.id] = []
-        if message.author.id not in self.interactivecache[message.guild.id]:
-            self.interactivecache[message.guild.id].append(message.author.id)
+        mark_active(message.guild.id, message.author.id)
 
-    @tasks.loop(time=datetime.time(hour=0))
-    async def toilet(self):
+    async def roll_guild(self, g):
         # water go down the hole
-        for g in self.interactivecache:
-            usertracks = get_file("usertrack", f"servers/{g}")
-            for u in self.interactivecache[g]:
+        async with file_lock("usertrack", f"servers/{g}"):
+            touched = await roll_days(g)
+            if not touched:
+                return
+            usertracks = await aget_file("usertrack", f"servers/{g}")
+            guild = self.bot.get_guild(g)
+            for u in touched:
                 usertracks, uid = fill_usertrack(g, u, usertracks)
-                if not usertracks[uid]["jointime"]:
-                    usertracks[uid]["jointime"] = int(
-                        self.bot.get_guild(g).get_member(u).joined_at.timestamp()
-                    )
-                usertracks[uid]["truedays"] += 1
-            set_file("usertrack", json.dumps(usertracks), f"servers/{g}")
+                member = guild.get_member(u) if guild else None
+                if not usertracks[uid]["jointime"] and member:
+                    usertracks[uid]["jointime"] = int(member.joined_at.timestamp())
+            await aset_file("usertrack", usertracks, f"servers/{g}")
+
+    @tasks.loop(time=datetime.time(hour=0))
+    async def toilet(self):
+        for g in list(active):
+            await self.roll_guild(g)
+
+    @tasks.loop(minutes=5)
+    async def checkpoint(self):
+        for g in list(dirty):
+            save_checkpoint(g)
+
+    @checkpoint.before_loop
+    async def load_checkpoints(self):
+        # Picks up the day from before a restart, and rolls in any that
+        # ended while the bot was down.
+        await self.bot.wait_until_ready()
+        for guild in self.bot.guilds:
+            await load_checkpoint(guild.id)
+            await self.roll_guild(guild.id)
 
 
 async def setup(bot):
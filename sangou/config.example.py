@@ -29,6 +29,14 @@ maxaliases = 6
 # [cogs.messagescan/translate] DeepL Translator API key.
 # Enables DeepL translation output.
 deepl_key = None  # Example: "token_goes_here"
+# [cogs.messagescan/snipe] How many deleted and edited messages to keep per channel.
+snipedepth = 10
+# [cogs.messagescan/snipe] Megabytes all snipe history may take up together.
+snipebudget = 4
 # [cogs.basic/catbox] Catbox Account Key.
 # Will default to anonymous upload if not supplied.
 catbox_key = None  # Example: "token_goes_here"
+# [helpers.datafiles] Where data files are kept.
+# "json" for the data/ folder, "sqlite" for data/sangou.db.
+# Run datamigrate.py once before switching an existing bot to "sqlite".
+data_backend = "json"
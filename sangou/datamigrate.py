@@ -0,0 +1,30 @@
+# This imports the JSON data/ tree into data/sangou.db. Run it with the bot offline.
+# Configs (config.yml) stay where they are, only JSON documents are imported.
+
+import os
+import sys
+from helpers.storage import SqliteStorage
+
+
+def migrate(root="data", path="data/sangou.db"):
+    storage = SqliteStorage(path)
+    count = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        subdir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        if subdir == ".":
+            subdir = ""
+        for filename in sorted(filenames):
+            if not filename.endswith(".json"):
+                continue
+            with open(os.path.join(dirpath, filename), "r") as f:
+                contents = f.read()
+            storage.write((subdir, filename[:-5]), contents or "{}")
+            count += 1
+            print(f"Imported {os.path.join(subdir, filename)}.")
+    storage.close()
+    return count
+
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else "data"
+    print(f"Done, {migrate(root, f'{root}/sangou.db')} files imported.")
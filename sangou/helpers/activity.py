@@ -0,0 +1,120 @@
+# Who chatted on which day, for usertrack and anything gating on activity.
+# Today's chatters are kept in a set per guild and checkpointed to
+# servers/{guild}/activity, so a restart doesn't lose the day.
+# Once a day is over, it's rolled into usertrack. Every user has a `history`
+# bitmap there, bit 0 being `lastday` and bit n being n days before it.
+import asyncio
+import time
+from helpers.datafiles import (
+    aget_file,
+    set_file,
+    fill_usertrack,
+    under_subdir,
+    invalidate_hooks,
+)
+
+# How many days of history are kept per user.
+history_days = 366
+
+# {guild id: {day: {user ids}}}
+active = {}
+# Guilds with chatters that aren't checkpointed yet.
+dirty = set()
+# Checkpoints being loaded again after being replaced.
+reloading = set()
+
+
+def day_number(timestamp=None):
+    return int((time.time() if timestamp is None else timestamp) // 86400)
+
+
+def mark_active(gid, uid):
+    users = active.setdefault(gid, {}).setdefault(day_number(), set())
+    if uid not in users:
+        users.add(uid)
+        dirty.add(gid)
+
+
+async def load_checkpoint(gid):
+    # Merges whatever was saved before a restart back in.
+    checkpoint = await aget_file("activity", f"servers/{gid}")
+    for day, users in checkpoint.items():
+        active.setdefault(gid, {}).setdefault(int(day), set()).update(users)
+
+
+def save_checkpoint(gid):
+    dirty.discard(gid)
+    set_file(
+        "activity",
+        {day: list(users) for day, users in active.get(gid, {}).items()},
+        f"servers/{gid}",
+    )
+
+
+def forget_activity(subdir):
+    # The checkpoints were replaced, what's in memory goes in favor of them.
+    for gid in list(active):
+        if under_subdir(f"servers/{gid}", subdir):
+            del active[gid]
+            dirty.discard(gid)
+            task = asyncio.get_running_loop().create_task(load_checkpoint(gid))
+            reloading.add(task)
+            task.add_done_callback(reloading.discard)
+
+
+invalidate_hooks.append(forget_activity)
+
+
+def record_day(entry, day):
+    # Returns False if this day was already counted.
+    lastday = entry.get("lastday")
+    if lastday is not None and lastday >= day:
+        return False
+    history = entry.get("history", 0)
+    if lastday is not None:
+        history <<= day - lastday
+    entry["history"] = (history | 1) & ((1 << history_days) - 1)
+    entry["lastday"] = day
+    entry["truedays"] += 1
+    return True
+
+
+async def roll_days(gid, before=None):
+    # Rolls every finished day into usertrack. Returns the user ids touched.
+    if before is None:
+        before = day_number()
+    days = sorted(day for day in active.get(gid, {}) if day < before)
+    if not days:
+        return set()
+    usertracks = await aget_file("usertrack", f"servers/{gid}")
+    touched = set()
+    for day in days:
+        for uid in active[gid].pop(day):
+            usertracks, key = fill_usertrack(gid, uid, usertracks)
+            if record_day(usertracks[key], day):
+                touched.add(uid)
+    set_file("usertrack", usertracks, f"servers/{gid}")
+    save_checkpoint(gid)
+    return touched
+
+
+async def days_active(gid, uid, window, entry=None):
+    # Days out of the last `window`, today included, this user chatted on.
+    if entry is None:
+        entry = (await aget_file("usertrack", f"servers/{gid}")).get(str(uid))
+    today = day_number()
+    lastday = entry.get("lastday") if entry else None
+    # Days that haven't been rolled in yet.
+    count = len(
+        [
+            day
+            for day, users in active.get(gid, {}).items()
+            if today - day < window
+            and uid in users
+            and (lastday is None or day > lastday)
+        ]
+    )
+    if lastday is None or today - lastday >= window:
+        return count
+    shift = max(today - lastday, 0)
+    return count + bin(entry["history"] & ((1 << (window - shift)) - 1)).count("1")
@@ -0,0 +1,88 @@
+# Repeated message detection.
+# Messages are compared by a hash of their normalized content, so "HELLO" and
+# "hello  " count as the same, and so does "hellohellohello".
+# SpamWindows is ModToss's, one author repeating themselves.
+# CopyWindows is Messagespam's, many authors posting the same thing in a channel.
+from collections import OrderedDict, deque
+from helpers.expiring import ExpiringMap
+
+# Messages shorter than this ("lol", "gm") only count as copies back to back,
+# even when spread out copies count.
+spread_min_length = 10
+
+
+# Thank you to https://stackoverflow.com/a/29489919 for this function.
+def principal_period(s):
+    i = (s + s).find(s, 1, -1)
+    return None if i == -1 else s[:i]
+
+
+def content_hash(content):
+    content = " ".join(content.casefold().split())
+    return hash(principal_period(content) or content)
+
+
+def message_hash(message):
+    return hash((content_hash(message.content), tuple(s.id for s in message.stickers)))
+
+
+class SpamWindows:
+    def __init__(self, name, maxsize=10000):
+        # key: [content hash, deque of timestamps]
+        self.windows = ExpiringMap(name, maxsize=maxsize)
+
+    def hit(self, key, content, timestamp, window, limit):
+        # Returns True once there's more than `limit` repeats within `window`
+        # seconds, and starts over.
+        digest = content_hash(content)
+        entry = self.windows.get(key)
+        if not entry or entry[0] != digest:
+            entry = [digest, deque()]
+        times = entry[1]
+        while times and times[0] <= timestamp - window:
+            times.popleft()
+        times.append(timestamp)
+        if len(times) > limit:
+            self.windows.pop(key)
+            return True
+        self.windows.set(key, entry, ttl=window)
+        return False
+
+
+class CopyWindows:
+    def __init__(self, name, maxsize=5000, fingerprints=50):
+        # (guild id, channel id): OrderedDict of
+        # message hash: deque of (timestamp, author id, message id)
+        self.channels = ExpiringMap(name, maxsize=maxsize)
+        # Per channel, the least recently seen messages go past this.
+        self.fingerprints = fingerprints
+
+    def hit(self, key, message, window, limit, spread=False):
+        # Returns the (author id, message id)s of the copies once `limit`
+        # different authors posted it within `window` seconds, and starts over.
+        # Copies have to be back to back, unless `spread`.
+        digest = message_hash(message)
+        timestamp = message.created_at.timestamp()
+        seen = self.channels.get(key)
+        if seen is None:
+            seen = OrderedDict()
+        if not spread or (
+            not message.stickers
+            and len(" ".join(message.content.split())) < spread_min_length
+        ):
+            if seen and next(reversed(seen)) != digest:
+                # Something else was said in between.
+                seen.pop(digest, None)
+        copies = seen.setdefault(digest, deque())
+        seen.move_to_end(digest)
+        while copies and copies[0][0] <= timestamp - window:
+            copies.popleft()
+        copies.append((timestamp, message.author.id, message.id))
+        while len(seen) > self.fingerprints:
+            seen.popitem(last=False)
+        self.channels.set(key, seen, ttl=window)
+
+        if len(set(author for _, author, _ in copies)) < limit:
+            return None
+        del seen[digest]
+        return [(author, mid) for _, author, mid in copies]
@@ -0,0 +1,99 @@
+# Audit log entries as they come in, so listeners can find out who did what
+# without polling guild.audit_logs. Common feeds this from
+# on_audit_log_entry_create. Entries are kept for a couple minutes, keyed by
+# (guild id, target id).
+# find_entry looks there first, then waits for the entry to show up, and only
+# if that times out does it fetch the audit log, once.
+# Gateway entries only come with cached users, so use entry_user to get who
+# did it.
+import asyncio
+import datetime
+import discord
+from helpers.expiring import ExpiringMap
+
+entries = ExpiringMap("auditentries", ttl=120, maxsize=5000)
+# (guild id, target id): [(actions, check, since, future)]
+waiters = {}
+
+
+def entry_target(entry):
+    return entry.target.id if entry.target else None
+
+
+def entry_matches(entry, actions, check, since):
+    return (
+        entry.action in actions
+        and entry.created_at >= since
+        and (not check or check(entry))
+    )
+
+
+async def entry_user(bot, entry):
+    # Resolved here instead of when the entry comes in, so entries nobody
+    # looks at never cost a fetch.
+    if entry.user:
+        return entry.user
+    if not entry.user_id:
+        return None
+    return (
+        entry.guild.get_member(entry.user_id)
+        or bot.get_user(entry.user_id)
+        or await bot.fetch_user(entry.user_id)
+    )
+
+
+def add_entry(entry):
+    key = (entry.guild.id, entry_target(entry))
+    found = entries.get(key) or []
+    found.append(entry)
+    entries[key] = found
+    for actions, check, since, future in waiters.get(key, []):
+        if not future.done() and entry_matches(entry, actions, check, since):
+            future.set_result(entry)
+
+
+async def find_entry(
+    guild, actions, target_id, check=None, timeout=10, since=60, fallback=True
+):
+    # `actions` is one AuditLogAction or a tuple of them.
+    # Only entries from the last `since` seconds count.
+    # Without `fallback`, the audit log is never fetched.
+    if not isinstance(actions, tuple):
+        actions = (actions,)
+    since = discord.utils.utcnow() - datetime.timedelta(seconds=since)
+    key = (guild.id, target_id)
+    for entry in reversed(entries.get(key) or []):
+        if entry_matches(entry, actions, check, since):
+            return entry
+    # No entries are coming, and fetching them wouldn't work either.
+    if not guild.me.guild_permissions.view_audit_log:
+        return None
+
+    waiter = (actions, check, since, asyncio.get_running_loop().create_future())
+    waiters.setdefault(key, []).append(waiter)
+    try:
+        return await asyncio.wait_for(waiter[3], timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        waiters[key].remove(waiter)
+        if not waiters[key]:
+            del waiters[key]
+
+    # Missed it somehow, look for ourselves.
+    if not fallback:
+        return None
+    try:
+        async for entry in guild.audit_logs(
+            limit=25,
+            after=since,
+            oldest_first=False,
+            action=actions[0] if len(actions) == 1 else None,
+        ):
+            if entry_target(entry) == target_id and entry_matches(
+                entry, actions, check, since
+            ):
+                return entry
+    except discord.HTTPException:
+        pass
+    return None
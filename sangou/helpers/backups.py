@@ -0,0 +1,202 @@
+# Incremental backups of the data folder.
+# Every file is kept once under backups/objects, named by its sha256, and each
+# snapshot is a manifest of path -> hash. A snapshot only ships the objects the
+# previous one didn't have, with a full baseline every `baseline_every` snapshots.
+# Objects too big for one part are shipped as numbered pieces, objects/<hash>.001
+# and on, to be put back together in order.
+# These are blocking, run them in an executor.
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+backup_root = "backups"
+baseline_every = 7
+keep_manifests = 30
+# Discord's upload limit, with some headroom.
+part_size = 24 * 1024 * 1024
+
+
+def list_snapshots():
+    path = f"{backup_root}/manifests"
+    if not os.path.exists(path):
+        return []
+    return sorted(f[:-5] for f in os.listdir(path) if f.endswith(".json"))
+
+
+def load_manifest(name):
+    with open(f"{backup_root}/manifests/{name}.json", "r") as f:
+        return json.load(f)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def store_object(path):
+    # Copies the file first and hashes the copy, so the object always matches
+    # its name even if the file changes halfway through. Returns the hash.
+    fd, copy = tempfile.mkstemp(dir=f"{backup_root}/objects", suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(path, copy)
+        digest = hash_file(copy)
+        if not os.path.exists(f"{backup_root}/objects/{digest}"):
+            os.replace(copy, f"{backup_root}/objects/{digest}")
+    finally:
+        if os.path.exists(copy):
+            os.remove(copy)
+    return digest
+
+
+def copy_database(database, root):
+    # For when `database`, a SqliteStorage, lives under `root`.
+    # Returns its files relative to `root`, which shouldn't be copied as they
+    # are, and a consistent copy to use in their place. Caller deletes the copy.
+    rel = os.path.relpath(database.path, root).replace(os.sep, "/")
+    if rel.startswith(".."):
+        return set(), None, None
+    fd, copy = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    database.backup(copy)
+    return set(rel + suffix for suffix in ("", "-wal", "-shm", "-journal")), rel, copy
+
+
+def take_snapshot(root="data", database=None):
+    # Returns the snapshot's name and the zip parts to send, caller deletes them.
+    # Pass the SqliteStorage as `database` when using it.
+    for path in ("manifests", "objects", "outgoing"):
+        os.makedirs(f"{backup_root}/{path}", exist_ok=True)
+    snapshots = list_snapshots()
+    previous = load_manifest(snapshots[-1]) if snapshots else None
+    since_full = next(
+        (i for i, name in enumerate(reversed(snapshots)) if name.endswith("-full")),
+        None,
+    )
+    full = since_full is None or since_full + 1 >= baseline_every
+
+    known = previous["files"] if previous else {}
+    files = {}
+    skipped, dbrel, dbcopy = (
+        copy_database(database, root) if database else (set(), None, None)
+    )
+    if dbcopy:
+        try:
+            files[dbrel] = [os.path.getsize(dbcopy), 0, store_object(dbcopy)]
+        finally:
+            os.remove(dbcopy)
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            if rel in skipped:
+                continue
+            stat = os.stat(path)
+            if (
+                rel in known
+                and known[rel][0] == stat.st_size
+                and known[rel][1] == stat.st_mtime_ns
+                and os.path.exists(f"{backup_root}/objects/{known[rel][2]}")
+            ):
+                # Unchanged since last time, don't copy it again.
+                digest = known[rel][2]
+            else:
+                digest = store_object(path)
+            files[rel] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    name = str(int(time.time())) + ("-full" if full else "")
+    manifest = {
+        "taken": int(time.time()),
+        "full": full,
+        "base": snapshots[-1] if snapshots and not full else None,
+        "files": files,
+    }
+    with open(f"{backup_root}/manifests/{name}.json", "w") as f:
+        json.dump(manifest, f)
+
+    shipped = set(f[2] for f in files.values())
+    if not full:
+        shipped -= set(f[2] for f in known.values())
+    parts = pack_snapshot(name, manifest, sorted(shipped))
+    prune_snapshots()
+    return name, parts
+
+
+def pack_snapshot(name, manifest, digests):
+    # Splits the objects over as many zips as it takes to stay under `part_size`.
+    # The first part also carries the manifest.
+    pieces = [(None, None, 0, 0)]
+    for digest in digests:
+        objsize = os.path.getsize(f"{backup_root}/objects/{digest}")
+        if objsize <= part_size:
+            pieces.append((digest, f"objects/{digest}", None, objsize))
+            continue
+        for i, offset in enumerate(range(0, objsize, part_size), 1):
+            pieces.append(
+                (
+                    digest,
+                    f"objects/{digest}.{i:03}",
+                    offset,
+                    min(part_size, objsize - offset),
+                )
+            )
+
+    parts = []
+    archive = None
+    size = 0
+    for digest, arcname, offset, piecesize in pieces:
+        if archive is None or (size and size + piecesize > part_size):
+            if archive:
+                archive.close()
+            parts.append(f"{backup_root}/outgoing/{name}-{len(parts) + 1}.zip")
+            archive = zipfile.ZipFile(parts[-1], "w", zipfile.ZIP_DEFLATED)
+            size = 0
+        if not digest:
+            archive.writestr("manifest.json", json.dumps(manifest))
+        elif offset is None:
+            archive.write(f"{backup_root}/objects/{digest}", arcname)
+        else:
+            with open(f"{backup_root}/objects/{digest}", "rb") as f:
+                f.seek(offset)
+                archive.writestr(arcname, f.read(piecesize))
+        size += piecesize
+    archive.close()
+    return parts
+
+
+def prune_snapshots():
+    snapshots = list_snapshots()
+    for name in snapshots[:-keep_manifests]:
+        os.remove(f"{backup_root}/manifests/{name}.json")
+    used = set()
+    for name in snapshots[-keep_manifests:]:
+        used.update(f[2] for f in load_manifest(name)["files"].values())
+    for digest in os.listdir(f"{backup_root}/objects"):
+        if digest not in used:
+            os.remove(f"{backup_root}/objects/{digest}")
+
+
+def restore_snapshot(name, root="data"):
+    # Builds the snapshot next to the data folder, then swaps it in.
+    manifest = load_manifest(name)
+    staging = root + ".restore"
+    if os.path.exists(staging):
+        shutil.rmtree(staging)
+    for rel, (size, mtime, digest) in manifest["files"].items():
+        path = os.path.join(staging, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(f"{backup_root}/objects/{digest}", path)
+    os.makedirs(staging, exist_ok=True)
+    if os.path.exists(root):
+        os.replace(root, root + ".old")
+    os.replace(staging, root)
+    if os.path.exists(root + ".old"):
+        shutil.rmtree(root + ".old")
+    return len(manifest["files"])
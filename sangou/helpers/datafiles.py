@@ -3,39 +3,317 @@ import os
 import time
 import datetime
 import math
+import atexit
+import asyncio
+import threading
+import contextlib
+import config
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from helpers.sv_config import get_config
+from helpers.storage import JsonStorage, SqliteStorage
+
+# Storage
+
+# "json" keeps the data/ tree as files, "sqlite" keeps documents in data/sangou.db.
+# Run `python datamigrate.py` once when switching an existing bot to sqlite.
+if getattr(config, "data_backend", "json") == "sqlite":
+    storage = SqliteStorage()
+else:
+    storage = JsonStorage()
+
+
+def live_database():
+    # The SqliteStorage, if that's what's in use.
+    # Server and user folders don't have their documents in this case.
+    return storage if isinstance(storage, SqliteStorage) else None
+
+
+# Cache
+
+# Documents are kept in memory keyed by (subdir, filename).
+# Writes are held in `pendingfiles` and flushed to disk shortly after.
+# Disk access never happens under `cachelock`, so the event loop never
+# waits on a slow disk just to look something up.
+# Past `cache_size` documents, the least recently used ones with nothing left
+# to write are dropped, and read again next time.
+flush_delay = 2
+cache_size = 1024
+datacache = OrderedDict()
+pendingfiles = {}
+flushingfiles = {}
+fileversions = {}
+filelocks = {}
+cachelock = threading.RLock()
+writelock = threading.Lock()
+ioexecutor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="datafiles")
+flushtimer = None
+# Subdirs being replaced or read, None for the whole tree. See replacing_files
+# and reading_files.
+heldwrites = []
+# Called with the subdir after invalidate_files, by modules that keep their
+# own copies of documents.
+invalidate_hooks = []
+
+
+def under_subdir(path, subdir):
+    # Whether `path`, a subdir itself, is `subdir` or inside it.
+    return subdir is None or path == subdir or path.startswith(subdir + "/")
+
+
+def held_file(key):
+    return any(under_subdir(key[0], subdir) for subdir in heldwrites)
+
+
+def cache_key(filename, subdir=None):
+    return (subdir if subdir else "", filename)
+
+
+def read_file(key):
+    return storage.read(key)
+
+
+def write_file(key, contents):
+    storage.write(key, contents)
+
+
+def cached_file(key):
+    # Call with cachelock held.
+    if key not in datacache:
+        return None
+    datacache.move_to_end(key)
+    return datacache[key]
+
+
+def cache_file(key, document):
+    # Call with cachelock held.
+    datacache[key] = document
+    datacache.move_to_end(key)
+    skipped = 0
+    while len(datacache) > cache_size and skipped < len(datacache):
+        oldkey = next(iter(datacache))
+        if oldkey != key and unwritten_file(oldkey) is None:
+            del datacache[oldkey]
+        else:
+            # Still has to be written, look at it again later.
+            datacache.move_to_end(oldkey)
+            skipped += 1
+
+
+def unwritten_file(key):
+    if key in pendingfiles:
+        return pendingfiles[key]
+    return flushingfiles.get(key)
+
+
+def flush_files(keys=None):
+    global flushtimer
+    with writelock:
+        with cachelock:
+            if keys is None and flushtimer:
+                flushtimer.cancel()
+                flushtimer = None
+            pending = {
+                key: pendingfiles.pop(key)
+                for key in (list(pendingfiles) if keys is None else keys)
+                if key in pendingfiles and not held_file(key)
+            }
+            flushingfiles.update(pending)
+        for key, contents in pending.items():
+            with cachelock:
+                if flushingfiles.get(key) is not contents:
+                    # Invalidated while we were writing other files.
+                    continue
+            write_file(key, contents)
+        with cachelock:
+            for key, contents in pending.items():
+                if flushingfiles.get(key) is contents:
+                    del flushingfiles[key]
+
+
+def schedule_flush():
+    global flushtimer
+    with cachelock:
+        if flushtimer or None in heldwrites:
+            return
+        flushtimer = threading.Timer(flush_delay, flush_files)
+        flushtimer.daemon = True
+        flushtimer.start()
+
+
+def invalidate_files(subdir=None):
+    # Drops cached and unwritten documents, for when the tree is replaced.
+    userlogflags.clear()
+    with cachelock:
+        for store in (datacache, pendingfiles, flushingfiles):
+            for key in list(store):
+                if under_subdir(key[0], subdir):
+                    del store[key]
+                    fileversions[key] = fileversions.get(key, 0) + 1
+        storage.forget(subdir)
+    for hook in invalidate_hooks:
+        hook(subdir)
+
+
+def hold_writes(subdir=None, replacing=True):
+    # Blocking. Writes what's pending under `subdir`, then keeps anything
+    # else written there off the disk until release_writes.
+    global flushtimer
+    with cachelock:
+        keys = [key for key in pendingfiles if under_subdir(key[0], subdir)]
+    flush_files(keys)
+    with writelock:
+        with cachelock:
+            heldwrites.append(subdir)
+            if subdir is None and flushtimer:
+                flushtimer.cancel()
+                flushtimer = None
+        if replacing:
+            # The database is swapped out along with the tree.
+            storage.forget(subdir)
+
+
+def release_writes(subdir=None, replaced=True):
+    # If the files were replaced, what was written in the meantime is dropped
+    # along with the cache, so the new files are read fresh.
+    with cachelock:
+        heldwrites.remove(subdir)
+    if replaced:
+        invalidate_files(subdir)
+    if pendingfiles:
+        schedule_flush()
+
+
+@contextlib.asynccontextmanager
+async def replacing_files(subdir=None):
+    # Hold this while swapping files in under `subdir` behind datafiles' back.
+    # Nothing cached or pending can end up on top of the new files.
+    await asyncio.get_running_loop().run_in_executor(ioexecutor, hold_writes, subdir)
+    try:
+        yield
+    except BaseException:
+        release_writes(subdir, replaced=False)
+        raise
+    release_writes(subdir)
+
+
+@contextlib.asynccontextmanager
+async def reading_files(subdir=None):
+    # Hold this while reading files under `subdir` behind datafiles' back.
+    # Everything pending is on disk first, and nothing is written over the
+    # files halfway through being read.
+    await asyncio.get_running_loop().run_in_executor(
+        ioexecutor, hold_writes, subdir, False
+    )
+    try:
+        yield
+    finally:
+        release_writes(subdir, replaced=False)
+
+
+def file_lock(filename, subdir=None):
+    # Hold this across a read-modify-write so coroutines don't clobber each other.
+    key = cache_key(filename, subdir)
+    if key not in filelocks:
+        filelocks[key] = asyncio.Lock()
+    return filelocks[key]
+
+
+@atexit.register
+def close_files():
+    flush_files()
+    storage.close()
+
 
 # Files
 
 
 def make_file(filename, subdir=None):
-    path = "data" + ("/" + subdir if subdir else "")
-    if not os.path.exists(path):
-        os.makedirs(path)
-    with open(f"{path}/{filename}.json", "w") as f:
-        f.write("{}")
-        return json.loads("{}")
+    set_file(filename, {}, subdir)
+    return get_file(filename, subdir)
 
 
 def get_file(filename, subdir=None):
-    path = "data" + ("/" + subdir if subdir else "")
-    if not os.path.exists(f"{path}/{filename}.json"):
-        make_file(filename, subdir)
-    with open(f"{path}/{filename}.json", "r") as f:
-        return json.load(f)
+    # The document returned is the cached one, shared with every other caller.
+    # Anything changed in it has to be saved with set_file, or copied first.
+    # Unsaved changes stick around until the document is dropped from the
+    # cache, and get written out by whoever saves it next.
+    key = cache_key(filename, subdir)
+    with cachelock:
+        document = cached_file(key)
+        if document is not None:
+            return document
+        contents = unwritten_file(key)
+        if contents is not None:
+            cache_file(key, json.loads(contents))
+            return datacache[key]
+    document = read_file(key)
+    with cachelock:
+        if key not in datacache:
+            cache_file(key, document)
+        return cached_file(key)
 
 
 def set_file(filename, contents, subdir=None):
-    path = "data" + ("/" + subdir if subdir else "")
-    with open(f"{path}/{filename}.json", "w") as f:
-        f.write(contents)
+    key = cache_key(filename, subdir)
+    document = None
+    if not isinstance(contents, str):
+        document = contents
+        contents = json.dumps(contents)
+    with cachelock:
+        pendingfiles[key] = contents
+        if document is None:
+            # Parsed lazily on the next read.
+            datacache.pop(key, None)
+        else:
+            cache_file(key, document)
+        fileversions[key] = fileversions.get(key, 0) + 1
+    schedule_flush()
+
+
+async def aget_file(filename, subdir=None):
+    # Same rules as get_file.
+    key = cache_key(filename, subdir)
+    with cachelock:
+        document = cached_file(key)
+        if document is not None:
+            return document
+        contents = unwritten_file(key)
+        version = fileversions.get(key, 0)
+    loop = asyncio.get_running_loop()
+    if contents is not None:
+        document = await loop.run_in_executor(ioexecutor, json.loads, contents)
+    else:
+        document = await loop.run_in_executor(ioexecutor, read_file, key)
+    with cachelock:
+        if fileversions.get(key, 0) != version:
+            # Written while we were reading, so ours is stale.
+            return get_file(filename, subdir)
+        if key not in datacache:
+            cache_file(key, document)
+        return cached_file(key)
+
+
+async def aset_file(filename, contents, subdir=None):
+    # Same as set_file, the write goes out with the next flush.
+    # Await aflush_files afterwards if it has to be on disk right away.
+    set_file(filename, contents, subdir)
+
+
+async def aflush_files(keys=None):
+    # flush_files, without holding up the event loop.
+    await asyncio.get_running_loop().run_in_executor(ioexecutor, flush_files, keys)
 
 
 # Default Fills
 
+# These save whatever they add to a document they loaded themselves.
+# When handed a document, saving it is up to the caller.
+
 
 def fill_usertrack(serverid, userid, usertracks=None):
-    if not usertracks:
+    owned = not usertracks
+    if owned:
         usertracks = get_file("usertrack", f"servers/{serverid}")
     uid = str(userid)
     if uid not in usertracks:
@@ -43,6 +321,8 @@ def fill_usertrack(serverid, userid, usertracks=None):
             "jointime": 0,
             "truedays": 0,
         }
+        if owned:
+            set_file("usertrack", usertracks, f"servers/{serverid}")
 
     return usertracks, uid
 
@@ -59,6 +339,7 @@ def fill_userlog(serverid, userid):
             "notes": {},
             "watch": {"state": False, "thread": None, "message": None},
         }
+        set_file("userlog", userlogs, f"servers/{serverid}")
 
     return userlogs, uid
 
@@ -80,19 +361,83 @@ def fill_profile(userid):
         if key not in profile:
             profile[key] = value
             updated = True
-    for key, value in profile.items():
+    for key in list(profile):
         if key not in stockprofile:
             del profile[key]
             updated = True
 
     if updated:
-        set_file("profile", json.dumps(profile), f"users/{userid}")
+        set_file("profile", profile, f"users/{userid}")
 
     return profile
 
 
+# The same, with the document read off the event loop.
+
+
+async def afill_usertrack(serverid, userid, usertracks=None):
+    if not usertracks:
+        await aget_file("usertrack", f"servers/{serverid}")
+    return fill_usertrack(serverid, userid, usertracks)
+
+
+async def afill_profile(userid):
+    await aget_file("profile", f"users/{userid}")
+    return fill_profile(userid)
+
+
 # Userlog Features
 
+# guild id: {"warned": set, "watched": set} of uids as userlog keys.
+# Built from the userlog once, then kept up to date by the functions here, so
+# joins and messages can check a user without going through the whole log.
+userlogflags = {}
+
+
+def flag_userlog(sid, uid, entry):
+    if int(sid) not in userlogflags:
+        # Not built yet, it'll see this when it is.
+        return
+    flags = userlogflags[int(sid)]
+    for flag, state in (
+        ("warned", entry and entry.get("warns")),
+        ("watched", entry and entry.get("watch", {}).get("state")),
+    ):
+        if state:
+            flags[flag].add(str(uid))
+        else:
+            flags[flag].discard(str(uid))
+
+
+async def userlog_flags(sid):
+    if int(sid) not in userlogflags:
+        userlog = await aget_file("userlog", f"servers/{sid}")
+        if int(sid) not in userlogflags:
+            userlogflags[int(sid)] = {"warned": set(), "watched": set()}
+            for uid, entry in userlog.items():
+                flag_userlog(sid, uid, entry)
+    return userlogflags[int(sid)]
+
+
+async def is_warned(sid, uid):
+    return str(uid) in (await userlog_flags(sid))["warned"]
+
+
+async def is_watched(sid, uid):
+    return str(uid) in (await userlog_flags(sid))["watched"]
+
+
+async def get_user_log(sid, uid):
+    # The user's entry, or None if they aren't in the system.
+    # Change it in place and save with set_userlog.
+    return (await aget_file("userlog", f"servers/{sid}")).get(str(uid))
+
+
+async def set_userlog(sid, uid):
+    userlog = await aget_file("userlog", f"servers/{sid}")
+    flag_userlog(sid, uid, userlog.get(str(uid)))
+    await aset_file("userlog", userlog, f"servers/{sid}")
+
 
 def add_userlog(sid, uid, issuer, reason, event_type, timestamp=None):
     userlogs, uid = fill_userlog(sid, uid)
@@ -106,7 +451,8 @@ def add_userlog(sid, uid, issuer, reason, event_type, timestamp=None):
     if event_type not in userlogs[uid]:
         userlogs[uid][event_type] = {}
     userlogs[uid][event_type][str(timestamp)] = log_data
-    set_file("userlog", json.dumps(userlogs), f"servers/{sid}")
+    flag_userlog(sid, uid, userlogs[uid])
+    set_file("userlog", userlogs, f"servers/{sid}")
     return len(userlogs[uid][event_type])
 
 
@@ -123,7 +469,7 @@ def toss_userlog(sid, uid, issuer, mlink, cid, timestamp=None):
     if "tosses" not in userlogs[uid]:
         userlogs[uid]["tosses"] = {}
     userlogs[uid]["tosses"][str(timestamp)] = toss_data
-    set_file("userlog", json.dumps(userlogs), f"servers/{sid}")
+    set_file("userlog", userlogs, f"servers/{sid}")
     return len(userlogs[uid]["tosses"])
 
 
@@ -135,7 +481,8 @@ def watch_userlog(sid, uid, issuer, watch_state, tracker_thread=None, tracker_ms
         "thread": tracker_thread,
         "message": tracker_msg,
     }
-    set_file("userlog", json.dumps(userlogs), f"servers/{sid}")
+    flag_userlog(sid, uid, userlogs[uid])
+    set_file("userlog", userlogs, f"servers/{sid}")
     return
 
 
@@ -161,7 +508,7 @@ def new_survey(sid, uid, mid, iid, reason, event):
         "post_id": mid,
     }
     surveys[str(cid)] = sv_data
-    set_file("surveys", json.dumps(surveys), f"servers/{sid}")
+    set_file("surveys", surveys, f"servers/{sid}")
     return cid, timestamp
 
 
@@ -172,12 +519,43 @@ def edit_survey(sid, cid, iid, reason, event):
     surveys[str(cid)]["reason"] = reason
     surveys[str(cid)]["issuer_id"] = iid
 
-    set_file("surveys", json.dumps(surveys), f"servers/{sid}")
+    set_file("surveys", surveys, f"servers/{sid}")
     return cid
 
 
 # Dishtimer Features
 
+# Timer sets this so new jobs can wake it up before its next deadline.
+job_armer = None
+# Reminders by owner, uid: {job_name: timestamp}.
+# Belongs to the timers document in `job_owners_for`, and is rebuilt if that's reloaded.
+job_owners = {}
+job_owners_for = None
+
+
+def owner_jobs(uid):
+    global job_owners, job_owners_for
+    ctab = get_file("timers")
+    if job_owners_for is not ctab:
+        job_owners = {}
+        for timestamp, jobs in ctab.get("remind", {}).items():
+            for job_name, job_details in jobs.items():
+                owner = str(job_details.get("user", job_name))
+                job_owners.setdefault(owner, {})[job_name] = timestamp
+        job_owners_for = ctab
+    return job_owners.get(str(uid), {})
+
+
+def index_job(ctab, job_type, job_name, job_details, timestamp=None):
+    # Pass a timestamp when adding, leave it out when deleting.
+    if job_type != "remind" or job_owners_for is not ctab:
+        return
+    owner = str(job_details.get("user", job_name))
+    if timestamp is None:
+        job_owners.get(owner, {}).pop(job_name, None)
+    else:
+        job_owners.setdefault(owner, {})[job_name] = timestamp
+
 
 def add_job(job_type, job_name, job_details, timestamp):
     timestamp = str(math.floor(timestamp))
@@ -191,7 +569,10 @@ def add_job(job_type, job_name, job_details, timestamp):
         ctab[job_type][timestamp] = {}
 
     ctab[job_type][timestamp][job_name] = job_details
-    set_file("timers", json.dumps(ctab))
+    index_job(ctab, job_type, job_name, job_details, timestamp)
+    set_file("timers", ctab)
+    if job_armer:
+        job_armer(int(timestamp), job_type)
 
 
 def delete_job(timestamp, job_type, job_name):
@@ -199,10 +580,30 @@ def delete_job(timestamp, job_type, job_name):
     job_name = str(job_name)
     ctab = get_file("timers")
 
-    del ctab[job_type][timestamp][job_name]
+    job_details = ctab[job_type][timestamp].pop(job_name)
+    index_job(ctab, job_type, job_name, job_details)
 
     # smh, not checking for empty timestamps. Smells like bloat!
     if not ctab[job_type][timestamp]:
         del ctab[job_type][timestamp]
 
-    set_file("timers", json.dumps(ctab))
+    set_file("timers", ctab)
+
+
+def delete_jobs(jobs):
+    # Same as delete_job, for many (timestamp, job_type, job_name) at once.
+    ctab = get_file("timers")
+
+    for timestamp, job_type, job_name in jobs:
+        timestamp = str(timestamp)
+        job_name = str(job_name)
+        if job_type not in ctab or timestamp not in ctab[job_type]:
+            continue
+        if job_name not in ctab[job_type][timestamp]:
+            continue
+        job_details = ctab[job_type][timestamp].pop(job_name)
+        index_job(ctab, job_type, job_name, job_details)
+        if not ctab[job_type][timestamp]:
+            del ctab[job_type][timestamp]
+
+    set_file("timers", ctab)
@@ -29,8 +29,9 @@ async def throw_error(bot, err, func, err_type):
 
 
 # Handles code errors.
-async def handle_code_error(bot, event_method, args, kwargs):
-    err = sys.exc_info()
+async def handle_code_error(bot, event_method, args, kwargs, err=None):
+    # `err` is the exc_info to report, if not the one being handled.
+    err = err or sys.exc_info()
 
     ctx = None
     if args:
@@ -0,0 +1,139 @@
+# Dicts that forget. For in-memory moderation state that would otherwise
+# only ever grow. Entries expire after `ttl` seconds, and once a map holds
+# `maxsize` entries the least recently used one goes.
+# Common sweeps every map once a minute, so expired entries don't sit around
+# waiting for someone to look at them.
+import sys
+import time
+from collections import OrderedDict
+
+# name: ExpiringMap
+maps = {}
+
+
+class ExpiringMap:
+    def __init__(self, name, ttl=None, maxsize=None):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # key: [expires, value], least recently used first.
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        # A reloaded cog takes over its old map's name.
+        maps[name] = self
+
+    def live(self, key, now=None):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= (now or time.monotonic()):
+            del self.data[key]
+            self.expired += 1
+            return None
+        return entry
+
+    def get(self, key, default=None):
+        entry = self.live(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.data[key] = [time.monotonic() + ttl if ttl else None, value]
+        self.data.move_to_end(key)
+        while self.maxsize and len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evicted += 1
+
+    def setdefault(self, key, default=None):
+        entry = self.live(key)
+        if entry is None:
+            self.set(key, default)
+            return default
+        self.data.move_to_end(key)
+        return entry[1]
+
+    def pop(self, key, default=None):
+        entry = self.live(key)
+        if entry is None:
+            return default
+        del self.data[key]
+        return entry[1]
+
+    def __getitem__(self, key):
+        entry = self.live(key)
+        if entry is None:
+            self.misses += 1
+            raise KeyError(key)
+        self.hits += 1
+        self.data.move_to_end(key)
+        return entry[1]
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        del self.data[key]
+
+    def __contains__(self, key):
+        return self.live(key) is not None
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        now = time.monotonic()
+        return [key for key in list(self.data) if self.live(key, now)]
+
+    def items(self):
+        now = time.monotonic()
+        return [
+            (key, entry[1])
+            for key, entry in [(key, self.live(key, now)) for key in list(self.data)]
+            if entry
+        ]
+
+    def values(self):
+        return [value for key, value in self.items()]
+
+    def clear(self):
+        self.data.clear()
+
+    def sweep(self, now=None):
+        now = now or time.monotonic()
+        for key in [
+            key for key, entry in self.data.items() if entry[0] and entry[0] <= now
+        ]:
+            del self.data[key]
+            self.expired += 1
+
+    def stats(self):
+        # Shallow sizes, but enough to tell if a map keeps growing.
+        size = sys.getsizeof(self.data) + sum(
+            sys.getsizeof(key) + sys.getsizeof(entry[1])
+            for key, entry in self.data.items()
+        )
+        return {
+            "entries": len(self.data),
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+def sweep_maps():
+    now = time.monotonic()
+    for expiring in list(maps.values()):
+        expiring.sweep(now)
@@ -0,0 +1,134 @@
+# Zipping and unzipping data folders for the get*data/set*data commands.
+# The heavy lifting runs in a thread, and zips are built in spooled temp
+# files so nothing is staged inside data/.
+import asyncio
+import os
+import shutil
+import tempfile
+import zipfile
+import discord
+from helpers.backups import part_size, copy_database
+
+# Kept in memory up to this size, then spilled to disk.
+spool_size = 8 * 1024 * 1024
+
+
+def export_tree(root, progress, database=None):
+    # Returns a list of zip files, each under `part_size` where possible.
+    # Pass the SqliteStorage as `database` when using it.
+    if not os.path.isdir(root):
+        raise FileNotFoundError(root)
+    skipped, dbrel, dbcopy = (
+        copy_database(database, root) if database else (set(), None, None)
+    )
+    try:
+        return pack_tree(root, progress, skipped, dbrel, dbcopy)
+    finally:
+        if dbcopy:
+            os.remove(dbcopy)
+
+
+def pack_tree(root, progress, skipped, dbrel, dbcopy):
+    files = []
+    if dbcopy:
+        files.append((dbcopy, dbrel, os.path.getsize(dbcopy)))
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel = os.path.relpath(path, root)
+            if rel.replace(os.sep, "/") in skipped:
+                continue
+            files.append((path, rel, os.path.getsize(path)))
+    progress["total"] = len(files)
+
+    parts = []
+    archive = None
+    size = 0
+    for path, rel, filesize in files:
+        if archive is None or (size and size + filesize > part_size):
+            if archive:
+                archive.close()
+            parts.append(tempfile.SpooledTemporaryFile(spool_size))
+            archive = zipfile.ZipFile(parts[-1], "w", zipfile.ZIP_DEFLATED)
+            size = 0
+        archive.write(path, rel)
+        size += filesize
+        progress["done"] += 1
+    if archive is None:
+        parts.append(tempfile.SpooledTemporaryFile(spool_size))
+        archive = zipfile.ZipFile(parts[-1], "w", zipfile.ZIP_DEFLATED)
+    archive.close()
+    for part in parts:
+        part.seek(0)
+    return parts
+
+
+def import_tree(fp, root, progress):
+    # Checks the whole zip and extracts it next to `root` before swapping it in,
+    # so a bad upload never leaves a half-replaced folder behind.
+    with zipfile.ZipFile(fp) as archive:
+        members = archive.infolist()
+        for member in members:
+            path = os.path.normpath(member.filename)
+            if os.path.isabs(path) or path.startswith(".."):
+                raise ValueError(f"Refusing to extract {member.filename}.")
+        bad = archive.testzip()
+        if bad:
+            raise ValueError(f"{bad} is corrupted.")
+        progress["total"] = len(members)
+
+        staging = root + ".import"
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        os.makedirs(staging)
+        for member in members:
+            archive.extract(member, staging)
+            progress["done"] += 1
+
+    if os.path.exists(root):
+        os.replace(root, root + ".old")
+    os.replace(staging, root)
+    if os.path.exists(root + ".old"):
+        shutil.rmtree(root + ".old")
+    return len(members)
+
+
+async def read_upload(attachment):
+    # Attachment.save wants a path or a real file, not a spooled one.
+    fp = tempfile.SpooledTemporaryFile(spool_size)
+    fp.write(await attachment.read())
+    fp.seek(0)
+    return fp
+
+
+async def run_archive_job(func, *args, ctx=None, label="Working"):
+    # Runs `func` in a thread. If it takes a while, posts its progress to `ctx`.
+    progress = {"done": 0, "total": 0}
+    job = asyncio.get_running_loop().run_in_executor(None, func, *args, progress)
+    status = None
+    try:
+        while True:
+            done, pending = await asyncio.wait({job}, timeout=2)
+            if done:
+                return job.result()
+            if not ctx:
+                continue
+            content = f"{label}... `{progress['done']}/{progress['total']}` files."
+            if not status:
+                status = await ctx.reply(content=content, mention_author=False)
+            else:
+                await status.edit(content=content)
+    finally:
+        if status:
+            await status.delete()
+
+
+async def send_archive(send, content, parts, filename):
+    # `send` is something like ctx.reply or ctx.author.send.
+    for i, part in enumerate(parts, 1):
+        suffix = f"-{i}" if len(parts) > 1 else ""
+        await send(
+            content=content + (f" Part {i} of {len(parts)}." if len(parts) > 1 else ""),
+            file=discord.File(part, filename=f"{filename}{suffix}.zip"),
+        )
+        part.close()
@@ -0,0 +1,151 @@
+# Which invite a member joined with.
+# Each guild's invites are kept in memory, loaded from invites.json once and
+# kept current by Common's invite create and delete listeners.
+# Joins that land close together share one guild.invites() call. Every change
+# goes back through set_file, so datafiles batches the writes.
+import asyncio
+import time
+from collections import deque
+from helpers.datafiles import aget_file, set_file, under_subdir, invalidate_hooks
+from helpers.expiring import ExpiringMap
+
+# How long joins wait for each other before fetching.
+debounce = 1.0
+# How long a deleted invite may still be the one that was used.
+gone_window = 10
+
+# guild id: InviteTracker
+trackers = {}
+# (guild id, member id): invite used, so every listener gets the same answer.
+results = ExpiringMap("inviteresults", ttl=120, maxsize=5000)
+
+
+def invite_entry(invite):
+    return {
+        "uses": invite.uses or 0,
+        "url": invite.url,
+        "max_uses": invite.max_uses,
+        "code": invite.code,
+    }
+
+
+class InviteTracker:
+    def __init__(self, guild, invites):
+        self.guild = guild
+        self.invites = {id: dict(invite) for id, invite in invites.items()}
+        # (deleted at, entry)
+        self.gone = deque()
+        # member id: future
+        self.waiting = {}
+        self.task = None
+
+    def created(self, invite):
+        self.invites[invite.id] = invite_entry(invite)
+        self.save()
+
+    def deleted(self, invite):
+        entry = self.invites.pop(invite.id, None)
+        if entry:
+            # Might have been used up by someone joining.
+            self.prune_gone()
+            self.gone.append((time.monotonic(), entry))
+            self.save()
+
+    def prune_gone(self):
+        cutoff = time.monotonic() - gone_window - debounce
+        while self.gone and self.gone[0][0] < cutoff:
+            self.gone.popleft()
+
+    async def used(self, member):
+        if member.id not in self.waiting:
+            self.waiting[member.id] = asyncio.get_running_loop().create_future()
+        future = self.waiting[member.id]
+        if not self.task:
+            self.task = asyncio.create_task(self.fetch())
+        return await asyncio.shield(future)
+
+    async def fetch(self):
+        try:
+            while self.waiting:
+                await asyncio.sleep(debounce)
+                waiting, self.waiting = self.waiting, {}
+                result = await self.diff()
+                for member_id, future in waiting.items():
+                    results[(self.guild.id, member_id)] = result
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self.task = None
+
+    async def diff(self):
+        try:
+            real_invites = {i.id: i for i in await self.guild.invites()}
+        except:
+            return "Unable: Missing Permissions."
+
+        # Add unknown active invites. Can happen if invite was created while
+        # we weren't looking.
+        for id, real_invite in real_invites.items():
+            if id not in self.invites:
+                self.invites[id] = invite_entry(real_invite)
+                self.invites[id]["uses"] = 0
+
+        probable_invites_used = []
+        # Look for invites whose usage increased since last lookup
+        for id, invite in list(self.invites.items()):
+            real_invite = real_invites.get(id)
+            if not real_invite:
+                # Invite does not exist anymore. Was either revoked manually
+                # or the final use was used up
+                probable_invites_used.append(invite)
+                del self.invites[id]
+            elif invite["uses"] < (real_invite.uses or 0):
+                probable_invites_used.append(invite)
+                invite["uses"] = real_invite.uses
+        self.prune_gone()
+        probable_invites_used += [entry for _, entry in self.gone]
+        self.gone.clear()
+        self.save()
+
+        # Prepare the invite correlation message
+        if len(probable_invites_used) == 1:
+            return probable_invites_used[0]["code"]
+        elif len(probable_invites_used) == 0:
+            return "Unknown"
+        return "One of: " + ", ".join([x["code"] for x in probable_invites_used])
+
+    def save(self):
+        # A tracker forgotten mid-fetch mustn't write over a restored file.
+        if trackers.get(self.guild.id) is not self:
+            return
+        set_file(
+            "invites",
+            {id: dict(invite) for id, invite in self.invites.items()},
+            f"servers/{self.guild.id}",
+        )
+
+
+def forget_invites(subdir):
+    # The invites file was replaced, start over from the new one.
+    for gid in list(trackers):
+        if under_subdir(f"servers/{gid}", subdir):
+            del trackers[gid]
+
+
+invalidate_hooks.append(forget_invites)
+
+
+async def tracker_for(guild):
+    if guild.id not in trackers:
+        invites = await aget_file("invites", f"servers/{guild.id}")
+        # Another listener may have loaded it while we waited.
+        if guild.id not in trackers:
+            trackers[guild.id] = InviteTracker(guild, invites)
+    return trackers[guild.id]
+
+
+async def used_invite(member):
+    key = (member.guild.id, member.id)
+    if key in results:
+        return results[key]
+    return await (await tracker_for(member.guild)).used(member)
@@ -0,0 +1,144 @@
+# Outbound log messages, queued per channel and sent up to 10 embeds at a time.
+# Anything queued within `flush_window` seconds of the first entry goes out
+# together, so a raid or a mass role edit doesn't send hundreds of messages.
+# Moderation logs go out before everything else and are never dropped. When a
+# channel's queue is full, the oldest noise (edits, deletes) goes first, then
+# regular logs, and moderation logs wait for room instead.
+import asyncio
+import logging
+import time
+from collections import deque
+import discord
+
+MOD = 0
+NORMAL = 1
+NOISE = 2
+
+flush_window = 1.0
+max_depth = 200
+# Discord's limits for one message.
+max_embeds = 10
+max_embed_chars = 6000
+
+# channel id: LogQueue
+queues = {}
+
+log = logging.getLogger("discord")
+
+
+class LogQueue:
+    def __init__(self, channel):
+        self.channel = channel
+        # One deque per priority, of (queued at, content, embeds).
+        self.entries = (deque(), deque(), deque())
+        self.room = asyncio.Event()
+        self.task = None
+        self.sent = 0
+        self.messages = 0
+        self.dropped = 0
+        self.failed = 0
+        # Unexpected exceptions, not just Discord saying no.
+        self.errors = 0
+        self.latency = 0.0
+        self.slowest = 0.0
+
+    @property
+    def depth(self):
+        return sum(len(entries) for entries in self.entries)
+
+    def make_room(self, priority):
+        # Drops the least important entry that isn't more important than
+        # the new one. Returns False if there's nothing to drop.
+        for lower in (NOISE, NORMAL):
+            if lower < priority:
+                break
+            if self.entries[lower]:
+                self.entries[lower].popleft()
+                self.dropped += 1
+                return True
+        return False
+
+    def next_batch(self):
+        content = None
+        embeds = []
+        stamps = []
+        chars = 0
+        for entries in self.entries:
+            while entries:
+                stamp, nextcontent, nextembeds = entries[0]
+                size = sum(len(e) for e in nextembeds)
+                if stamps and (
+                    nextcontent
+                    or len(embeds) + len(nextembeds) > max_embeds
+                    or chars + size > max_embed_chars
+                ):
+                    return content, embeds, stamps
+                entries.popleft()
+                content = content or nextcontent
+                embeds += nextembeds
+                stamps.append(stamp)
+                chars += size
+        return content, embeds, stamps
+
+    async def flush(self):
+        try:
+            await asyncio.sleep(flush_window)
+            while self.depth:
+                content, embeds, stamps = self.next_batch()
+                self.room.set()
+                try:
+                    await self.channel.send(content=content, embeds=embeds)
+                except discord.HTTPException:
+                    self.failed += len(stamps)
+                    continue
+                except Exception:
+                    # Anything else is a bug, but it shouldn't stop the queue.
+                    self.failed += len(stamps)
+                    self.errors += 1
+                    log.exception(f"Failed to send logs to {self.channel.id}.")
+                    continue
+                now = time.monotonic()
+                self.messages += 1
+                self.sent += len(stamps)
+                self.latency += sum(now - stamp for stamp in stamps)
+                self.slowest = max(self.slowest, now - min(stamps))
+        finally:
+            # Even if cancelled, so the next send_log starts a new flush, and
+            # so mod logs waiting for room don't wait forever.
+            self.task = None
+            self.room.set()
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "messages": self.messages,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "errors": self.errors,
+            "latency": self.latency / self.sent if self.sent else 0.0,
+            "slowest": self.slowest,
+        }
+
+
+async def send_log(channel, content=None, embed=None, embeds=None, priority=NORMAL):
+    # Returns once queued, not once sent.
+    if not channel:
+        return
+    queue = queues.get(channel.id)
+    if not queue or queue.channel is not channel:
+        queue = queues.setdefault(channel.id, LogQueue(channel))
+        queue.channel = channel
+    while queue.depth >= max_depth and not queue.make_room(priority):
+        if priority != MOD:
+            queue.dropped += 1
+            return
+        queue.room.clear()
+        if not queue.task:
+            queue.task = asyncio.create_task(queue.flush())
+        await queue.room.wait()
+    queue.entries[priority].append(
+        (time.monotonic(), content, embeds or ([embed] if embed else []))
+    )
+    if not queue.task:
+        queue.task = asyncio.create_task(queue.flush())
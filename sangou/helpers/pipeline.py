@@ -0,0 +1,45 @@
+# The message pipeline. Cogs register stages here instead of listening
+# to on_message themselves, and cogs.pipeline runs them.
+# Only guild messages go through the pipeline.
+import sys
+
+# name: (callback, predicate, bots)
+stages = {}
+# name: [runs, total seconds, slowest run]
+stagetimes = {}
+
+
+def add_stage(name, callback, predicate=None, bots=False):
+    # `predicate(message)` should be cheap, it runs on every guild message.
+    # Stages skip bot messages unless `bots` is set.
+    stages[name] = (callback, predicate, bots)
+    stagetimes.setdefault(name, [0, 0.0, 0.0])
+
+
+def remove_stage(name):
+    stages.pop(name, None)
+
+
+def pick_stages(message):
+    # Returns the stages to run, and (name, exc_info) for predicates that
+    # raised. Those stages are skipped, the rest still run.
+    picked = []
+    failed = []
+    for name, (callback, predicate, bots) in stages.items():
+        if message.author.bot and not bots:
+            continue
+        try:
+            if predicate and not predicate(message):
+                continue
+        except Exception:
+            failed.append((name, sys.exc_info()))
+            continue
+        picked.append((name, callback))
+    return picked, failed
+
+
+def time_stage(name, elapsed):
+    times = stagetimes.setdefault(name, [0, 0.0, 0.0])
+    times[0] += 1
+    times[1] += elapsed
+    times[2] = max(times[2], elapsed)
@@ -0,0 +1,58 @@
+# A guild's config, with its roles and channels already pulled.
+# Common keeps one per guild and throws it away when the config changes
+# or when the guild's roles, channels or threads do.
+
+
+class GuildPolicy:
+    def __init__(self, bot, guild, config):
+        self.bot = bot
+        self.guild = guild
+        self.config = config
+        self.roles = {}
+        self.channels = {}
+        self.categories = {}
+        self.flags = {}
+        self.staff = None
+
+    def get(self, part, key):
+        return self.config[part][key]
+
+    def role(self, part, key):
+        if (part, key) not in self.roles:
+            self.roles[(part, key)] = self.bot.pull_role(
+                self.guild, self.get(part, key)
+            )
+        return self.roles[(part, key)]
+
+    def channel(self, part, key):
+        if (part, key) not in self.channels:
+            self.channels[(part, key)] = self.bot.pull_channel(
+                self.guild, self.get(part, key)
+            )
+        return self.channels[(part, key)]
+
+    def category(self, part, key):
+        if (part, key) not in self.categories:
+            self.categories[(part, key)] = self.bot.pull_category(
+                self.guild, self.get(part, key)
+            )
+        return self.categories[(part, key)]
+
+    @property
+    def staffroles(self):
+        if self.staff is None:
+            self.staff = {
+                r
+                for r in (
+                    self.role("staff", "adminrole"),
+                    self.role("staff", "modrole"),
+                )
+                if r
+            }
+        return self.staff
+
+    def flag(self, name, check):
+        # Feature checks only run once per policy.
+        if name not in self.flags:
+            self.flags[name] = bool(check())
+        return self.flags[name]
@@ -0,0 +1,121 @@
+# Deleted and edited message history for Messagescan's snipe commands.
+# Only small snapshots are kept, not the messages themselves, as those hold
+# on to their embeds, references and members.
+# Each channel keeps its last `depth` entries, and when all channels together
+# go over `budget` bytes, the oldest entries of the quietest channels go first.
+# Registers itself like an ExpiringMap, so Common sweeps it and `expiring`
+# shows it.
+import sys
+import time
+from collections import OrderedDict, deque
+from helpers.expiring import maps
+
+
+class Snapshot:
+    __slots__ = (
+        "id",
+        "guild_id",
+        "channel_id",
+        "author_id",
+        "author",
+        "avatar",
+        "content",
+        "attachments",
+        "created",
+        "edited",
+    )
+
+    def __init__(self, message):
+        self.id = message.id
+        self.guild_id = message.guild.id
+        self.channel_id = message.channel.id
+        self.author_id = message.author.id
+        self.author = str(message.author)
+        self.avatar = message.author.display_avatar.url
+        self.content = message.clean_content
+        self.attachments = tuple(a.url for a in message.attachments)
+        self.created = int(message.created_at.timestamp())
+        self.edited = int(message.edited_at.timestamp()) if message.edited_at else None
+
+    @property
+    def jump_url(self):
+        return (
+            f"https://discord.com/channels/{self.guild_id}/{self.channel_id}/{self.id}"
+        )
+
+    @property
+    def size(self):
+        return (
+            sys.getsizeof(self)
+            + sys.getsizeof(self.author)
+            + sys.getsizeof(self.avatar)
+            + sys.getsizeof(self.content)
+            + sum(sys.getsizeof(a) for a in self.attachments)
+        )
+
+
+class SnipeHistory:
+    def __init__(self, name, depth=10, budget=4 * 1024 * 1024, ttl=86400):
+        self.name = name
+        self.depth = depth
+        self.budget = budget
+        self.ttl = ttl
+        self.maxsize = None
+        # channel id: deque of [stored, size, entry], oldest first.
+        # Channels are kept least recently sniped into first.
+        self.channels = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        maps[name] = self
+
+    def add(self, channel_id, entry, size):
+        history = self.channels.setdefault(channel_id, deque())
+        self.channels.move_to_end(channel_id)
+        history.append([time.monotonic(), size, entry])
+        self.size += size
+        while len(history) > self.depth:
+            self.drop(channel_id)
+            self.evicted += 1
+        while self.size > self.budget and self.channels:
+            self.drop(next(iter(self.channels)))
+            self.evicted += 1
+
+    def drop(self, channel_id):
+        history = self.channels[channel_id]
+        self.size -= history.popleft()[1]
+        if not history:
+            del self.channels[channel_id]
+
+    def get(self, channel_id, index=1):
+        # 1 is the latest, 2 the one before it, and so on.
+        history = self.channels.get(channel_id)
+        if not history or not 0 < index <= len(history):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return history[-index][2]
+
+    def count(self, channel_id):
+        return len(self.channels.get(channel_id, ()))
+
+    def sweep(self, now=None):
+        cutoff = (now or time.monotonic()) - self.ttl
+        for channel_id in list(self.channels):
+            while channel_id in self.channels and (
+                self.channels[channel_id][0][0] <= cutoff
+            ):
+                self.drop(channel_id)
+                self.expired += 1
+
+    def stats(self):
+        return {
+            "entries": sum(len(history) for history in self.channels.values()),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,198 @@
+# Storage backends for helpers.datafiles.
+# Both take documents by key, (subdir, filename), the same as the cache does.
+import json
+import os
+import re
+import sqlite3
+import threading
+
+
+class JsonStorage:
+    # The classic data/ tree, one JSON file per document.
+    def __init__(self, root="data"):
+        self.root = root
+
+    def path(self, key):
+        subdir, filename = key
+        return self.root + ("/" + subdir if subdir else ""), f"{filename}.json"
+
+    def read(self, key):
+        path, filename = self.path(key)
+        if not os.path.exists(f"{path}/{filename}"):
+            self.write(key, "{}")
+            return {}
+        with open(f"{path}/{filename}", "r") as f:
+            return json.load(f)
+
+    def write(self, key, contents):
+        path, filename = self.path(key)
+        if not os.path.exists(path):
+            os.makedirs(path)
+        with open(f"{path}/{filename}", "w") as f:
+            f.write(contents)
+
+    def forget(self, subdir=None):
+        return
+
+    def close(self):
+        return
+
+
+# SQLite
+
+# Documents that grow are split into one row per entry, `depth` keys deep.
+# Appending a warn then touches one row instead of rewriting the whole userlog.
+# Anything that doesn't match here lands in `documents` as a single row.
+sqlite_tables = [
+    # (table, subdir pattern, filename, depth)
+    ("userlogs", r"servers/(\d+)", "userlog", 3),
+    ("surveys", r"servers/(\d+)", "surveys", 1),
+    ("timers", r"()", "timers", 3),
+    ("tosses", r"servers/(\d+)/toss", "tosses", 2),
+    ("usertrack", r"servers/(\d+)", "usertrack", 1),
+    ("profiles", r"users/(\d+)", "profile", 1),
+    ("analytics", r"users/(\d+)", "analytics", 1),
+]
+
+
+def flatten_document(document, depth, path=()):
+    rows = {}
+    for key, value in document.items():
+        if depth > 1 and isinstance(value, dict) and value:
+            rows.update(flatten_document(value, depth - 1, path + (key,)))
+        else:
+            rows[json.dumps(path + (key,))] = json.dumps(value)
+    return rows
+
+
+def build_document(rows):
+    document = {}
+    for path, data in rows:
+        path = json.loads(path)
+        target = document
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = json.loads(data)
+    return document
+
+
+class SqliteStorage:
+    def __init__(self, path="data/sangou.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = None
+        # Last written rows per document, so writes only send what changed.
+        self.written = {}
+
+    def connect(self):
+        if self.db:
+            return self.db
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        for table, _, _, _ in sqlite_tables + [("documents", None, None, 0)]:
+            self.db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "scope TEXT NOT NULL, "
+                "path TEXT NOT NULL, "
+                "data TEXT NOT NULL, "
+                "PRIMARY KEY (scope, path))"
+            )
+        self.db.commit()
+        return self.db
+
+    def locate(self, key):
+        subdir, filename = key
+        for table, pattern, name, depth in sqlite_tables:
+            if filename != name:
+                continue
+            match = re.fullmatch(pattern, subdir)
+            if match:
+                return table, match.group(1), depth
+        # Whole document under its own path.
+        return "documents", subdir, 0
+
+    def select(self, key):
+        table, scope, depth = self.locate(key)
+        if not depth:
+            return self.connect().execute(
+                f"SELECT '[]', data FROM {table} WHERE scope = ? AND path = ?",
+                (scope, key[1]),
+            )
+        return self.connect().execute(
+            f"SELECT path, data FROM {table} WHERE scope = ? ORDER BY rowid",
+            (scope,),
+        )
+
+    def read(self, key):
+        with self.lock:
+            rows = self.select(key).fetchall()
+            if not self.locate(key)[2]:
+                return json.loads(rows[0][1]) if rows else {}
+            self.written[key] = dict(rows)
+            return build_document(rows)
+
+    def write(self, key, contents):
+        table, scope, depth = self.locate(key)
+        with self.lock:
+            db = self.connect()
+            if not depth:
+                db.execute(
+                    f"INSERT INTO {table} (scope, path, data) VALUES (?, ?, ?) "
+                    "ON CONFLICT (scope, path) DO UPDATE SET data = excluded.data",
+                    (scope, key[1], contents),
+                )
+                db.commit()
+                return
+            if key not in self.written:
+                self.written[key] = dict(self.select(key).fetchall())
+            old = self.written[key]
+            new = flatten_document(json.loads(contents), depth)
+            db.executemany(
+                f"DELETE FROM {table} WHERE scope = ? AND path = ?",
+                [(scope, path) for path in old if path not in new],
+            )
+            db.executemany(
+                f"INSERT INTO {table} (scope, path, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (scope, path) DO UPDATE SET data = excluded.data",
+                [
+                    (scope, path, data)
+                    for path, data in new.items()
+                    if old.get(path) != data
+                ],
+            )
+            db.commit()
+            self.written[key] = new
+
+    def backup(self, target):
+        # A consistent copy of the database, for exports and backups. Copying
+        # the file itself would leave out whatever is still in the WAL.
+        with self.lock:
+            copy = sqlite3.connect(target)
+            try:
+                self.connect().backup(copy)
+            finally:
+                copy.close()
+
+    def forget(self, subdir=None):
+        with self.lock:
+            for key in list(self.written):
+                if (
+                    subdir is None
+                    or key[0] == subdir
+                    or key[0].startswith(subdir + "/")
+                ):
+                    del self.written[key]
+            if subdir is None and self.db:
+                # The whole tree is being replaced, database included.
+                self.db.close()
+                self.db = None
+
+    def close(self):
+        with self.lock:
+            if self.db:
+                self.db.commit()
+                self.db.close()
+                self.db = None
@@ -5,11 +5,28 @@ import json
 import os
 from jsonschema import validate
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 server_data = "data/servers"
 with open("assets/config.example.yml", "r") as f:
-    config_stock = yaml.safe_load(f)
+    config_stock = yaml.load(f, Loader=SafeLoader)
 with open("assets/config.schema.yml", "r") as f:
-    config_schema = yaml.safe_load(f)
+    config_schema = yaml.load(f, Loader=SafeLoader)
+
+# Parsed and migrated configs, keyed by sid.
+# Each entry is (file stamp, config), so edits made on disk are picked up too.
+config_cache = {}
+
+
+def config_stamp(sid):
+    try:
+        stat = os.stat(f"{server_data}/{sid}/config.yml")
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
 
 
 def validate_config(config):
@@ -20,7 +37,8 @@ def make_config(sid):
     if not os.path.exists(f"{server_data}/{sid}"):
         os.makedirs(f"{server_data}/{sid}")
     shutil.copyfile("assets/config.example.yml", f"{server_data}/{sid}/config.yml")
-    return config_stock
+    config_cache[sid] = (config_stamp(sid), copy.deepcopy(config_stock))
+    return config_cache[sid][1]
 
 
 def get_config(sid, part, key):
@@ -30,11 +48,11 @@ def get_config(sid, part, key):
 
 
 def fill_config(sid):
-    config = (
-        get_raw_config(sid)
-        if os.path.exists(f"{server_data}/{sid}/config.yml")
-        else make_config(sid)
-    )
+    stamp = config_stamp(sid)
+    if sid in config_cache and stamp and config_cache[sid][0] == stamp:
+        return config_cache[sid][1]
+
+    config = get_raw_config(sid) if stamp else make_config(sid)
 
     if config["metadata"]["version"] < config_stock["metadata"]["version"]:
         # Version update code.
@@ -99,14 +117,25 @@ def fill_config(sid):
                 config["toss"]["antispamlimit"] = None
                 config["toss"]["antispamwindow"] = None
 
+        # * to 11.
+        if config["metadata"]["version"] < 11:
+            if sid == 256926147827335170:
+                config["toss"]["copyspamlimit"] = 5
+                config["toss"]["copyspamwindow"] = 600
+            else:
+                config["toss"]["copyspamlimit"] = None
+                config["toss"]["copyspamwindow"] = None
+            config["toss"]["copyspamspreadenable"] = None
+
         set_raw_config(sid, config)
 
+    config_cache[sid] = (config_stamp(sid), config)
     return config
 
 
 def get_raw_config(sid):
     with open(f"{server_data}/{sid}/config.yml", "r") as f:
-        config = yaml.safe_load(f)
+        config = yaml.load(f, Loader=SafeLoader)
     return config
 
 
@@ -114,3 +143,4 @@ def set_raw_config(sid, contents):
     contents["metadata"]["version"] = config_stock["metadata"]["version"]
     with open(f"{server_data}/{sid}/config.yml", "w") as f:
         yaml.dump(contents, f, sort_keys=False)
+    config_cache[sid] = (config_stamp(sid), contents)
@@ -0,0 +1,85 @@
+# Memory-resident botbans, user prefixes and user aliases for on_message.
+# Shortcuts and Admin keep these up to date when they change the files.
+# Prefixes and aliases are only kept for users seen in the last hour.
+from helpers.datafiles import get_file, aget_file
+from helpers.expiring import ExpiringMap
+
+botbanned = None
+# uid: (prefixes, AliasTrie)
+userprofiles = ExpiringMap("userprofiles", ttl=3600, maxsize=10000)
+
+
+# Botbans
+
+
+def is_botbanned(uid):
+    global botbanned
+    if botbanned is None:
+        botusers = get_file("botusers")
+        botbanned = set(botusers["botban"] if "botban" in botusers else [])
+    return uid in botbanned
+
+
+def set_botbanned(uid, state):
+    is_botbanned(uid)
+    if state:
+        botbanned.add(uid)
+    else:
+        botbanned.discard(uid)
+
+
+# Prefixes and Aliases
+
+
+class AliasTrie:
+    # Aliases keyed by character, so matching walks the message once.
+    def __init__(self, aliases):
+        self.root = {}
+        for index, alias in enumerate(aliases):
+            command, alias = list(alias.items())[0]
+            node = self.root
+            for c in alias:
+                node = node.setdefault(c, {})
+            # Earlier aliases win, like the old startswith loop.
+            if None not in node:
+                node[None] = (index, command, alias)
+
+    def match(self, text):
+        found = self.root.get(None)
+        node = self.root
+        for c in text:
+            if c not in node:
+                break
+            node = node[c]
+            if None in node and (not found or node[None][0] < found[0]):
+                found = node[None]
+        return (found[1], found[2]) if found else None
+
+
+async def load_user(uid):
+    profile = userprofiles.get(uid)
+    if profile is None:
+        document = await aget_file("profile", f"users/{uid}")
+        profile = (
+            list(document.get("prefixes", [])),
+            AliasTrie(document.get("aliases", [])),
+        )
+        userprofiles[uid] = profile
+    return profile
+
+
+async def get_userprefixes(uid):
+    return (await load_user(uid))[0]
+
+
+async def match_alias(uid, text):
+    return (await load_user(uid))[1].match(text)
+
+
+def forget_user(uid=None):
+    global botbanned
+    if uid is None:
+        botbanned = None
+        userprofiles.clear()
+        return
+    userprofiles.pop(uid, None)